@@ -0,0 +1,176 @@
+"""Audio preprocessing benchmark: whole-recording STT against VAD-segmented STT.
+
+Every sample recording in ``recordings/`` is converted to 16 kHz mono WAV
+the way ``ConferenceService`` does it, then transcribed twice:
+
+* ``baseline``: the whole file in one ``recognize_google`` call, as before
+* ``vad``: ``AudioPreprocessor`` trims silence and splits the recording into
+  utterances, and only those are sent to the recognizer
+
+For each recording it reports the audio duration, how much was removed as
+silence, the number of STT requests and the STT time of both variants. STT
+runs against the local fake, whose latency is a fixed per-request cost plus
+``--stt-realtime-factor`` seconds per second of audio, unless ``--real-stt``
+is given. Requires ffmpeg. Run from the backend directory:
+
+    python -m benchmarks.audio
+    python -m benchmarks.audio --stt-latency-ms 300 --stt-realtime-factor 0.3 --max-recordings 10
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fakes import FakeServices, FaultConfig, install_google_fakes
+from benchmarks.run import sample_files
+
+
+def to_wav(path: str) -> str:
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
+        wav_path = temp_file.name
+    subprocess.run([
+        "ffmpeg", "-i", path, "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", "-y", wav_path
+    ], check=True, capture_output=True)
+    return wav_path
+
+
+def recognize(recognizer, audio) -> str:
+    import speech_recognition as sr
+    try:
+        return recognizer.recognize_google(audio, language="en-US")
+    except sr.UnknownValueError:
+        return ""
+
+
+def bench_recording(recognizer, preprocessor, path: str) -> Dict:
+    import speech_recognition as sr
+    wav_path = to_wav(path)
+    try:
+        t0 = time.perf_counter()
+        with sr.AudioFile(wav_path) as source:
+            audio = recognizer.record(source)
+        baseline_text = recognize(recognizer, audio)
+        baseline_seconds = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        utterances, stats = preprocessor.process(wav_path)
+        preprocess_seconds = time.perf_counter() - t0
+        texts = [
+            recognize(recognizer, sr.AudioData(utterance["audio"], stats["sample_rate"], 2))
+            for utterance in utterances
+        ]
+        vad_seconds = time.perf_counter() - t0
+    finally:
+        os.unlink(wav_path)
+
+    return {
+        "recording": os.path.basename(path),
+        "duration": stats["duration"],
+        "speech_seconds": stats["speech_seconds"],
+        "removed_fraction": stats["removed_fraction"],
+        "gain_db": stats["gain_db"],
+        "baseline": {
+            "stt_requests": 1,
+            "seconds": round(baseline_seconds, 3),
+            "words": len(baseline_text.split()),
+        },
+        "vad": {
+            "stt_requests": len(utterances),
+            "preprocess_seconds": round(preprocess_seconds, 3),
+            "seconds": round(vad_seconds, 3),
+            "words": sum(len(text.split()) for text in texts),
+            "segments": [[u["start"], u["end"]] for u in utterances],
+        },
+    }
+
+
+def totals(results: List[Dict]) -> Dict:
+    duration = sum(r["duration"] for r in results)
+    speech = sum(r["speech_seconds"] for r in results)
+    baseline = sum(r["baseline"]["seconds"] for r in results)
+    vad = sum(r["vad"]["seconds"] for r in results)
+    return {
+        "recordings": len(results),
+        "audio_seconds": round(duration, 2),
+        "speech_seconds": round(speech, 2),
+        "removed_percent": round(100 * (1 - speech / duration), 1) if duration else None,
+        "baseline_stt_seconds": round(baseline, 3),
+        "vad_stt_seconds": round(vad, 3),
+        "stt_time_saved_percent": round(100 * (1 - vad / baseline), 1) if baseline else None,
+        "preprocess_seconds": round(sum(r["vad"]["preprocess_seconds"] for r in results), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-recordings", type=int, default=28)
+    parser.add_argument("--real-stt", action="store_true", help="call Google speech recognition")
+    parser.add_argument("--stt-latency-ms", type=float, default=300)
+    parser.add_argument("--stt-realtime-factor", type=float, default=0.3)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/audio-<timestamp>.json)")
+    args = parser.parse_args()
+
+    import speech_recognition as sr
+    from services.audio_preprocessing import AudioPreprocessor
+
+    recordings = sample_files("recordings", (".webm", ".mp4", ".ogg", ".wav"))[:args.max_recordings]
+    fakes = None
+    if not args.real_stt:
+        fakes = FakeServices(
+            faults={"stt": FaultConfig(args.stt_latency_ms)},
+            stt_realtime_factor=args.stt_realtime_factor
+        ).__enter__()
+        install_google_fakes(fakes.base_url)
+
+    results = []
+    try:
+        recognizer, preprocessor = sr.Recognizer(), AudioPreprocessor()
+        for path in recordings:
+            try:
+                results.append(bench_recording(recognizer, preprocessor, path))
+            except Exception as e:
+                results.append({"recording": os.path.basename(path), "error": str(e)})
+    finally:
+        if fakes is not None:
+            fakes.__exit__(None, None, None)
+
+    measured = [r for r in results if "error" not in r]
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "real_stt": args.real_stt,
+            "fake_stt": None if args.real_stt else {
+                "latency_ms": args.stt_latency_ms,
+                "realtime_factor": args.stt_realtime_factor,
+            },
+        },
+        "totals": totals(measured),
+        "recordings": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"audio-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'recording':<40} {'audio s':>8} {'removed':>8} {'requests':>9} {'base s':>8} {'vad s':>8}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['recording']:<40} error: {r['error']}")
+            continue
+        print(f"{r['recording']:<40} {r['duration']:>8} {r['removed_fraction'] * 100:>7.1f}% "
+              f"{r['vad']['stt_requests']:>9} {r['baseline']['seconds']:>8} {r['vad']['seconds']:>8}")
+    print(json.dumps(report["totals"], indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
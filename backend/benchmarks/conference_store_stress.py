@@ -0,0 +1,165 @@
+"""Multi-process stress test for ConferenceStore.
+
+Simulates several uvicorn workers sharing one conferences.json: every process
+starts conferences, appends transcripts to a shared conference and reads
+state written by the others. At the end no update may be lost.
+
+It also checks that a journal line torn by a writer crashing mid-append is
+skipped, and that the records written around it survive a reopen, and
+that a process killed between the two renames of a compaction loses no
+conference that was only in the journal.
+
+Run from the backend directory:
+
+    python -m benchmarks.conference_store_stress --workers 4 --ops 200
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.conference_store import ConferenceStore
+
+SHARED_ID = "shared"
+
+
+def worker(path: str, worker_id: int, ops: int, barrier) -> dict:
+    store = ConferenceStore(path)
+    barrier.wait()
+    stale_reads = 0
+    started = time.perf_counter()
+    for i in range(ops):
+        conference_id = f"{worker_id}-{i}"
+
+        def add(conferences):
+            conferences[conference_id] = new_conference(conference_id)
+
+        def append(conferences):
+            conferences[SHARED_ID]["transcripts"].append({
+                "text": f"worker {worker_id} segment {i}",
+                "timestamp": datetime.now().isoformat()
+            })
+
+        store.update(add)
+        store.update(append)
+        # A worker must always see its own writes
+        if not store.exists(conference_id):
+            stale_reads += 1
+    return {"elapsed": time.perf_counter() - started, "stale_reads": stale_reads}
+
+
+def new_conference(conference_id: str) -> dict:
+    return {
+        "id": conference_id,
+        "parent_language": "en",
+        "start_time": datetime.now().isoformat(),
+        "transcripts": [],
+        "summary": None
+    }
+
+
+def torn_journal() -> dict:
+    """Append after a partial journal line, as after a crash mid-append, then reopen."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "conferences.json")
+        store = ConferenceStore(path)
+        store.update(lambda conferences: conferences.__setitem__("before", new_conference("before")))
+        with open(store.journal_path, "ab") as f:
+            f.write(b'{"id": "torn", "conference": {"id": "tor')
+        store.update(lambda conferences: conferences.__setitem__("after", new_conference("after")))
+        try:
+            found = sorted(ConferenceStore(path).all())
+        except Exception as e:
+            return {"passed": False, "error": str(e)}
+        return {"conferences_found": found, "passed": found == ["after", "before"]}
+
+
+def compact_and_die(path: str, journaled: int):
+    """Journal some conferences, then die midway through folding them into the JSON file."""
+    store = ConferenceStore(path)
+    for i in range(journaled):
+        store.update(lambda conferences: conferences.__setitem__(f"journaled-{i}", new_conference(f"journaled-{i}")))
+
+    replace = os.replace
+    renames = []
+
+    def replace_then_die(src, dst):
+        replace(src, dst)
+        renames.append(dst)
+        if len(renames) == 1:
+            os._exit(0)
+
+    os.replace = replace_then_die
+    # Iterating every conference forces a full rewrite of the JSON file
+    store.update(lambda conferences: list(conferences.values()))
+
+
+def killed_compaction(journaled: int = 20) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "conferences.json")
+        ConferenceStore(path)
+        process = multiprocessing.get_context("spawn").Process(target=compact_and_die, args=(path, journaled))
+        process.start()
+        process.join()
+        found = len(ConferenceStore(path).all())
+        return {"conferences_expected": journaled, "conferences_found": found, "passed": found == journaled}
+
+
+def run(workers: int, ops: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "conferences.json")
+        store = ConferenceStore(path)
+        store.update(lambda conferences: conferences.setdefault(SHARED_ID, new_conference(SHARED_ID)))
+
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Manager() as manager:
+            barrier = manager.Barrier(workers)
+            with ctx.Pool(workers) as pool:
+                started = time.perf_counter()
+                results = pool.starmap(worker, [(path, w, ops, barrier) for w in range(workers)])
+                elapsed = time.perf_counter() - started
+
+        final = ConferenceStore(path).all()
+        expected = workers * ops
+        report = {
+            "workers": workers,
+            "ops_per_worker": ops,
+            "conferences_expected": expected + 1,
+            "conferences_found": len(final),
+            "transcripts_expected": expected,
+            "transcripts_found": len(final[SHARED_ID]["transcripts"]),
+            "stale_reads": sum(r["stale_reads"] for r in results),
+            "writes_per_second": round(2 * expected / elapsed, 1),
+            "elapsed_seconds": round(elapsed, 3),
+        }
+        report["torn_journal"] = torn_journal()
+        report["killed_compaction"] = killed_compaction()
+        report["passed"] = (
+            report["conferences_found"] == report["conferences_expected"]
+            and report["transcripts_found"] == report["transcripts_expected"]
+            and report["stale_reads"] == 0
+            and report["torn_journal"]["passed"]
+            and report["killed_compaction"]["passed"]
+        )
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=200)
+    args = parser.parse_args()
+
+    report = run(args.workers, args.ops)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
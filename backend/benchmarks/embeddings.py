@@ -0,0 +1,204 @@
+"""Embedding provider benchmark: OpenAI (plus question translation) against local ONNX.
+
+Compares the two ways a question in any language reaches the vector store:
+
+* ``openai``: detect the question's language and translate it to English
+  with the LLM, then embed it with the OpenAI embeddings API
+* ``onnx``: embed the question directly with the local multilingual model
+
+and the cost of embedding the chunks of the sample uploads at ingest. The
+OpenAI side runs against the local fakes unless ``--real-openai`` is given.
+For the ONNX model it also reports how often a Spanish, Vietnamese or Arabic
+question retrieves the same top chunk as its English original.
+
+    python -m benchmarks.embeddings --model-dir models/paraphrase-multilingual-MiniLM-L12-v2
+    python -m benchmarks.embeddings --model-dir ... --threads 1 2 4 --batch-size 64
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fakes import FakeServices, FaultConfig
+from benchmarks.run import latency_stats, sample_files
+
+# The same questions in English, Spanish, Vietnamese and Arabic
+QUESTIONS = [
+    {
+        "en": "What is the student's GPA?",
+        "es": "¿Cuál es el promedio de calificaciones del estudiante?",
+        "vi": "Điểm trung bình của học sinh là bao nhiêu?",
+        "ar": "ما هو المعدل التراكمي للطالب؟",
+    },
+    {
+        "en": "Which math courses did the student take?",
+        "es": "¿Qué cursos de matemáticas tomó el estudiante?",
+        "vi": "Học sinh đã học những môn toán nào?",
+        "ar": "ما هي مواد الرياضيات التي درسها الطالب؟",
+    },
+    {
+        "en": "How many credits were earned this semester?",
+        "es": "¿Cuántos créditos obtuvo este semestre?",
+        "vi": "Học kỳ này đạt được bao nhiêu tín chỉ?",
+        "ar": "كم عدد الساعات المعتمدة التي تم الحصول عليها هذا الفصل؟",
+    },
+    {
+        "en": "Are there any areas where the student needs to improve?",
+        "es": "¿Hay áreas en las que el estudiante necesita mejorar?",
+        "vi": "Có lĩnh vực nào học sinh cần cải thiện không?",
+        "ar": "هل هناك مجالات يحتاج الطالب إلى تحسينها؟",
+    },
+]
+
+
+def load_chunks() -> List[str]:
+    """Split the text of the sample uploads the way DocumentService does."""
+    from PyPDF2 import PdfReader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    chunks = []
+    for path in sample_files("uploads", (".pdf",)):
+        text = "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+        chunks.extend(splitter.split_text(text))
+    return chunks
+
+
+def bench_ingestion(embeddings, chunks: List[str]) -> Dict:
+    started = time.perf_counter()
+    embeddings.embed_documents(chunks)
+    elapsed = time.perf_counter() - started
+    return {
+        "chunks": len(chunks),
+        "seconds": round(elapsed, 3),
+        "chunks_per_second": round(len(chunks) / elapsed, 2) if elapsed else None,
+    }
+
+
+def bench_openai_queries(rag_service, repeats: int) -> Dict:
+    """Detect, translate when needed, then embed: what query_document does today."""
+    samples = {}
+    for language in ("en", "es", "vi", "ar"):
+        timings = []
+        for _ in range(repeats):
+            for question in QUESTIONS:
+                t0 = time.perf_counter()
+                text = question[language]
+                detected = rag_service.detect_language(text)
+                if detected != "en":
+                    text = rag_service.translate_text(text, detected, "en")
+                rag_service.embeddings.embed_query(text)
+                timings.append(time.perf_counter() - t0)
+        samples[language] = latency_stats(timings)
+    return samples
+
+
+def bench_onnx_queries(embeddings, repeats: int) -> Dict:
+    samples = {}
+    for language in ("en", "es", "vi", "ar"):
+        timings = []
+        for _ in range(repeats):
+            for question in QUESTIONS:
+                t0 = time.perf_counter()
+                embeddings.embed_query(question[language])
+                timings.append(time.perf_counter() - t0)
+        samples[language] = latency_stats(timings)
+    return samples
+
+
+def cross_lingual_agreement(embeddings, chunks: List[str]) -> Dict:
+    """Share of translated questions whose top chunk matches the English question's."""
+    import numpy as np
+    matrix = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+
+    def top(text: str) -> int:
+        return int(np.argmax(matrix @ np.asarray(embeddings.embed_query(text), dtype=np.float32)))
+
+    agreement = {}
+    for language in ("es", "vi", "ar"):
+        hits = sum(top(q[language]) == top(q["en"]) for q in QUESTIONS)
+        agreement[language] = round(hits / len(QUESTIONS), 2)
+    return agreement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", help="exported ONNX model directory (skips ONNX if omitted)")
+    parser.add_argument("--threads", nargs="+", type=int, default=[0], help="intra-op thread counts to try")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--real-openai", action="store_true", help="call the real OpenAI API")
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--embedding-latency-ms", type=float, default=80)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/embeddings-<timestamp>.json)")
+    args = parser.parse_args()
+
+    chunks = load_chunks()
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "chunks": len(chunks),
+            "real_openai": args.real_openai,
+            "batch_size": args.batch_size,
+        }
+    }
+
+    fakes = None
+    if not args.real_openai:
+        fakes = FakeServices(faults={
+            "llm": FaultConfig(args.llm_latency_ms),
+            "embeddings": FaultConfig(args.embedding_latency_ms),
+        }).__enter__()
+        fakes.configure_environment()
+        report["meta"]["fake_latency_ms"] = {"llm": args.llm_latency_ms, "embeddings": args.embedding_latency_ms}
+
+    workdir = tempfile.mkdtemp(prefix="speaklink-embeddings-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        os.environ["EMBEDDING_PROVIDER"] = "openai"
+        from services.rag_service import RAGService
+        rag_service = RAGService()
+        report["openai"] = {
+            "ingestion": bench_ingestion(rag_service.embeddings, chunks),
+            "queries": bench_openai_queries(rag_service, args.repeats),
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        if fakes is not None:
+            fakes.__exit__(None, None, None)
+
+    if args.model_dir:
+        from services.embeddings import OnnxEmbeddings
+        report["onnx"] = {}
+        for threads in args.threads:
+            started = time.perf_counter()
+            embeddings = OnnxEmbeddings(args.model_dir, batch_size=args.batch_size, intra_op_threads=threads)
+            load_seconds = time.perf_counter() - started
+            report["onnx"][f"threads={threads}"] = {
+                "load_seconds": round(load_seconds, 3),
+                "ingestion": bench_ingestion(embeddings, chunks),
+                "queries": bench_onnx_queries(embeddings, args.repeats),
+            }
+        if chunks:
+            report["onnx"]["cross_lingual_top1_agreement"] = cross_lingual_agreement(embeddings, chunks)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"embeddings-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
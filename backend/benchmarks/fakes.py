@@ -0,0 +1,226 @@
+"""Local stand-ins for OpenAI, Google speech recognition and Google Translate.
+
+``FakeServices`` runs a threaded HTTP server that speaks just enough of each
+API for the backend to run offline, with configurable latency and error
+injection so benchmarks are reproducible and can exercise failure paths.
+
+OpenAI clients are pointed at the fake server through ``OPENAI_BASE_URL`` /
+``OPENAI_API_BASE``. The Google clients have hard-coded endpoints, so
+``install_google_fakes`` routes ``Recognizer.recognize_google`` and
+``GoogleTranslator.translate`` through the fake server instead.
+"""
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+EMBEDDING_DIMENSIONS = 1536
+
+
+class FaultConfig:
+    """Latency and error injection for one fake endpoint."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        """Return (delay in seconds, whether to fail) for one request."""
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self._random.random() < self.error_rate
+        return delay, fail
+
+    def to_dict(self) -> Dict:
+        return {"latency_ms": self.latency_ms, "jitter_ms": self.jitter_ms, "error_rate": self.error_rate}
+
+
+def fake_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS):
+    """Deterministic unit vector derived from the text's word hashes."""
+    vector = [0.0] * dimensions
+    for word in text.lower().split():
+        digest = hashlib.md5(word.encode()).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeServices"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        route = self.path.split("?")[0].rstrip("/")
+        handler = {
+            "/v1/chat/completions": ("llm", self._chat),
+            "/v1/embeddings": ("embeddings", self._embeddings),
+            "/stt": ("stt", self._stt),
+            "/translate": ("translate", self._translate),
+        }.get(route)
+        if handler is None:
+            self._reply(404, {"error": {"message": f"Unknown route {route}"}})
+            return
+
+        name, respond = handler
+        delay, fail = self.server.faults[name].sample()
+        if name == "stt":
+            delay += len(raw) / (16000 * 2) * self.server.stt_realtime_factor
+        time.sleep(delay)
+        self.server.count(name, failed=fail)
+        if fail:
+            self._reply(503, {"error": {"message": "injected failure", "type": "server_error"}})
+            return
+        self._reply(200, respond(raw))
+
+    def _chat(self, raw: bytes) -> Dict:
+        request = json.loads(raw)
+        prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+        if "ISO 639-1 language code" in prompt:
+            answer = "en"
+        elif "Translate the following text" in prompt:
+            answer = prompt.rsplit("Text to translate:", 1)[-1].split("Translation:", 1)[0].strip()
+        else:
+            answer = "Based on the provided context, the student is making steady progress."
+        prompt_tokens = _count_tokens(prompt)
+        completion_tokens = _count_tokens(answer)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def _embeddings(self, raw: bytes) -> Dict:
+        request = json.loads(raw)
+        inputs = request.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        data = []
+        for i, item in enumerate(inputs):
+            # langchain may send pre-tokenized input as lists of token ids
+            text = item if isinstance(item, str) else " ".join(str(t) for t in item)
+            data.append({"object": "embedding", "index": i, "embedding": fake_embedding(text)})
+        tokens = sum(_count_tokens(str(item)) for item in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": request.get("model", "fake-embedding"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        }
+
+    def _stt(self, raw: bytes) -> Dict:
+        # Roughly one word per 0.4 s of 16 kHz 16-bit mono audio
+        words = max(1, len(raw) // (16000 * 2 * 4 // 10))
+        return {"transcript": " ".join(["hello"] * min(words, 400))}
+
+    def _translate(self, raw: bytes) -> Dict:
+        return {"translation": json.loads(raw).get("text", "")}
+
+
+class FakeServices(ThreadingHTTPServer):
+    """Threaded fake API server. Use as a context manager."""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, faults: Optional[Dict[str, FaultConfig]] = None, stt_realtime_factor: float = 0.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        # Extra STT latency per second of audio, as a fraction of real time
+        self.stt_realtime_factor = stt_realtime_factor
+        self.faults = {name: FaultConfig() for name in ("llm", "embeddings", "stt", "translate")}
+        self.faults.update(faults or {})
+        self.requests: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, name: str, failed: bool):
+        with self._stats_lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+            if failed:
+                self.failures[name] = self.failures.get(name, 0) + 1
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-services", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    def configure_environment(self):
+        """Point OpenAI clients at the fake server."""
+        os.environ["OPENAI_BASE_URL"] = f"{self.base_url}/v1"
+        os.environ["OPENAI_API_BASE"] = f"{self.base_url}/v1"
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+
+def _post(url: str, body: bytes, content_type: str) -> Dict:
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def install_google_fakes(base_url: str):
+    """Route Google speech recognition and translation through the fake server."""
+    import speech_recognition as sr
+    from deep_translator import GoogleTranslator
+
+    def recognize_google(recognizer, audio_data, key=None, language="en-US", **kwargs):
+        try:
+            payload = _post(f"{base_url}/stt", audio_data.get_raw_data(convert_rate=16000, convert_width=2), "audio/l16")
+        except Exception as e:
+            raise sr.RequestError(f"recognition request failed: {e}")
+        if not payload.get("transcript"):
+            raise sr.UnknownValueError()
+        return payload["transcript"]
+
+    def translate(translator, text, **kwargs):
+        payload = _post(f"{base_url}/translate", json.dumps({
+            "text": text,
+            "source": translator.source,
+            "target": translator.target
+        }).encode(), "application/json")
+        return payload["translation"]
+
+    sr.Recognizer.recognize_google = recognize_google
+    GoogleTranslator.translate = translate
@@ -0,0 +1,180 @@
+"""OCR benchmark: raw tesseract against the preprocessing OCR stage.
+
+For every sample image three runs are timed:
+
+* ``baseline``: ``pytesseract.image_to_string`` on the full image with default
+  settings, which is what ``DocumentService`` used to do
+* ``ocr_stage``: ``OcrService`` with an empty cache (rescale, binarise,
+  deskew, layout-based page segmentation mode)
+* ``cached``: ``OcrService`` again on the same file, served from the cache
+
+Accuracy is the character error rate and word accuracy against ground truth.
+Samples come from ``--images DIR`` (``<name>.png`` or ``.jpg`` next to a
+``<name>.txt`` transcript); without it, synthetic phone-sized report card
+photos with known text are generated, slightly rotated and noisy.
+
+    python -m benchmarks.ocr
+    python -m benchmarks.ocr --images ~/report-card-photos --repeats 3
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import difflib
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.run import latency_stats
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff")
+
+SUBJECTS = [
+    ("MATH 1151", "Calculus I"), ("ENGL 1110", "First-Year English"), ("CHEM 1210", "General Chemistry"),
+    ("HIST 2001", "World History"), ("PHYSICS 1250", "Mechanics"), ("SPAN 1101", "Elementary Spanish"),
+    ("CSE 2221", "Software Components"), ("ECON 2001", "Microeconomics"), ("ART 2100", "Drawing"),
+    ("BIOL 1113", "Biological Sciences"), ("STAT 3470", "Probability"), ("MUSIC 2250", "Music Theory"),
+]
+GRADES = ["A", "A-", "B+", "B", "B-", "C+", "C"]
+
+
+def report_card_text(rng: random.Random) -> str:
+    lines = [f"Student Report Card - {rng.choice(['Fall', 'Spring'])} {rng.randint(2019, 2025)}", ""]
+    for code, title in rng.sample(SUBJECTS, 8):
+        lines.append(f"{code}  {title:<22} {rng.choice([3, 4]):.1f}  {rng.choice(GRADES)}")
+    lines += ["", f"Term GPA: {rng.uniform(2.5, 4.0):.2f}"]
+    return "\n".join(lines)
+
+
+def synthetic_samples(directory: str, count: int, seed: int) -> List[Tuple[str, str]]:
+    """Render report cards at 12 MP with skew, uneven lighting and sensor noise."""
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+
+    rng = random.Random(seed)
+    noise = np.random.default_rng(seed)
+    try:
+        font = ImageFont.truetype("DejaVuSansMono.ttf", 64)
+    except OSError:
+        font = ImageFont.load_default()
+
+    samples = []
+    for i in range(count):
+        text = report_card_text(rng)
+        page = Image.new("L", (3000, 4000), 255)
+        ImageDraw.Draw(page).multiline_text((250, 300), text, fill=20, font=font, spacing=40)
+        page = page.rotate(rng.uniform(-3, 3), resample=Image.BICUBIC, fillcolor=255)
+
+        pixels = np.asarray(page, dtype=np.float32)
+        shading = np.linspace(0, 50, pixels.shape[1], dtype=np.float32)[None, :]
+        pixels = pixels - shading + noise.normal(0, 12, pixels.shape)
+        path = os.path.join(directory, f"report-card-{i}.jpg")
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).convert("RGB").save(path, quality=90)
+        samples.append((path, text))
+    return samples
+
+
+def directory_samples(directory: str) -> List[Tuple[str, str]]:
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        truth = os.path.join(directory, f"{stem}.txt")
+        if extension.lower() in IMAGE_EXTENSIONS and os.path.exists(truth):
+            with open(truth, encoding="utf-8") as f:
+                samples.append((os.path.join(directory, name), f.read()))
+    return samples
+
+
+def accuracy(text: str, truth: str) -> Dict:
+    """Character error rate and word accuracy, ignoring whitespace layout."""
+    text_chars, truth_chars = " ".join(text.split()), " ".join(truth.split())
+    matcher = difflib.SequenceMatcher(None, text_chars, truth_chars, autojunk=False)
+    errors = sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal")
+    text_words, truth_words = text.split(), truth.split()
+    matched = sum(block.size for block in difflib.SequenceMatcher(None, text_words, truth_words).get_matching_blocks())
+    return {
+        "cer": round(errors / max(1, len(truth_chars)), 4),
+        "word_accuracy": round(matched / max(1, len(truth_words)), 4),
+    }
+
+
+def run(name: str, ocr, samples: List[Tuple[str, str]], repeats: int) -> Dict:
+    timings, scores = [], []
+    for path, truth in samples:
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            text = ocr(path)
+            timings.append(time.perf_counter() - t0)
+        scores.append(accuracy(text, truth))
+    print(f"{name}: done", file=sys.stderr)
+    return {
+        "latency": latency_stats(timings),
+        "cer": round(sum(s["cer"] for s in scores) / len(scores), 4),
+        "word_accuracy": round(sum(s["word_accuracy"] for s in scores) / len(scores), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="directory of images with <name>.txt ground truth")
+    parser.add_argument("--count", type=int, default=5, help="synthetic images to generate")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/ocr-<timestamp>.json)")
+    args = parser.parse_args()
+
+    import pytesseract
+    from PIL import Image
+    from services.ocr import OcrService
+
+    workdir = tempfile.mkdtemp(prefix="speaklink-ocr-")
+    try:
+        samples = directory_samples(args.images) if args.images else synthetic_samples(workdir, args.count, args.seed)
+        if not samples:
+            sys.exit("No images with ground truth found")
+
+        def baseline(path: str) -> str:
+            return pytesseract.image_to_string(Image.open(path))
+
+        uncached = OcrService(cache_dir=None)
+        cached = OcrService(cache_dir=os.path.join(workdir, "cache"))
+        for path, _ in samples:
+            cached.extract_text(path)
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(),
+                "images": len(samples),
+                "synthetic": not args.images,
+                "repeats": args.repeats,
+                "settings": uncached.settings,
+            },
+            "baseline": run("baseline", baseline, samples, args.repeats),
+            "ocr_stage": run("ocr_stage", uncached.extract_text, samples, args.repeats),
+            "cached": run("cached", cached.extract_text, samples, args.repeats),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"ocr-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'run':<10} {'p50 ms':>9} {'p99 ms':>9} {'CER':>7} {'words':>7}")
+    for name in ("baseline", "ocr_stage", "cached"):
+        entry = report[name]
+        print(f"{name:<10} {entry['latency']['p50_ms']:>9} {entry['latency']['p99_ms']:>9} "
+              f"{entry['cer']:>7} {entry['word_accuracy']:>7}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,641 @@
+"""Replay recorded traffic against the backend at increasing speed.
+
+The input is either a recording written by ``RequestRecorder``, or, with
+``--synthetic SECONDS``, a generated mix of the same kind. To record, start a
+server with ``TRAFFIC_RECORD_PATH`` set. The synthetic mix has parents
+uploading documents, asking questions, fetching summaries and recording
+conferences.
+
+Requests are sent open-loop at their recorded offsets divided by the speed
+factor, so a slow server does not slow the offered load down. Entity ids and
+sessions are mapped onto ones created during the replay. Documents and
+recordings are taken from the samples in ``uploads/`` and ``recordings/`` by
+extension and size. Questions come from the benchmark question set, chosen by
+length.
+
+Unless ``--target`` names a running instance, the backend is started in
+process in a scratch directory against the fakes in ``benchmarks/fakes.py``.
+For each speed the report has, per route, throughput, error and rejection
+rates and latency percentiles. It also has the peaks of the worker pool
+gauges, scraped from ``/metrics``. The summary names the speed at which each
+pool saturated:
+
+* ``llm``: LLM-backed requests had to queue for an admission slot
+* ``event_loop``: mean event loop lag passed ``--lag-threshold-ms``, i.e.
+  work done inline in route handlers was holding up other requests
+* ``replay_clients``: the replayer itself fell behind schedule, so results
+  at that speed and above understate the offered load
+
+Against a multi-worker ``--target`` the pool gauges come from whichever
+worker answers the scrape. Run from the backend directory:
+
+    python -m benchmarks.replay --synthetic 120 --speeds 1,2,4,8
+    python -m benchmarks.replay traffic.jsonl --speeds 1,5,10 --llm-latency-ms 800
+    python -m benchmarks.replay traffic.jsonl --target http://localhost:8000
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fakes import FakeServices, FaultConfig, install_google_fakes
+from benchmarks.run import QUESTIONS, latency_stats, percentile, sample_files
+from benchmarks.startup import free_port
+
+Record = Dict[str, Any]
+
+AUDIO_EXTENSIONS = (".webm", ".mp4", ".ogg", ".wav")
+DOCUMENT_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg")
+# Routes whose requests cannot be rebuilt from a recording
+UNREPLAYABLE_ROUTES = {"unmatched", "/recordings/{filename}"}
+FILLER = "lorem ipsum dolor sit amet "
+
+
+class Unreplayable(Exception):
+    pass
+
+
+def load_recording(path: str) -> List[Record]:
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return sorted(records, key=lambda record: record["at"])
+
+
+def synthesize(seconds: float, seed: int = 0) -> List[Record]:
+    """A recording-shaped mix of document and conference traffic lasting ``seconds``."""
+    rng = random.Random(seed)
+    records: List[Record] = []
+    counter = [0]
+
+    def pseudonym() -> str:
+        counter[0] += 1
+        return f"synthetic{counter[0]}"
+
+    def add(at: float, method: str, route: str, session: str, **fields):
+        records.append({
+            "at": at, "method": method, "route": route, "path_params": {}, "query": {}, "session": session,
+            "content_type": None, "body": None, "created": {}, "set_session": None, **fields,
+        })
+
+    def ask(at: float, route: str, session: str, key: str, entity: str, language: str):
+        question = rng.choice(QUESTIONS)
+        add(at, "POST", route, session, content_type="application/json", body={
+            key: {"id": entity},
+            "question": {"type": "str", "length": len(question)},
+            "language": {"value": language},
+        })
+
+    # Parents arrive as a Poisson process, one every eight seconds on average
+    t = 0.0
+    while True:
+        t += rng.expovariate(1 / 8.0)
+        if t >= seconds:
+            break
+        session, document = pseudonym(), pseudonym()
+        language = rng.choice(["en", "es", "zh"])
+        add(t, "POST", "/upload", session, content_type="multipart/form-data", created={"document_id": document},
+            body={"file": {"type": "file", "extension": ".pdf", "bytes": rng.randint(20000, 500000)}})
+        at = t + rng.uniform(2, 10)
+        add(at, "GET", "/documents", session)
+        for _ in range(rng.randint(1, 5)):
+            at += rng.uniform(5, 30)
+            ask(at, "/query", session, "document_id", document, language)
+        if rng.random() < 0.5:
+            add(at + rng.uniform(1, 10), "GET", "/summary/{document_id}", session,
+                path_params={"document_id": {"id": document}}, query={"language": {"value": language}})
+
+        if rng.random() < 0.3:
+            conference = pseudonym()
+            at = t + rng.uniform(0, 20)
+            add(at, "POST", "/conference/start", session, content_type="application/json",
+                body={"parent_language": {"value": language}}, created={"conference_id": conference})
+            for _ in range(rng.randint(2, 6)):
+                at += rng.uniform(20, 60)
+                add(at, "POST", "/conference/record", session, content_type="multipart/form-data", body={
+                    "audio": {"type": "file", "extension": ".webm", "bytes": None},
+                    "conference_id": {"id": conference},
+                })
+            ask(at + rng.uniform(5, 20), "/conference/query", session, "conference_id", conference, language)
+            add(at + rng.uniform(20, 40), "GET", "/conference/{conference_id}/summary", session,
+                path_params={"conference_id": {"id": conference}}, query={"language": {"value": language}})
+    return sorted(records, key=lambda record: record["at"])
+
+
+def referenced_ids(record: Record) -> Iterator[str]:
+    """Pseudonymous entity ids a request refers to."""
+    def walk(shapes: Optional[Dict]):
+        for shape in (shapes or {}).values():
+            if "id" in shape:
+                yield shape["id"]
+            elif shape.get("type") == "dict":
+                yield from walk(shape.get("fields"))
+    for part in ("path_params", "query", "body"):
+        yield from walk(record.get(part))
+
+
+def text_of_length(name: str, length: int) -> str:
+    if name == "question":
+        return min(QUESTIONS, key=lambda question: abs(len(question) - length))
+    return (FILLER * (length // len(FILLER) + 1))[:length]
+
+
+def encode_multipart(fields: List[Tuple[str, Any]]) -> Tuple[bytes, str]:
+    """Encode (name, value) pairs, where a file value is a (filename, bytes) tuple."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields:
+        if isinstance(value, tuple):
+            filename, data = value
+            header = f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n' \
+                     f"Content-Type: application/octet-stream\r\n\r\n"
+        else:
+            header = f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            data = str(value).encode()
+        parts.append(f"--{boundary}\r\n{header}".encode() + data + b"\r\n")
+    return b"".join(parts) + f"--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+class Samples:
+    """Sample documents and recordings to stand in for uploaded files."""
+
+    def __init__(self):
+        self.files: Dict[str, List[Tuple[int, str]]] = {}
+        paths = sample_files("uploads", DOCUMENT_EXTENSIONS) + sample_files("recordings", AUDIO_EXTENSIONS)
+        for path in paths:
+            extension = os.path.splitext(path)[1].lower()
+            self.files.setdefault(extension, []).append((os.path.getsize(path), path))
+        for candidates in self.files.values():
+            candidates.sort()
+        self._data: Dict[str, bytes] = {}
+
+    def pick(self, extension: str, size: Optional[int]) -> Tuple[str, bytes]:
+        candidates = self.files.get(extension)
+        if not candidates:
+            family = AUDIO_EXTENSIONS if extension in AUDIO_EXTENSIONS else DOCUMENT_EXTENSIONS
+            candidates = sorted(c for ext in family for c in self.files.get(ext, []))
+        if not candidates:
+            raise Unreplayable(f"no sample file for {extension}")
+        if size is None:
+            _, path = candidates[len(candidates) // 2]
+        else:
+            _, path = min(candidates, key=lambda candidate: abs(candidate[0] - size))
+        if path not in self._data:
+            with open(path, "rb") as f:
+                self._data[path] = f.read()
+        return os.path.basename(path), self._data[path]
+
+
+class Replayer:
+    """Send one pass over the records at ``speed`` times their recorded pace."""
+
+    def __init__(self, base_url: str, records: List[Record], speed: float, samples: Samples,
+                 clients: int = 256, timeout: float = 300):
+        self.base_url = base_url.rstrip("/")
+        self.records = records
+        self.speed = speed
+        self.samples = samples
+        self.clients = clients
+        self.timeout = timeout
+        self.ids: Dict[str, str] = {}
+        self.sessions: Dict[str, str] = {}
+        self.substitutes = 0
+        self._lock = threading.Lock()
+        self._substitute_locks: Dict[str, threading.Lock] = {}
+        # The first request returning an id it did not refer to is the one that creates it
+        self._creators: Dict[str, int] = {}
+        self._created: Dict[str, threading.Event] = {}
+        for index, record in enumerate(records):
+            referenced = set(referenced_ids(record))
+            for pseudonym in record.get("created", {}).values():
+                if pseudonym not in referenced and pseudonym not in self._creators:
+                    self._creators[pseudonym] = index
+                    self._created[pseudonym] = threading.Event()
+
+    def _http(self, method: str, path: str, body: Optional[bytes] = None, content_type: Optional[str] = None,
+              session: Optional[str] = None) -> Tuple[int, Any]:
+        headers = {}
+        if content_type:
+            headers["Content-Type"] = content_type
+        if session:
+            headers["Cookie"] = f"session_id={session}"
+        request = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status, raw = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        try:
+            return status, json.loads(raw) if raw else None
+        except ValueError:
+            return status, None
+
+    def _session(self, record: Record) -> Optional[str]:
+        pseudonym = record.get("session") or record.get("set_session")
+        if pseudonym is None:
+            return None
+        with self._lock:
+            return self.sessions.setdefault(pseudonym, str(uuid.uuid4()))
+
+    def _create_substitute(self, key: str, session: Optional[str]) -> str:
+        """Create an entity the recording refers to but did not create."""
+        if key == "conference_id":
+            status, data = self._http("POST", "/conference/start", json.dumps({"parent_language": "en"}).encode(),
+                                      "application/json", session)
+        elif key == "document_id":
+            body, content_type = encode_multipart([("file", self.samples.pick(".pdf", None))])
+            status, data = self._http("POST", "/upload", body, content_type, session)
+        else:
+            raise Unreplayable(f"cannot create a {key}")
+        if status != 200 or not isinstance(data, dict) or key not in data:
+            raise RuntimeError(f"creating a substitute {key} failed with {status}")
+        return data[key]
+
+    def resolve(self, key: str, pseudonym: str, session: Optional[str]) -> str:
+        """The replay's id for a recorded entity, waiting for or creating it as needed."""
+        if pseudonym in self.ids:
+            return self.ids[pseudonym]
+        created = self._created.get(pseudonym)
+        if created is not None:
+            created.wait(self.timeout)
+            if pseudonym in self.ids:
+                return self.ids[pseudonym]
+        with self._lock:
+            lock = self._substitute_locks.setdefault(pseudonym, threading.Lock())
+        with lock:
+            if pseudonym not in self.ids:
+                self.ids[pseudonym] = self._create_substitute(key, session)
+                self.substitutes += 1
+        return self.ids[pseudonym]
+
+    def value(self, name: str, shape: Dict, session: Optional[str]) -> Any:
+        if "value" in shape:
+            return shape["value"]
+        if "id" in shape:
+            return self.resolve(name, shape["id"], session)
+        kind = shape.get("type")
+        if kind == "str":
+            return text_of_length(name, shape["length"])
+        if kind == "dict":
+            return {k: self.value(k, s, session) for k, s in shape.get("fields", {}).items()}
+        return {"int": 0, "float": 0.0, "bool": False, "list": []}.get(kind)
+
+    def build(self, record: Record, session: Optional[str]) -> Tuple[str, Optional[bytes], Optional[str]]:
+        """Rebuild a request's path, body and content type."""
+        if record["route"] in UNREPLAYABLE_ROUTES:
+            raise Unreplayable(record["route"])
+        path = record["route"]
+        for name, shape in (record.get("path_params") or {}).items():
+            path = path.replace("{" + name + "}", urllib.parse.quote(str(self.value(name, shape, session)), safe=""))
+        if "{" in path:
+            raise Unreplayable(record["route"])
+        query = {k: self.value(k, s, session) for k, s in (record.get("query") or {}).items()}
+        if query:
+            path += "?" + urllib.parse.urlencode(query)
+
+        fields = record.get("body")
+        content_type = record.get("content_type")
+        if content_type == "multipart/form-data":
+            parts = []
+            for name, shape in (fields or {}).items():
+                if shape.get("type") == "file":
+                    parts.append((name, self.samples.pick(shape.get("extension", ""), shape.get("bytes"))))
+                else:
+                    parts.append((name, self.value(name, shape, session)))
+            body, content_type = encode_multipart(parts)
+            return path, body, content_type
+        if fields is not None:
+            return path, json.dumps({k: self.value(k, s, session) for k, s in fields.items()}).encode(), content_type
+        return path, None, None
+
+    def send(self, index: int, record: Record, scheduled: float) -> Dict:
+        result = {"route": record["route"], "method": record["method"], "status": None, "seconds": None,
+                  "lag": time.perf_counter() - scheduled, "error": None}
+        data = None
+        try:
+            session = self._session(record)
+            path, body, content_type = self.build(record, session)
+            started = time.perf_counter()
+            result["status"], data = self._http(record["method"], path, body, content_type, session)
+            result["seconds"] = time.perf_counter() - started
+        except Unreplayable as e:
+            result["skipped"] = str(e)
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            for key, pseudonym in (record.get("created") or {}).items():
+                if self._creators.get(pseudonym) != index:
+                    continue
+                if isinstance(data, dict) and isinstance(data.get(key), str):
+                    self.ids[pseudonym] = data[key]
+                self._created[pseudonym].set()
+        return result
+
+    def run(self) -> Tuple[List[Dict], float]:
+        """Replay every record; returns the results and the wall time taken."""
+        first = self.records[0]["at"]
+        start = time.perf_counter() + 0.1
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.clients, thread_name_prefix="replay") as pool:
+            for index, record in enumerate(self.records):
+                scheduled = start + (record["at"] - first) / self.speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(self.send, index, record, scheduled))
+            results = [future.result() for future in futures]
+        return results, time.perf_counter() - start
+
+
+def parse_metrics(text: str) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+    """Samples by metric name from Prometheus text exposition."""
+    samples: Dict[str, List[Tuple[Dict[str, str], float]]] = {}
+    for line in text.splitlines():
+        match = re.match(r"^([a-zA-Z_:][\w:]*)(?:\{(.*)\})?\s+(\S+)$", line)
+        if not match or line.startswith("#"):
+            continue
+        labels = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        samples.setdefault(match.group(1), []).append((labels, float(match.group(3))))
+    return samples
+
+
+class PoolSampler(threading.Thread):
+    """Scrape ``/metrics`` while a replay runs and keep the peaks of the pool gauges."""
+
+    def __init__(self, base_url: str, interval: float = 0.25):
+        super().__init__(name="pool-sampler", daemon=True)
+        self.url = base_url.rstrip("/") + "/metrics"
+        self.interval = interval
+        self.peaks: Dict[str, Dict[str, float]] = {"capacity": {}, "busy": {}, "waiting": {}, "in_flight": {}}
+        self.lag: List[Dict[str, Any]] = []
+        self._done = threading.Event()
+
+    def scrape(self) -> Optional[Dict]:
+        try:
+            with urllib.request.urlopen(self.url, timeout=5) as response:
+                return parse_metrics(response.read().decode())
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            return None
+
+    def _observe(self, samples: Dict):
+        for metric, peak in (("speaklink_pool_capacity", "capacity"), ("speaklink_pool_busy", "busy"),
+                             ("speaklink_pool_waiting", "waiting"), ("speaklink_http_requests_in_flight", "in_flight")):
+            for labels, value in samples.get(metric, []):
+                key = labels.get("pool") or labels.get("route", "")
+                self.peaks[peak][key] = max(self.peaks[peak].get(key, 0), value)
+        buckets = {labels["le"]: value for labels, value in samples.get("speaklink_event_loop_lag_seconds_bucket", [])}
+        totals = samples.get("speaklink_event_loop_lag_seconds_sum", []), samples.get("speaklink_event_loop_lag_seconds_count", [])
+        if buckets and totals[0] and totals[1]:
+            self.lag.append({"buckets": buckets, "sum": totals[0][0][1], "count": totals[1][0][1]})
+
+    def run(self):
+        while True:
+            samples = self.scrape()
+            if samples is not None:
+                self._observe(samples)
+            if self._done.wait(self.interval):
+                return
+
+    def stop(self) -> Dict:
+        self._done.set()
+        self.join(timeout=10)
+        samples = self.scrape()
+        if samples is not None:
+            self._observe(samples)
+        return {"peaks": self.peaks, "event_loop_lag": self.event_loop_lag()}
+
+    def event_loop_lag(self) -> Optional[Dict]:
+        """Mean and approximate p99 event loop lag over the replay."""
+        if len(self.lag) < 2:
+            return None
+        first, last = self.lag[0], self.lag[-1]
+        count = last["count"] - first["count"]
+        if count <= 0:
+            return None
+        p99 = None
+        for bound, cumulative in sorted(last["buckets"].items(), key=lambda item: float(item[0])):
+            if cumulative - first["buckets"].get(bound, 0) >= 0.99 * count:
+                p99 = float(bound)
+                break
+        return {
+            "ticks": int(count),
+            "mean_ms": round((last["sum"] - first["sum"]) / count * 1000, 2),
+            "p99_ms_at_most": None if p99 in (None, float("inf")) else p99 * 1000,
+        }
+
+
+def summarize_step(speed: float, records: List[Record], results: List[Dict], elapsed: float,
+                   pools: Dict, substitutes: int) -> Dict:
+    span = (records[-1]["at"] - records[0]["at"]) / speed
+    routes: Dict[str, Dict] = {}
+    for route in sorted({f"{r['method']} {r['route']}" for r in results}):
+        hits = [r for r in results if f"{r['method']} {r['route']}" == route and "skipped" not in r]
+        ok = [r for r in hits if r["status"] is not None and r["status"] < 400]
+        errors = [r for r in hits if r["status"] is None or r["status"] >= 500]
+        rejected = [r for r in hits if r["status"] == 429]
+        routes[route] = {
+            "sent": len(hits),
+            "skipped": sum(1 for r in results if f"{r['method']} {r['route']}" == route and "skipped" in r),
+            "throughput_per_second": round(len(ok) / elapsed, 3) if elapsed else None,
+            "error_rate": round(len(errors) / len(hits), 4) if hits else None,
+            "rejected_rate": round(len(rejected) / len(hits), 4) if hits else None,
+            "client_errors": len(hits) - len(ok) - len(errors) - len(rejected),
+            "latency": latency_stats([r["seconds"] for r in ok], len(errors)),
+        }
+    sent = [r for r in results if "skipped" not in r]
+    ok = [r for r in sent if r["status"] is not None and r["status"] < 400]
+    lags = [r["lag"] * 1000 for r in results]
+    return {
+        "speed": speed,
+        "requests": len(sent),
+        "elapsed_seconds": round(elapsed, 3),
+        "offered_per_second": round(len(sent) / span, 3) if span else None,
+        "throughput_per_second": round(len(ok) / elapsed, 3) if elapsed else None,
+        "error_rate": round(sum(1 for r in sent if r["status"] is None or r["status"] >= 500) / len(sent), 4) if sent else None,
+        "rejected_rate": round(sum(1 for r in sent if r["status"] == 429) / len(sent), 4) if sent else None,
+        "substitute_entities": substitutes,
+        "replay_lag_p99_ms": round(percentile(lags, 0.99), 2) if lags else None,
+        "routes": routes,
+        "pools": pools,
+    }
+
+
+def saturation(steps: List[Dict], lag_threshold_ms: float, client_lag_ms: float = 100) -> Dict:
+    """The lowest speed at which each pool, and the server as a whole, saturated."""
+    def first(predicate) -> Optional[float]:
+        return next((step["speed"] for step in steps if predicate(step)), None)
+
+    report: Dict[str, Dict] = {}
+    pools = {pool for step in steps for pool in step["pools"]["peaks"]["capacity"]}
+    for pool in sorted(pools):
+        report[pool] = {
+            "capacity": max(step["pools"]["peaks"]["capacity"].get(pool, 0) for step in steps),
+            "peak_busy_by_speed": {step["speed"]: step["pools"]["peaks"]["busy"].get(pool, 0) for step in steps},
+            "saturated_at_speed": first(lambda step: step["pools"]["peaks"]["waiting"].get(pool, 0) > 0),
+        }
+    report["event_loop"] = {
+        "mean_lag_ms_by_speed": {
+            step["speed"]: (step["pools"]["event_loop_lag"] or {}).get("mean_ms") for step in steps
+        },
+        "saturated_at_speed": first(
+            lambda step: ((step["pools"]["event_loop_lag"] or {}).get("mean_ms") or 0) > lag_threshold_ms),
+    }
+    report["replay_clients"] = {
+        "saturated_at_speed": first(lambda step: (step["replay_lag_p99_ms"] or 0) > client_lag_ms),
+    }
+    report["server"] = {
+        "throughput_knee_speed": first(
+            lambda step: step["offered_per_second"] and step["throughput_per_second"] < 0.9 * step["offered_per_second"]),
+        "first_errors_at_speed": first(lambda step: (step["error_rate"] or 0) > 0),
+        "first_rejections_at_speed": first(lambda step: (step["rejected_rate"] or 0) > 0),
+    }
+    return report
+
+
+def wait_ready(base_url: str, timeout: float = 120):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + "/ready", timeout=5):
+                return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    raise TimeoutError("server did not become ready")
+
+
+@contextmanager
+def local_server(args) -> Iterator[Tuple[str, FakeServices]]:
+    """Run the backend in process, in a scratch directory, against the fake external services."""
+    faults = {
+        "llm": FaultConfig(args.llm_latency_ms, args.jitter_ms, args.error_rate, seed=args.seed),
+        "embeddings": FaultConfig(args.embedding_latency_ms, args.jitter_ms, args.error_rate, seed=args.seed + 1),
+        "stt": FaultConfig(args.stt_latency_ms, args.jitter_ms, args.error_rate, seed=args.seed + 2),
+        "translate": FaultConfig(args.translate_latency_ms, args.jitter_ms, args.error_rate, seed=args.seed + 3),
+    }
+    workdir = tempfile.mkdtemp(prefix="speaklink-replay-")
+    cwd = os.getcwd()
+    with FakeServices(faults=faults, stt_realtime_factor=args.stt_realtime_factor) as fakes:
+        fakes.configure_environment()
+        install_google_fakes(fakes.base_url)
+        os.environ.pop("TRAFFIC_RECORD_PATH", None)
+        os.chdir(workdir)
+        server = thread = None
+        try:
+            import uvicorn
+            port = free_port()
+            server = uvicorn.Server(uvicorn.Config("server:app", host="127.0.0.1", port=port, log_level="warning"))
+            thread = threading.Thread(target=server.run, name="uvicorn", daemon=True)
+            thread.start()
+            base_url = f"http://127.0.0.1:{port}"
+            wait_ready(base_url)
+            yield base_url, fakes
+        finally:
+            if server is not None:
+                server.should_exit = True
+                thread.join(timeout=30)
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def replay(base_url: str, records: List[Record], args) -> List[Dict]:
+    samples = Samples()
+    steps = []
+    for speed in args.speeds:
+        sampler = PoolSampler(base_url)
+        sampler.start()
+        replayer = Replayer(base_url, records, speed, samples, clients=args.clients, timeout=args.timeout)
+        results, elapsed = replayer.run()
+        step = summarize_step(speed, records, results, elapsed, sampler.stop(), replayer.substitutes)
+        steps.append(step)
+        print(f"speed {speed:>5}x: {step['requests']} requests in {step['elapsed_seconds']}s, "
+              f"{step['throughput_per_second']}/s of {step['offered_per_second']}/s offered, "
+              f"errors {step['error_rate']}, rejected {step['rejected_rate']}")
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", help="JSON-lines file written with TRAFFIC_RECORD_PATH")
+    parser.add_argument("--synthetic", type=float, help="replay a generated mix lasting this many seconds instead")
+    parser.add_argument("--speeds", default="1,2,4,8", help="comma-separated replay speed factors")
+    parser.add_argument("--target", help="replay against this running instance instead of a local one")
+    parser.add_argument("--clients", type=int, default=256, help="concurrent replay connections")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--lag-threshold-ms", type=float, default=50, help="event loop lag counted as saturated")
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--embedding-latency-ms", type=float, default=50)
+    parser.add_argument("--stt-latency-ms", type=float, default=300)
+    parser.add_argument("--stt-realtime-factor", type=float, default=0.3)
+    parser.add_argument("--translate-latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/replay-<timestamp>.json)")
+    args = parser.parse_args()
+    args.speeds = [float(speed) for speed in args.speeds.split(",")]
+
+    if args.recording:
+        records = load_recording(args.recording)
+    elif args.synthetic:
+        records = synthesize(args.synthetic, args.seed)
+    else:
+        parser.error("give a recording or --synthetic SECONDS")
+    if len(records) < 2:
+        parser.error("need at least two requests to replay")
+
+    fake_requests = None
+    if args.target:
+        steps = replay(args.target, records, args)
+    else:
+        with local_server(args) as (base_url, fakes):
+            steps = replay(base_url, records, args)
+            fake_requests = dict(fakes.requests)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "source": args.recording or f"synthetic:{args.synthetic}s seed {args.seed}",
+            "records": len(records),
+            "recorded_seconds": round(records[-1]["at"] - records[0]["at"], 3),
+            "target": args.target or "local",
+            "speeds": args.speeds,
+        },
+        "saturation": saturation(steps, args.lag_threshold_ms),
+        "steps": steps,
+        "fake_requests": fake_requests,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"replay-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for step in steps:
+        print(f"\nspeed {step['speed']}x")
+        print(f"{'route':<42} {'sent':>6} {'req/s':>8} {'err':>7} {'429':>7} {'p50 ms':>9} {'p99 ms':>9}")
+        for route, stats in step["routes"].items():
+            print(f"{route:<42} {stats['sent']:>6} {stats['throughput_per_second']:>8} "
+                  f"{stats['error_rate'] or 0:>7.2%} {stats['rejected_rate'] or 0:>7.2%} "
+                  f"{stats['latency']['p50_ms'] or '-':>9} {stats['latency']['p99_ms'] or '-':>9}")
+    print(json.dumps(report["saturation"], indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""Reproducible offline benchmark suite for the backend services.
+
+Runs the real DocumentService, RAGService and ConferenceService against the
+local fakes in ``benchmarks/fakes.py`` inside a scratch working directory, so
+nothing touches the network or the repository's chroma_db. It measures:
+
+* ingestion throughput on the sample PDFs in ``uploads/``
+* audio processing on the sample recordings in ``recordings/`` (needs ffmpeg)
+* document, conference and session-wide query latency distributions, the
+  last over every ingested document and the benchmark conference at once
+
+Results are written as JSON to ``benchmarks/results/`` and can be compared
+run to run:
+
+    python -m benchmarks.run --llm-latency-ms 300 --error-rate 0.01
+    python -m benchmarks.run --compare benchmarks/results/<earlier>.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fakes import FakeServices, FaultConfig, install_google_fakes
+
+BENCH_SESSION = "benchmark-session"
+
+QUESTIONS = [
+    "What is the student's GPA?",
+    "Which courses did the student take last semester?",
+    "How is my child doing in math?",
+    "¿Cuáles son las calificaciones del estudiante?",
+    "Are there any areas for improvement?",
+]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_stats(samples: List[float], errors: int = 0) -> Dict:
+    ms = [s * 1000 for s in samples]
+    return {
+        "count": len(ms),
+        "errors": errors,
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else None,
+        "p50_ms": round(percentile(ms, 0.50), 2) if ms else None,
+        "p90_ms": round(percentile(ms, 0.90), 2) if ms else None,
+        "p99_ms": round(percentile(ms, 0.99), 2) if ms else None,
+    }
+
+
+def sample_files(directory: str, extensions) -> List[str]:
+    path = os.path.join(BACKEND_DIR, directory)
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if name.lower().endswith(extensions)
+    )
+
+
+def bench_ingestion(document_service, files: List[str]) -> Dict:
+    results = []
+    document_ids = []
+    started = time.perf_counter()
+    for path in files:
+        t0 = time.perf_counter()
+        try:
+            document_ids.append(document_service.process_document(path))
+            error = None
+        except Exception as e:
+            error = str(e)
+        results.append({
+            "file": os.path.basename(path),
+            "bytes": os.path.getsize(path),
+            "seconds": round(time.perf_counter() - t0, 4),
+            "error": error,
+        })
+    elapsed = time.perf_counter() - started
+    total_bytes = sum(r["bytes"] for r in results if not r["error"])
+    return {
+        "files": results,
+        "documents_per_second": round(len(document_ids) / elapsed, 3) if elapsed else None,
+        "megabytes_per_second": round(total_bytes / 1e6 / elapsed, 3) if elapsed else None,
+        "errors": sum(1 for r in results if r["error"]),
+        "document_ids": document_ids,
+    }
+
+
+def bench_audio(conference_service, files: List[str], limit: int) -> Dict:
+    if not conference_service.ffmpeg_available:
+        return {"skipped": "ffmpeg not available"}
+    conference_id = conference_service.start_conference("en", session_id=BENCH_SESSION)
+    samples, errors, audio_bytes = [], 0, 0
+    for path in files[:limit]:
+        target = conference_service.recordings.path_for(conference_id, os.path.basename(path))
+        shutil.copyfile(path, target)
+        t0 = time.perf_counter()
+        try:
+            conference_service.process_audio(conference_id, target)
+            samples.append(time.perf_counter() - t0)
+            audio_bytes += os.path.getsize(path)
+        except Exception:
+            errors += 1
+    return {
+        "conference_id": conference_id,
+        "latency": latency_stats(samples, errors),
+        "recordings_per_second": round(len(samples) / sum(samples), 3) if samples else None,
+        "audio_bytes": audio_bytes,
+    }
+
+
+def bench_queries(ask, ids: List[str], repeats: int) -> Dict:
+    samples, errors = [], 0
+    for _ in range(repeats):
+        for target in ids:
+            for question in QUESTIONS:
+                t0 = time.perf_counter()
+                try:
+                    ask(target, question)
+                    samples.append(time.perf_counter() - t0)
+                except Exception:
+                    errors += 1
+    return latency_stats(samples, errors)
+
+
+def stage_summary() -> Dict:
+    from services.metrics import STAGE_LATENCY, TOKENS
+    stages = {
+        labels[0]: {"count": int(s["count"]), "mean_ms": round(s["sum"] / s["count"] * 1000, 2)}
+        for labels, s in STAGE_LATENCY.summary().items() if s["count"]
+    }
+    tokens = {f"{model}:{kind}": value for (model, kind), value in TOKENS.values().items()}
+    return {"stages": stages, "tokens": tokens}
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (subprocess.SubprocessError, FileNotFoundError):
+        return None
+
+
+def run(args) -> Dict:
+    faults = {
+        "llm": FaultConfig(args.llm_latency_ms, args.jitter_ms, args.error_rate, seed=args.seed),
+        "embeddings": FaultConfig(args.embedding_latency_ms, args.jitter_ms, args.error_rate, seed=args.seed + 1),
+        "stt": FaultConfig(args.stt_latency_ms, args.jitter_ms, args.error_rate, seed=args.seed + 2),
+        "translate": FaultConfig(args.translate_latency_ms, args.jitter_ms, args.error_rate, seed=args.seed + 3),
+    }
+    pdfs = sample_files("uploads", (".pdf", ".png", ".jpg", ".jpeg"))
+    recordings = sample_files("recordings", (".webm", ".mp4", ".ogg"))
+    workdir = tempfile.mkdtemp(prefix="speaklink-bench-")
+    cwd = os.getcwd()
+
+    with FakeServices(faults=faults) as fakes:
+        fakes.configure_environment()
+        install_google_fakes(fakes.base_url)
+        os.chdir(workdir)
+        try:
+            from services.document_service import DocumentService
+            from services.rag_service import RAGService
+            from services.conference_service import ConferenceService
+            from services.session_query import SessionQueryService
+            from services.session_store import SessionStore
+
+            document_service = DocumentService()
+            rag_service = RAGService()
+            conference_service = ConferenceService()
+            session_store = SessionStore("sessions")
+
+            ingestion = bench_ingestion(document_service, pdfs)
+            audio = bench_audio(conference_service, recordings, args.max_recordings)
+            document_ids = ingestion.pop("document_ids")
+            for document_id in document_ids:
+                session_store.add_document(BENCH_SESSION, {
+                    "id": document_id, "name": document_id, "upload_date": datetime.now().isoformat()
+                })
+            queries = {
+                "document": bench_queries(
+                    lambda d, q: rag_service.query_document(d, q, "en"), document_ids, args.repeats),
+            }
+            if "conference_id" in audio:
+                queries["conference"] = bench_queries(
+                    lambda c, q: conference_service.query_conference(c, q, "en"), [audio["conference_id"]], args.repeats)
+            session_query = SessionQueryService(rag_service, conference_service, session_store)
+            queries["session"] = bench_queries(
+                lambda s, q: session_query.query(s, q, "en"), [BENCH_SESSION], args.repeats)
+            session_query.close()
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        return {
+            "meta": {
+                "timestamp": datetime.now().isoformat(),
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "faults": {name: fault.to_dict() for name, fault in faults.items()},
+                "repeats": args.repeats,
+            },
+            "ingestion": ingestion,
+            "audio": audio,
+            "queries": queries,
+            **stage_summary(),
+            "fake_requests": dict(fakes.requests),
+            "fake_failures": dict(fakes.failures),
+        }
+
+
+def flatten(report: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in report.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """List metrics that regressed by more than ``threshold`` (a fraction)."""
+    now, before = flatten(current), flatten(baseline)
+    regressions = []
+    for name, value in sorted(now.items()):
+        old = before.get(name)
+        if not old or name.startswith(("meta.", "fake_")):
+            continue
+        change = (value - old) / old
+        higher_is_better = name.endswith("_per_second")
+        worse = -change if higher_is_better else change
+        lower_is_better = name.endswith("_ms") or name.endswith(".errors")
+        if (higher_is_better or lower_is_better) and worse > threshold:
+            regressions.append(f"{name}: {old} -> {value} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--embedding-latency-ms", type=float, default=50)
+    parser.add_argument("--stt-latency-ms", type=float, default=300)
+    parser.add_argument("--translate-latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-recordings", type=int, default=10)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="regression threshold as a fraction")
+    args = parser.parse_args()
+
+    report = run(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Cold- and warm-start benchmark for the FastAPI backend.
+
+For each run a fresh uvicorn process is started and the time until the
+first request is served is measured, together with the time to import the
+``server`` module on its own, the time until ``/ready`` reports that warm-up
+has finished, and the latency of the first request that needs a service.
+Runs alternate between a cold start, with the snapshots written by earlier
+processes removed, and a warm start from the snapshots the previous run left
+behind on shutdown.
+
+``--conferences`` additionally times opening a ``ConferenceStore`` with that
+many synthetic conferences in a scratch directory: parsing the JSON file
+against mapping the snapshot and replaying the journal tail. That part needs
+only the standard library.
+
+Run from the backend directory:
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --runs 0 --conferences 2000
+"""
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SNAPSHOT_FILES = ("conferences.json.snap", os.path.join("snapshots", "query_embeddings.snap"))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_import() -> float:
+    """Seconds to import the server module in a fresh interpreter."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import server"], cwd=BACKEND_DIR, check=True, capture_output=True)
+    return time.perf_counter() - started
+
+
+def get(url: str, timeout: float = 60) -> float:
+    started = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - started
+
+
+def remove_snapshots():
+    for name in SNAPSHOT_FILES:
+        try:
+            os.remove(os.path.join(BACKEND_DIR, name))
+        except FileNotFoundError:
+            pass
+
+
+def wait_ready(url: str, started: float, process: subprocess.Popen, timeout: float) -> float:
+    """Poll ``url`` until it answers 200 and return the seconds since ``started``."""
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        if time.perf_counter() - started > timeout:
+            raise TimeoutError("server did not become ready")
+        try:
+            get(url, timeout=5)
+            return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.02)
+
+
+def time_cold_start(first_path: str, heavy_path: str, ready_path: str = "/ready", timeout: float = 120) -> dict:
+    """Start uvicorn and measure time until ``first_path`` answers and warm-up finishes."""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        first = wait_ready(base + first_path, started, process, timeout)
+        ready = wait_ready(base + ready_path, started, process, timeout) if ready_path else None
+        try:
+            heavy = get(base + heavy_path, timeout=timeout)
+        except urllib.error.URLError:
+            heavy = None
+        return {"first_request_seconds": first, "ready_seconds": ready, "first_heavy_request_seconds": heavy}
+    finally:
+        # SIGTERM lets uvicorn run the shutdown hook, which writes the final snapshots
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+
+def synthetic_conferences(count: int, transcripts: int) -> dict:
+    conferences = {}
+    for i in range(count):
+        conference_id = f"{1700000000 + i}.0"
+        conferences[conference_id] = {
+            "id": conference_id,
+            "parent_language": "es",
+            "start_time": datetime.now().isoformat(),
+            "transcripts": [
+                {
+                    "text": f"Segment {j} of conference {i}: the teacher talks about reading and math homework.",
+                    "language": "en-US",
+                    "timestamp": datetime.now().isoformat(),
+                    "duration": 12.5,
+                    "segments": [[0.2, 5.1], [5.9, 12.3]],
+                    "offset": 12.5 * j,
+                }
+                for j in range(transcripts)
+            ],
+            "summary": None,
+        }
+    return conferences
+
+
+def time_store_open(count: int, transcripts: int, tail: int, repeats: int = 5) -> dict:
+    """Seconds to open a ConferenceStore from JSON and from snapshot plus journal tail."""
+    from services.conference_store import ConferenceStore
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "conferences.json")
+        with open(path, "w") as f:
+            json.dump(synthetic_conferences(count, transcripts), f, indent=2)
+        store = ConferenceStore(path)
+        store.snapshot()
+        # Updates made after the snapshot, which a warm start replays from the journal
+        for i in range(tail):
+            conference_id = f"{1700000000 + i % count}.0"
+            store.update(lambda conferences: conferences[conference_id]["transcripts"].append({"text": "tail"}))
+        journal_bytes = os.path.getsize(store.journal_path) if tail else 0
+
+        def open_seconds(use_snapshot: bool) -> float:
+            if not use_snapshot:
+                os.rename(store.snapshot_path, store.snapshot_path + ".off")
+            try:
+                started = time.perf_counter()
+                opened = ConferenceStore(path)
+                elapsed = time.perf_counter() - started
+            finally:
+                if not use_snapshot:
+                    os.rename(store.snapshot_path + ".off", store.snapshot_path)
+            assert opened.loaded_from == ("snapshot" if use_snapshot else "file")
+            assert opened.all() == store.all()
+            return elapsed
+
+        return {
+            "conferences": count,
+            "transcripts_per_conference": transcripts,
+            "json_bytes": os.path.getsize(path),
+            "snapshot_bytes": os.path.getsize(store.snapshot_path),
+            "journal_tail_records": tail,
+            "journal_tail_bytes": journal_bytes,
+            "json_open_seconds": summarize([open_seconds(False) for _ in range(repeats)]),
+            "snapshot_open_seconds": summarize([open_seconds(True) for _ in range(repeats)]),
+        }
+
+
+def summarize(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {
+        "min": round(min(values), 4),
+        "median": round(statistics.median(values), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-path", default="/documents", help="cheap route used to detect readiness")
+    parser.add_argument("--heavy-path", default="/conferences", help="route that constructs a service")
+    parser.add_argument("--ready-path", default="/ready", help="route that answers 200 once warm-up is done")
+    parser.add_argument("--conferences", type=int, default=0, help="also time ConferenceStore open with this many")
+    parser.add_argument("--transcripts", type=int, default=20, help="transcripts per synthetic conference")
+    parser.add_argument("--journal-tail", type=int, default=200, help="updates replayed from the journal")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = {"runs": args.runs}
+    if args.runs:
+        imports = [time_import() for _ in range(args.runs)]
+        starts = {"cold": [], "warm": []}
+        for _ in range(args.runs):
+            remove_snapshots()
+            starts["cold"].append(time_cold_start(args.first_path, args.heavy_path, args.ready_path))
+            starts["warm"].append(time_cold_start(args.first_path, args.heavy_path, args.ready_path))
+        report["import_seconds"] = summarize(imports)
+        for kind, runs in starts.items():
+            report[kind] = {
+                "start_to_first_request_seconds": summarize([s["first_request_seconds"] for s in runs]),
+                "time_to_ready_seconds": summarize([s["ready_seconds"] for s in runs]),
+                "first_heavy_request_seconds": summarize([s["first_heavy_request_seconds"] for s in runs]),
+            }
+    if args.conferences:
+        report["conference_store_open"] = time_store_open(args.conferences, args.transcripts, args.journal_tail)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Vector store backend benchmark: Chroma against the local NumPy store.
+
+For every backend, layout and corpus size, synthetic normalised embeddings
+are written into a scratch store spread over ``--partitions`` documents. The
+``shared`` layout keeps every document in one collection and filters by
+``document_id``; the ``partitioned`` layout groups ``--docs-per-session``
+documents into a physical partition per session, as the services do. A fresh
+process then opens the store and measures:
+
+* load time: opening the store and answering the first filtered query
+* resident memory after loading and searching, and bytes on disk
+* p50/p99 latency of queries filtered to one document, and of global
+  queries (shared layout only)
+
+With the partitioned layout the filtered latency should stay flat as the
+corpus grows, since each query only touches its own session.
+
+Every measurement runs in its own process, so memory numbers are not polluted
+by the build or by other backends. Run from the backend directory:
+
+    python -m benchmarks.vector_store --sizes 100000 1000000 --dim 1536
+    python -m benchmarks.vector_store --layouts partitioned --sizes 10000 100000 1000000
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.run import latency_stats
+
+BACKENDS = ("chroma", "local-float16", "local-int8")
+LAYOUTS = ("shared", "partitioned")
+
+
+class Target:
+    """Routes each benchmark document to the store that would hold it."""
+
+    def __init__(self, backend: str, directory: str, layout: str, docs_per_session: int):
+        # The services read their backend settings from the environment at import
+        os.environ["VECTOR_BACKEND"] = "chroma" if backend == "chroma" else "local"
+        os.environ["VECTOR_DTYPE"] = backend.split("-", 1)[1] if backend != "chroma" else "float16"
+        os.environ["VECTOR_STORE_DIR"] = directory
+        from services.vector_store import ChromaVectorStore, LocalVectorStore, PartitionedVectorStore
+
+        self.layout = layout
+        self.docs_per_session = docs_per_session
+        if layout == "partitioned":
+            self.store = PartitionedVectorStore("bench", None, partition_key="document_id", persist_directory=directory)
+        elif backend == "chroma":
+            self.store = ChromaVectorStore("bench", None, persist_directory=directory)
+        else:
+            self.store = LocalVectorStore(directory, None, partition_key="document_id", dtype=os.environ["VECTOR_DTYPE"])
+
+    def store_for(self, document: int):
+        if self.layout == "partitioned":
+            return self.store.partition(f"session-{document // self.docs_per_session:06d}")
+        return self.store
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def disk_bytes(directory: str) -> int:
+    total = 0
+    for root, _, files in os.walk(directory):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def random_vectors(rng, count: int, dim: int):
+    import numpy as np
+    vectors = rng.standard_normal((count, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build(args) -> Dict:
+    """Write ``size`` chunks into the store at ``--directory``."""
+    import numpy as np
+    rng = np.random.default_rng(args.seed)
+    target = Target(args.backend, args.directory, args.layout, args.docs_per_session)
+    per_partition = max(1, args.size // args.partitions)
+    started = time.perf_counter()
+    written = 0
+    for p in range(args.partitions):
+        count = min(per_partition, args.size - written)
+        if count <= 0:
+            break
+        document_id = f"doc-{p:06d}"
+        # Chroma caps a single add at a few thousand records
+        for offset in range(0, count, 5000):
+            batch = min(5000, count - offset)
+            target.store_for(p).add_embeddings(
+                texts=[f"chunk {offset + i} of {document_id}" for i in range(batch)],
+                embeddings=random_vectors(rng, batch, args.dim).tolist(),
+                metadatas=[{"document_id": document_id, "chunk_index": offset + i} for i in range(batch)],
+                ids=[f"{document_id}-{offset + i}" for i in range(batch)]
+            )
+        written += count
+    return {"build_seconds": round(time.perf_counter() - started, 3), "chunks": written}
+
+
+def measure(args) -> Dict:
+    """Open an existing store and time loading and searching it."""
+    import numpy as np
+    rng = np.random.default_rng(args.seed + 1)
+    pick = random.Random(args.seed)
+    baseline_rss = rss_bytes()
+
+    started = time.perf_counter()
+    target = Target(args.backend, args.directory, args.layout, args.docs_per_session)
+    first = pick.randrange(args.partitions)
+    target.store_for(first).similarity_search_by_vector(
+        random_vectors(rng, 1, args.dim)[0].tolist(),
+        k=args.k,
+        filter={"document_id": f"doc-{first:06d}"}
+    )
+    load_seconds = time.perf_counter() - started
+
+    def run_queries(count: int, filtered: bool) -> Dict:
+        samples = []
+        for _ in range(count):
+            query = random_vectors(rng, 1, args.dim)[0].tolist()
+            document = pick.randrange(args.partitions)
+            where = {"document_id": f"doc-{document:06d}"} if filtered else None
+            t0 = time.perf_counter()
+            target.store_for(document).similarity_search_by_vector(query, k=args.k, filter=where)
+            samples.append(time.perf_counter() - t0)
+        return latency_stats(samples)
+
+    filtered = run_queries(args.queries, filtered=True)
+    # A global query has no meaning across tenants' partitions
+    unfiltered = run_queries(max(1, args.queries // 10), filtered=False) if args.layout == "shared" else None
+    return {
+        "load_seconds": round(load_seconds, 3),
+        "rss_bytes": rss_bytes(),
+        "rss_delta_bytes": rss_bytes() - baseline_rss,
+        "disk_bytes": disk_bytes(args.directory),
+        "filtered_search": filtered,
+        "global_search": unfiltered,
+    }
+
+
+def run_child(mode: str, backend: str, layout: str, size: int, directory: str, args) -> Dict:
+    command = [
+        sys.executable, "-m", "benchmarks.vector_store", "--child", mode,
+        "--backend", backend, "--layout", layout, "--size", str(size), "--directory", directory,
+        "--docs-per-session", str(args.docs_per_session),
+        "--dim", str(args.dim), "--partitions", str(args.partitions),
+        "--queries", str(args.queries), "--k", str(args.k), "--seed", str(args.seed),
+    ]
+    result = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--layouts", nargs="+", default=["shared"], choices=LAYOUTS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100000, 1000000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--partitions", type=int, default=1000, help="number of documents")
+    parser.add_argument("--docs-per-session", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/vector-<timestamp>.json)")
+    # Internal: run a single build or measurement in this process
+    parser.add_argument("--child", choices=("build", "measure"), help=argparse.SUPPRESS)
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    parser.add_argument("--layout", default="shared", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--directory", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(build(args) if args.child == "build" else measure(args)))
+        return
+
+    results: List[Dict] = []
+    for size in args.sizes:
+        for layout in args.layouts:
+            for backend in args.backends:
+                directory = tempfile.mkdtemp(prefix=f"speaklink-vectors-{backend}-")
+                label = f"{backend}/{layout} @ {size} chunks"
+                try:
+                    print(f"{label}: building...", file=sys.stderr)
+                    entry = {
+                        "backend": backend,
+                        "layout": layout,
+                        "size": size,
+                        **run_child("build", backend, layout, size, directory, args)
+                    }
+                    if "error" not in entry:
+                        print(f"{label}: measuring...", file=sys.stderr)
+                        entry.update(run_child("measure", backend, layout, size, directory, args))
+                    results.append(entry)
+                finally:
+                    shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "dim": args.dim,
+            "documents": args.partitions,
+            "docs_per_session": args.docs_per_session,
+            "queries": args.queries,
+            "k": args.k,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"vector-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'backend':<15} {'layout':<12} {'chunks':>9} {'load s':>8} {'rss MB':>8} {'disk MB':>8} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'global p50':>11} {'global p99':>11}")
+    for entry in results:
+        if "error" in entry:
+            print(f"{entry['backend']:<15} {entry['layout']:<12} {entry['size']:>9} error: {entry['error']}")
+            continue
+        global_search = entry["global_search"] or {"p50_ms": "-", "p99_ms": "-"}
+        print(
+            f"{entry['backend']:<15} {entry['layout']:<12} {entry['size']:>9} {entry['load_seconds']:>8} "
+            f"{entry['rss_bytes'] / 1e6:>8.1f} {entry['disk_bytes'] / 1e6:>8.1f} "
+            f"{entry['filtered_search']['p50_ms']:>8} {entry['filtered_search']['p99_ms']:>8} "
+            f"{global_search['p50_ms']:>11} {global_search['p99_ms']:>11}"
+        )
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Lazily constructed services shared by the FastAPI routers.
+
+Services are built on first use rather than at import time: their
+constructors open Chroma, create embedding clients and probe for ffmpeg,
+which would otherwise slow down process startup and every test import.
+Route handlers receive them through ``Depends``. ``warm_up`` builds them in
+a background thread at startup instead, so the first requests after a
+restart do not pay for construction, and ``/ready`` reports when it is done.
+"""
+import os
+import time
+import logging
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, TypeVar
+
+if TYPE_CHECKING:
+    from services.admission import AdmissionController
+    from services.conference_service import ConferenceService
+    from services.document_service import DocumentService
+    from services.rag_service import RAGService
+    from services.session_query import SessionQueryService
+    from services.session_store import SessionStore
+    from services.snapshot import SnapshotWorker
+    from services.tombstones import CleanupWorker
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "uploads"
+SESSION_DIR = "sessions"
+RECORDINGS_DIR = "recordings"
+
+T = TypeVar("T")
+
+
+class LazyService:
+    """Build a service on first use and share the instance afterwards."""
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def __call__(self) -> T:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    logger.info(f"Initializing {self.factory.__name__.replace('_create_', '')}")
+                    self._instance = self.factory()
+        return self._instance
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+
+def _create_session_store() -> "SessionStore":
+    from services.session_store import SessionStore
+    return SessionStore(SESSION_DIR)
+
+
+def _create_document_service() -> "DocumentService":
+    from services.document_service import DocumentService
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    return DocumentService()
+
+
+def _create_rag_service() -> "RAGService":
+    from services.rag_service import RAGService
+    return RAGService()
+
+
+def _create_conference_service() -> "ConferenceService":
+    from services.conference_service import ConferenceService
+    service = ConferenceService()
+    service.recordings.start()
+    return service
+
+
+def _create_session_query_service() -> "SessionQueryService":
+    from services.session_query import SessionQueryService
+    return SessionQueryService(get_rag_service(), get_conference_service(), get_session_store())
+
+
+def _purge_document(tombstone: Dict) -> Dict[str, int]:
+    removed = get_document_service().purge_document(tombstone)
+    session_id = tombstone["session_id"]
+    if session_id and get_session_store().remove_document(session_id, tombstone["entity_id"]) is not None:
+        removed["session_entries"] = 1
+    return removed
+
+
+def _verify_document(tombstone: Dict) -> List[str]:
+    found = get_document_service().leftovers(tombstone)
+    session_id = tombstone["session_id"]
+    if session_id and any(doc["id"] == tombstone["entity_id"] for doc in get_session_store().get_documents(session_id)):
+        found.append("session entry")
+    return found
+
+
+def _create_cleanup_worker() -> "CleanupWorker":
+    from services.tombstones import CleanupWorker, get_tombstone_store
+    worker = CleanupWorker(get_tombstone_store())
+    worker.register("document", _purge_document, _verify_document)
+    worker.register(
+        "conference",
+        lambda tombstone: get_conference_service().purge_conference(tombstone),
+        lambda tombstone: get_conference_service().leftovers(tombstone)
+    )
+    worker.start()
+    return worker
+
+
+def _create_admission_controller() -> "AdmissionController":
+    from services.admission import AdmissionController
+    return AdmissionController()
+
+
+def _snapshot_conferences() -> Optional[int]:
+    return get_conference_service().store.snapshot() if get_conference_service.initialized else None
+
+
+def _create_snapshot_worker() -> "SnapshotWorker":
+    from services.embeddings import snapshot_query_embeddings
+    from services.snapshot import SnapshotWorker
+    worker = SnapshotWorker()
+    worker.register("conferences", _snapshot_conferences)
+    worker.register("query_embeddings", snapshot_query_embeddings)
+    worker.start()
+    return worker
+
+
+get_session_store = LazyService(_create_session_store)
+get_document_service = LazyService(_create_document_service)
+get_rag_service = LazyService(_create_rag_service)
+get_conference_service = LazyService(_create_conference_service)
+get_session_query_service = LazyService(_create_session_query_service)
+get_admission_controller = LazyService(_create_admission_controller)
+get_cleanup_worker = LazyService(_create_cleanup_worker)
+get_snapshot_worker = LazyService(_create_snapshot_worker)
+
+_ready = threading.Event()
+_warm_up_seconds: Optional[float] = None
+
+
+def _warm_up():
+    global _warm_up_seconds
+    started = time.perf_counter()
+    for service in (get_session_store, get_conference_service, get_document_service, get_rag_service,
+                    get_admission_controller, get_snapshot_worker):
+        try:
+            service()
+        except Exception as e:
+            # The route will retry construction and report the error on first use
+            logger.error(f"Error warming up {service.factory.__name__.replace('_create_', '')}: {str(e)}")
+    _warm_up_seconds = time.perf_counter() - started
+    _ready.set()
+    logger.info(f"Services ready after {_warm_up_seconds:.2f}s")
+
+
+def warm_up():
+    """Construct the services in a background thread; ``readiness`` reports when they are up."""
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+
+
+def readiness() -> Dict[str, object]:
+    return {
+        "ready": _ready.is_set(),
+        "warm_up_seconds": round(_warm_up_seconds, 3) if _warm_up_seconds is not None else None,
+    }
+
+
+def shutdown_services():
+    """Stop background workers of any service that has been constructed."""
+    if get_conference_service.initialized:
+        get_conference_service().recordings.stop()
+    if get_cleanup_worker.initialized:
+        get_cleanup_worker().stop()
+    if get_admission_controller.initialized:
+        get_admission_controller().close()
+    if get_session_query_service.initialized:
+        get_session_query_service().close()
+    if get_snapshot_worker.initialized:
+        # Leaves current snapshots behind for the next process to boot from
+        get_snapshot_worker().stop()
+
+    from services.llm_gateway import close_llm_gateway
+    close_llm_gateway()
@@ -0,0 +1,264 @@
+import os
+import re
+import hmac
+import json
+import time
+import hashlib
+import logging
+import secrets
+from http.cookies import SimpleCookie
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services import metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Request fields holding settings rather than user content; the recorder keeps their values
+RECORDED_VALUES = {"language", "parent_language", "limit"}
+# Long-lived or operational routes that say nothing about load
+UNRECORDED_ROUTES = {"/events", "/metrics", "/ready"}
+# Bytes of each request and response body the recorder looks at
+BODY_SAMPLE_BYTES = 64 * 1024
+
+
+def match_route(scope: Scope) -> Tuple[str, Dict[str, Any]]:
+    """Return the route template and path parameters a request matches."""
+    router = scope["app"].router if "app" in scope else None
+    for route in getattr(router, "routes", ()):
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return route.path, child_scope.get("path_params", {})
+    return "unmatched", {}
+
+
+class MetricsMiddleware:
+    """Count requests per route, track in-flight requests and expose stage timings.
+
+    Implemented as plain ASGI rather than ``BaseHTTPMiddleware`` so streaming
+    responses such as ``/events`` pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route, _ = match_route(scope)
+        trace = metrics.start_trace()
+        status = {"code": 500}
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if trace:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", metrics.server_timing(trace).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        metrics.IN_FLIGHT.inc(method=method, route=route)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.IN_FLIGHT.dec(method=method, route=route)
+            metrics.REQUEST_LATENCY.observe(time.perf_counter() - started, method=method, route=route)
+            metrics.REQUESTS.inc(method=method, route=route, status=status["code"])
+
+
+class RequestRecorder:
+    """Append an anonymised record of every request to a JSON-lines file.
+
+    Each record keeps the route template, status, timings, byte counts and
+    the shape of the request: field names, string lengths and settings such
+    as ``language``. Session cookies and entity ids are replaced by keyed
+    hashes, so ``benchmarks/replay.py`` can tell which requests share a
+    session or a document without the recording revealing either. Questions,
+    transcripts and file contents are never stored.
+
+    Several workers may record to the same file; each record is one
+    ``O_APPEND`` write. They share the hash key through ``TRAFFIC_RECORD_SALT``
+    or a ``.salt`` file created next to the recording.
+    """
+
+    def __init__(self, app: ASGIApp, path: str):
+        self.app = app
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.salt = self._load_salt()
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        logger.info(f"Recording request shapes to {path}")
+
+    def _load_salt(self) -> bytes:
+        salt = os.getenv("TRAFFIC_RECORD_SALT")
+        if salt:
+            return salt.encode()
+        salt_path = f"{self.path}.salt"
+        tmp_path = f"{salt_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(secrets.token_hex(16))
+        try:
+            # Linking fails if another worker created the salt first, and then theirs is used
+            os.link(tmp_path, salt_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+        with open(salt_path) as f:
+            return f.read().strip().encode()
+
+    def pseudonym(self, value: str) -> str:
+        return hmac.new(self.salt, value.encode(), hashlib.sha256).hexdigest()[:16]
+
+    def shape(self, key: str, value: Any) -> Dict[str, Any]:
+        """Describe a field without recording user content."""
+        if key in RECORDED_VALUES:
+            return {"value": value}
+        if isinstance(value, str):
+            if key.endswith("_id"):
+                return {"id": self.pseudonym(value)}
+            return {"type": "str", "length": len(value)}
+        if isinstance(value, dict):
+            return {"type": "dict", "fields": {k: self.shape(k, v) for k, v in value.items()}}
+        if isinstance(value, list):
+            return {"type": "list", "length": len(value)}
+        return {"type": type(value).__name__}
+
+    def _multipart_fields(self, content_type: str, head: bytes, tail: bytes, size: int) -> Dict[str, Dict]:
+        """Field shapes of a multipart body, from its first and last bytes."""
+        match = re.search(r'boundary="?([^";]+)"?', content_type)
+        if not match:
+            return {}
+        delimiter = b"--" + match.group(1).encode()
+        windows = (head,) if size <= len(head) else (head, tail)
+        fields: Dict[str, Dict] = {}
+        for window in windows:
+            pieces = window.split(delimiter)
+            # The first piece is the preamble or a part cut off by the window, and has no headers
+            for i, piece in enumerate(pieces[1:], start=1):
+                header_end = piece.find(b"\r\n\r\n")
+                if not piece.startswith(b"\r\n") or header_end < 0:
+                    continue
+                headers = piece[:header_end].decode("latin-1")
+                name = re.search(r'name="([^"]*)"', headers)
+                if not name:
+                    continue
+                filename = re.search(r'filename="([^"]*)"', headers)
+                if filename:
+                    fields[name.group(1)] = {
+                        "type": "file",
+                        "extension": os.path.splitext(filename.group(1))[1].lower(),
+                    }
+                elif i < len(pieces) - 1:
+                    value = piece[header_end + 4:-2].decode("utf-8", "replace")
+                    fields[name.group(1)] = self.shape(name.group(1), value)
+        files = [field for field in fields.values() if field.get("type") == "file"]
+        for field in files:
+            field["bytes"] = size // len(files)
+        return fields
+
+    def _request_body(self, content_type: str, head: bytes, tail: bytes, size: int) -> Optional[Dict]:
+        if not size:
+            return None
+        if content_type.startswith("application/json") and size <= len(head):
+            try:
+                data = json.loads(head)
+            except ValueError:
+                return None
+            return {k: self.shape(k, v) for k, v in data.items()} if isinstance(data, dict) else None
+        if content_type.startswith("multipart/form-data"):
+            return self._multipart_fields(content_type, head, tail, size)
+        return None
+
+    def _write(self, record: Dict):
+        os.write(self._fd, (json.dumps(record, separators=(",", ":")) + "\n").encode())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route, path_params = match_route(scope)
+        if route in UNRECORDED_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        request = {"head": b"", "tail": b"", "bytes": 0}
+        response = {"status": 500, "bytes": 0, "body": b"", "json": False, "set_session": None, "first_byte": None}
+        started = time.perf_counter()
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                request["bytes"] += len(body)
+                if len(request["head"]) < BODY_SAMPLE_BYTES:
+                    request["head"] += body[:BODY_SAMPLE_BYTES - len(request["head"])]
+                request["tail"] = (request["tail"] + body)[-BODY_SAMPLE_BYTES:]
+            return message
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["first_byte"] = time.perf_counter() - started
+                for key, value in message.get("headers", []):
+                    key = key.decode("latin-1").lower()
+                    if key == "content-type":
+                        response["json"] = value.startswith(b"application/json")
+                    elif key == "set-cookie":
+                        cookie = SimpleCookie(value.decode("latin-1"))
+                        if "session_id" in cookie:
+                            response["set_session"] = self.pseudonym(cookie["session_id"].value)
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                response["bytes"] += len(body)
+                if response["json"] and len(response["body"]) < BODY_SAMPLE_BYTES:
+                    response["body"] += body
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            try:
+                self._record(scope, route, path_params, request_headers, request, response, started)
+            except Exception as e:
+                logger.error(f"Error recording request: {str(e)}")
+
+    def _record(self, scope: Scope, route: str, path_params: Dict, headers: Dict[str, str],
+                request: Dict, response: Dict, started: float):
+        cookie = SimpleCookie(headers.get("cookie", ""))
+        session = cookie["session_id"].value if "session_id" in cookie else None
+        created = {}
+        if response["json"] and 0 < len(response["body"]) <= BODY_SAMPLE_BYTES:
+            try:
+                data = json.loads(response["body"])
+            except ValueError:
+                data = None
+            if isinstance(data, dict):
+                created = {k: self.pseudonym(v) for k, v in data.items() if k.endswith("_id") and isinstance(v, str)}
+        content_type = headers.get("content-type", "")
+        self._write({
+            "at": round(time.time() - (time.perf_counter() - started), 3),
+            "method": scope["method"],
+            "route": route,
+            "path_params": {k: self.shape(k, str(v)) for k, v in path_params.items()},
+            "query": {k: self.shape(k, v) for k, v in parse_qsl(scope.get("query_string", b"").decode("latin-1"))},
+            "session": self.pseudonym(session) if session else None,
+            "content_type": content_type.split(";")[0] or None,
+            "body": self._request_body(content_type, request["head"], request["tail"], request["bytes"]),
+            "request_bytes": request["bytes"],
+            "status": response["status"],
+            "response_bytes": response["bytes"],
+            "first_byte_ms": round(response["first_byte"] * 1000, 2) if response["first_byte"] is not None else None,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "created": created,
+            "set_session": response["set_session"],
+        })
@@ -0,0 +1,37 @@
+import math
+import hashlib
+from typing import Optional
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from services.admission import AdmissionRejected
+
+
+def caller_key(request: Request, session_id: Optional[str]) -> str:
+    """Identify a caller for rate limiting: the session, or the client address without one."""
+    if session_id:
+        return f"session:{session_id}"
+    return f"client:{request.client.host if request.client else 'unknown'}"
+
+
+def too_many_requests(error: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+    )
+
+
+def listing_response(request: Request, etag: str, page) -> Response:
+    """Serve a listing page, answering 304 when the client's ETag is still current."""
+    query_hash = hashlib.sha1(str(request.query_params).encode()).hexdigest()[:8]
+    etag = f'W/"{etag}-{query_hash}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    try:
+        items, next_cursor = page()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"ETag": etag}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return JSONResponse(items, headers=headers)
@@ -1,82 +1,247 @@
-from flask import Blueprint, request, jsonify
-from services.conference_service import ConferenceService
-import os
-
-conference_bp = Blueprint('conference', __name__)
-conference_service = ConferenceService()
-
-# Create recordings directory if it doesn't exist
-RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'recordings')
-os.makedirs(RECORDINGS_DIR, exist_ok=True)
-
-@conference_bp.route('/start', methods=['POST'])
-def start_conference():
-    data = request.json
-    parent_language = data.get('parent_language', 'en')
-    
+import uuid
+import shutil
+import logging
+from typing import Optional
+from fastapi import APIRouter, Cookie, Depends, File, Form, HTTPException, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from dependencies import get_admission_controller, get_cleanup_worker, get_conference_service
+from routes.common import caller_key, listing_response, too_many_requests
+from services.admission import AdmissionRejected
+from services.metrics import span
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class ConferenceStartRequest(BaseModel):
+    parent_language: str = "en"
+
+
+class ConferenceQueryRequest(BaseModel):
+    conference_id: str
+    question: str
+    language: str = "en"
+
+
+@router.post("/conference/start")
+async def start_conference(
+    request: ConferenceStartRequest,
+    session_id: Optional[str] = Cookie(None),
+    response: Response = None,
+    conference_service=Depends(get_conference_service)
+):
+    try:
+        # Tie the conference to the session so session-wide questions can search it
+        if not session_id:
+            session_id = str(uuid.uuid4())
+            response.set_cookie(key="session_id", value=session_id)
+
+        logger.info(f"Starting conference with language: {request.parent_language}")
+        conference_id = conference_service.start_conference(request.parent_language, session_id=session_id)
+        logger.info(f"Conference started with ID: {conference_id}")
+        return {"conference_id": conference_id}
+    except Exception as e:
+        logger.error(f"Error starting conference: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/conference/record")
+async def record_audio(
+    audio: UploadFile = File(...),
+    conference_id: str = Form(...),
+    conference_service=Depends(get_conference_service)
+):
     try:
-        conference_id = conference_service.start_conference(parent_language)
-        return jsonify({
-            'message': 'Conference started successfully',
-            'conference_id': conference_id
-        }), 200
+        logger.info(f"Received audio file: {audio.filename} for conference: {conference_id}")
+
+        # Check if conference exists
+        if not conference_service.conference_exists(conference_id):
+            logger.error(f"Conference not found: {conference_id}")
+            raise HTTPException(status_code=404, detail=f"Conference not found: {conference_id}")
+
+        # Save the audio file
+        audio_path = conference_service.recordings.path_for(conference_id, audio.filename)
+        with span("upload_write"), open(audio_path, "wb") as buffer:
+            shutil.copyfileobj(audio.file, buffer)
+        conference_service.recordings.add(conference_id, audio_path)
+
+        logger.info(f"Saved audio file to: {audio_path}")
+
+        # Process the audio
+        transcript = conference_service.process_audio(conference_id, audio_path)
+        logger.info(f"Processed audio, transcript: {transcript[:100]}...")
+
+        return {"text": transcript}
+    except HTTPException:
+        raise
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@conference_bp.route('/record', methods=['POST'])
-def record_audio():
-    if 'audio' not in request.files:
-        return jsonify({'error': 'No audio file provided'}), 400
-    
-    audio_file = request.files['audio']
-    if not audio_file.filename:
-        return jsonify({'error': 'No selected file'}), 400
-        
-    conference_id = request.form.get('conference_id')
-    
-    if not conference_id:
-        return jsonify({'error': 'Conference ID is required'}), 400
-    
+        logger.error(f"Error processing audio: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        audio.file.close()
+
+
+@router.get("/conference/{conference_id}/summary")
+async def get_conference_summary(
+    conference_id: str,
+    language: str = "en",
+    conference_service=Depends(get_conference_service)
+):
     try:
-        # Ensure the filename is safe
-        filename = os.path.basename(audio_file.filename)
-        # Save the audio file with absolute path
-        file_path = os.path.join(RECORDINGS_DIR, f'{conference_id}_{filename}')
-        
-        # Create recordings directory if it doesn't exist (redundant but safe)
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # Save the file
-        audio_file.save(file_path)
-        
-        try:
-            # Process the audio
-            result = conference_service.process_audio(conference_id, file_path)
-            return jsonify({
-                'message': 'Audio processed successfully',
-                'text': result
-            }), 200
-        except Exception as e:
-            # If processing fails, still return a specific error
-            return jsonify({
-                'error': f'Error processing audio: {str(e)}',
-                'details': 'Audio file was saved but could not be processed'
-            }), 500
-        finally:
-            # Clean up the audio file
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception:
-                    pass  # Ignore cleanup errors
-                    
+        summary = conference_service.get_summary(conference_id, language)
+        return {"summary": summary}
     except Exception as e:
-        return jsonify({'error': f'Error saving audio file: {str(e)}'}), 500
+        logger.error(f"Error getting conference summary: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 
-@conference_bp.route('/summary/<conference_id>', methods=['GET'])
-def get_summary(conference_id):
+@router.get("/conferences")
+async def get_conferences(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    language: Optional[str] = None,
+    conference_service=Depends(get_conference_service)
+):
+    """Get conferences, optionally paginated and filtered by date range and language."""
     try:
-        summary = conference_service.get_summary(conference_id)
-        return jsonify({'summary': summary}), 200
+        return listing_response(
+            request,
+            conference_service.refresh_listing().etag,
+            lambda: conference_service.list_conferences(cursor, limit, start_date, end_date, language)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting conferences: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/conferences/{conference_id}")
+async def delete_conference(
+    conference_id: str,
+    conference_service=Depends(get_conference_service),
+    cleanup_worker=Depends(get_cleanup_worker)
+):
+    """Delete a conference; its recordings and vectors are purged in the background."""
+    try:
+        conference_service.delete_conference(conference_id)
+        cleanup_worker.wake()
+        return {"message": "Conference deleted successfully"}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error deleting conference: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/recordings/{filename}")
+async def get_recording(
+    filename: str,
+    conference_service=Depends(get_conference_service)
+):
+    try:
+        # Recordings of a deleted conference stay on disk until the cleanup worker purges them
+        conference_id = conference_service.recordings.conference_id_for(filename)
+        if conference_id and conference_service.tombstones.is_deleted("conference", conference_id):
+            raise HTTPException(status_code=404, detail=f"Recording file not found: {filename}")
+
+        file_path = conference_service.recordings.resolve(filename)
+
+        if not file_path:
+            logger.error(f"Recording file not found: {filename}")
+            raise HTTPException(status_code=404, detail=f"Recording file not found: {filename}")
+
+        # Determine content type based on file extension
+        extension = file_path.split('.')[-1].lower()
+        content_type = {
+            'webm': 'audio/webm',
+            'mp4': 'audio/mp4',
+            'ogg': 'audio/ogg'
+        }.get(extension, 'audio/webm')  # Default to webm if extension not recognized
+
+        return FileResponse(file_path, media_type=content_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error serving recording file: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/recordings/maintenance")
+async def run_recording_maintenance(conference_service=Depends(get_conference_service)):
+    """Sweep orphaned recordings, enforce retention and report bytes reclaimed."""
+    try:
+        return await run_in_threadpool(conference_service.recordings.run_maintenance)
+    except Exception as e:
+        logger.error(f"Error running recording maintenance: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/conference/{conference_id}/translate")
+async def translate_conference(
+    request: Request,
+    conference_id: str,
+    target_language: str = "en",
+    session_id: Optional[str] = Cookie(None),
+    conference_service=Depends(get_conference_service),
+    admission=Depends(get_admission_controller)
+):
+    try:
+        if not conference_service.conference_exists(conference_id):
+            logger.error(f"Conference not found: {conference_id}")
+            raise HTTPException(status_code=404, detail=f"Conference not found: {conference_id}")
+
+        translated_text = await admission.run(
+            "/conference/{conference_id}/translate",
+            caller_key(request, session_id),
+            (conference_id, target_language),
+            lambda: conference_service.translate_conference(conference_id, target_language)
+        )
+        return {"translated_text": translated_text}
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise too_many_requests(e)
+    except Exception as e:
+        logger.error(f"Error translating conference: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/conference/query")
+async def query_conference(
+    request: ConferenceQueryRequest,
+    http_request: Request,
+    session_id: Optional[str] = Cookie(None),
+    conference_service=Depends(get_conference_service),
+    admission=Depends(get_admission_controller)
+):
+    """Query a conference transcript using RAG."""
+    try:
+        if not conference_service.conference_exists(request.conference_id):
+            raise HTTPException(status_code=404, detail="Conference not found")
+
+        answer = await admission.run(
+            "/conference/query",
+            caller_key(http_request, session_id),
+            (request.conference_id, request.question.strip(), request.language),
+            lambda: conference_service.query_conference(
+                request.conference_id,
+                request.question,
+                request.language
+            )
+        )
+        return {"answer": answer}
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise too_many_requests(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
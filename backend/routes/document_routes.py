@@ -1,48 +1,184 @@
-from flask import Blueprint, request, jsonify
-from services.document_service import DocumentService
-from services.rag_service import RAGService
-import os
-
-document_bp = Blueprint('document', __name__)
-document_service = DocumentService()
-rag_service = RAGService()
-
-@document_bp.route('/upload', methods=['POST'])
-def upload_document():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file provided'}), 400
-    
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
-    
+import uuid
+import shutil
+import logging
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Cookie, Depends, File, HTTPException, Request, Response, UploadFile
+from pydantic import BaseModel
+from dependencies import (
+    get_admission_controller, get_cleanup_worker, get_document_service, get_rag_service, get_session_store
+)
+from routes.common import caller_key, listing_response, too_many_requests
+from services.admission import AdmissionRejected
+from services.tombstones import EntityDeleted
+from services.metrics import span
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class QueryRequest(BaseModel):
+    document_id: str
+    question: str
+    language: str = "en"
+
+
+class DeleteRequest(BaseModel):
+    document_id: str
+
+
+@router.get("/documents")
+async def get_documents(
+    request: Request,
+    session_id: Optional[str] = Cookie(None),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    session_store=Depends(get_session_store)
+):
     try:
-        # Save the file
-        file_path = os.path.join('uploads', file.filename)
-        file.save(file_path)
-        
+        if not session_id:
+            return []
+
+        listing = session_store.listing(session_id)
+        return listing_response(
+            request,
+            listing.etag,
+            lambda: listing.page(cursor, limit, start_date, end_date)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/upload")
+async def upload_document(
+    file: UploadFile = File(...),
+    session_id: Optional[str] = Cookie(None),
+    response: Response = None,
+    document_service=Depends(get_document_service),
+    session_store=Depends(get_session_store)
+):
+    try:
+        if not session_id:
+            session_id = str(uuid.uuid4())
+            response.set_cookie(key="session_id", value=session_id)
+
+        # Save the uploaded file under its document id
+        document_id = str(uuid.uuid4())
+        file_path = document_service.upload_path(document_id, file.filename)
+        with span("upload_write"), open(file_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+
         # Process the document
-        document_id = document_service.process_document(file_path)
-        
-        return jsonify({
-            'message': 'Document uploaded successfully',
-            'document_id': document_id
-        }), 200
+        try:
+            document_service.process_document(
+                file_path, session_id=session_id, document_id=document_id, name=file.filename
+            )
+
+            # Update session documents
+            session_store.add_document(session_id, {
+                "id": document_id,
+                "name": file.filename,
+                "upload_date": str(datetime.now())
+            })
+
+            return {"document_id": document_id}
+        except Exception as e:
+            logger.error(f"Error processing document: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error uploading file: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
+    finally:
+        file.file.close()
+
+
+@router.delete("/documents/{document_id}")
+async def delete_document(
+    document_id: str,
+    session_id: Optional[str] = Cookie(None),
+    document_service=Depends(get_document_service),
+    session_store=Depends(get_session_store),
+    cleanup_worker=Depends(get_cleanup_worker)
+):
+    try:
+        if not session_id:
+            raise HTTPException(status_code=400, detail="No session found")
+
+        if not session_store.exists(session_id):
+            raise HTTPException(status_code=404, detail="Session not found")
+
+        # Only documents in the caller's own session can be deleted
+        document = next((doc for doc in session_store.get_documents(session_id) if doc["id"] == document_id), None)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        # Hide the document now; chunks, grades and files are purged in the background
+        document_service.delete_document(document_id, session_id=session_id, name=document["name"])
+
+        # Remove the document from the session
+        session_store.remove_document(session_id, document_id)
+        cleanup_worker.wake()
+
+        return {"message": "Document deleted successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/query")
+async def query_document(
+    request: QueryRequest,
+    http_request: Request,
+    session_id: Optional[str] = Cookie(None),
+    rag_service=Depends(get_rag_service),
+    admission=Depends(get_admission_controller)
+):
+    try:
+        answer = await admission.run(
+            "/query",
+            caller_key(http_request, session_id),
+            (session_id, request.document_id, request.question.strip(), request.language),
+            lambda: rag_service.query_document(
+                request.document_id, request.question, request.language, session_id=session_id
+            )
+        )
+        return {"answer": answer}
+    except AdmissionRejected as e:
+        raise too_many_requests(e)
+    except EntityDeleted as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@document_bp.route('/query', methods=['POST'])
-def query_document():
-    data = request.json
-    document_id = data.get('document_id')
-    question = data.get('question')
-    language = data.get('language', 'en')
-    
-    if not document_id or not question:
-        return jsonify({'error': 'Document ID and question are required'}), 400
-    
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/summary/{document_id}")
+async def get_summary(
+    request: Request,
+    document_id: str,
+    language: str = "en",
+    session_id: Optional[str] = Cookie(None),
+    rag_service=Depends(get_rag_service),
+    admission=Depends(get_admission_controller)
+):
     try:
-        answer = rag_service.query_document(document_id, question, language)
-        return jsonify({'answer': answer}), 200
+        summary = await admission.run(
+            "/summary/{document_id}",
+            caller_key(request, session_id),
+            (session_id, document_id, language),
+            lambda: rag_service.get_document_summary(document_id, language, session_id=session_id)
+        )
+        return {"summary": summary}
+    except AdmissionRejected as e:
+        raise too_many_requests(e)
+    except EntityDeleted as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,33 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Cookie, Request
+from fastapi.responses import StreamingResponse
+from services.event_bus import event_bus
+
+router = APIRouter()
+
+
+@router.get("/events")
+async def stream_events(request: Request, session_id: Optional[str] = Cookie(None)):
+    """Push document and conference changes to the client as server-sent events."""
+    queue = event_bus.subscribe(session_id)
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Keep proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                yield event_bus.format_sse(event)
+        finally:
+            event_bus.unsubscribe(queue, session_id)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from dependencies import readiness
+from services import metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Expose request, stage latency and token metrics in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/ready", include_in_schema=False)
+async def get_ready():
+    """Report whether startup warm-up has finished; 503 until it has."""
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
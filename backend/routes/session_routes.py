@@ -0,0 +1,46 @@
+import logging
+from typing import Optional
+from fastapi import APIRouter, Cookie, Depends, HTTPException, Request
+from pydantic import BaseModel
+from dependencies import get_admission_controller, get_session_query_service
+from routes.common import caller_key, too_many_requests
+from services.admission import AdmissionRejected
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class SessionQueryRequest(BaseModel):
+    question: str
+    language: str = "en"
+
+
+@router.post("/session/query")
+async def query_session(
+    request: SessionQueryRequest,
+    http_request: Request,
+    session_id: Optional[str] = Cookie(None),
+    session_query_service=Depends(get_session_query_service),
+    admission=Depends(get_admission_controller)
+):
+    """Answer a question from every document and conference in the session, citing its sources."""
+    try:
+        if not session_id:
+            raise HTTPException(status_code=400, detail="No session found")
+
+        return await admission.run(
+            "/session/query",
+            caller_key(http_request, session_id),
+            (session_id, request.question.strip(), request.language),
+            lambda: session_query_service.query(session_id, request.question, request.language)
+        )
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise too_many_requests(e)
+    except Exception as e:
+        logger.error(f"Error querying session: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
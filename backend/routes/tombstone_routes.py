@@ -0,0 +1,22 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from dependencies import get_cleanup_worker
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/tombstones/verify")
+async def verify_deletes(cleanup_worker=Depends(get_cleanup_worker)):
+    """Purge pending deletes, then check purged entities for leftovers and requeue them."""
+    try:
+        purged = await run_in_threadpool(cleanup_worker.run_once)
+        verified = await run_in_threadpool(cleanup_worker.verify)
+        return {**purged, "verification": verified, "tombstones": cleanup_worker.store.stats()}
+    except Exception as e:
+        logger.error(f"Error verifying deletes: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
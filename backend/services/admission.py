@@ -0,0 +1,155 @@
+"""Admission control for the LLM-backed routes.
+
+Every expensive request goes through ``AdmissionController.run``:
+
+1. the caller's token bucket is charged, so one session cannot send more
+   than ``ADMISSION_RATE_PER_MINUTE`` requests after an initial burst
+2. an identical request already in flight is joined instead of repeated
+   (single flight), so double clicks and duplicate tabs share one result
+3. the computation waits for one of ``ADMISSION_MAX_CONCURRENT`` slots, and
+   is rejected if none frees up within ``ADMISSION_QUEUE_SECONDS``; each slot
+   has its own thread, so the cap is not silently lowered by the size of the
+   event loop's default executor
+
+Rejections raise ``AdmissionRejected``, which the routes turn into 429.
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+from services.metrics import ADMISSION_REJECTED, COALESCED_REQUESTS, POOL_BUSY, POOL_CAPACITY, POOL_WAITING
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ADMISSION_RATE_PER_MINUTE = float(os.getenv("ADMISSION_RATE_PER_MINUTE", "20"))
+ADMISSION_BURST = int(os.getenv("ADMISSION_BURST", "10"))
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "16"))
+ADMISSION_QUEUE_SECONDS = float(os.getenv("ADMISSION_QUEUE_SECONDS", "5"))
+# Idle buckets beyond this many are forgotten, oldest first
+ADMISSION_MAX_BUCKETS = 10000
+
+T = TypeVar("T")
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(
+            "Too many requests, please slow down" if reason == "rate_limited"
+            else "The server is busy, please try again shortly"
+        )
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBuckets:
+    """One token bucket per caller, refilled continuously."""
+
+    def __init__(self, rate_per_minute: float = ADMISSION_RATE_PER_MINUTE, burst: int = ADMISSION_BURST,
+                 max_buckets: int = ADMISSION_MAX_BUCKETS):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        """Take a token for ``key``; return 0 on success or the seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate if self.rate else 60.0
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class SingleFlight:
+    """Share one in-flight computation between identical concurrent calls."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Await ``compute()`` for ``key``, or join the call already running for it.
+
+        Returns the result and whether it came from another caller's computation.
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(compute())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            joined = False
+        else:
+            joined = True
+        # Shielded so a disconnecting caller does not cancel the others' result
+        return await asyncio.shield(future), joined
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        rate_per_minute: float = ADMISSION_RATE_PER_MINUTE,
+        burst: int = ADMISSION_BURST,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        queue_seconds: float = ADMISSION_QUEUE_SECONDS
+    ):
+        self.buckets = TokenBuckets(rate_per_minute, burst)
+        self.flights = SingleFlight()
+        self.max_concurrent = max_concurrent
+        self.queue_seconds = queue_seconds
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="llm")
+        POOL_CAPACITY.set(max_concurrent, pool="llm")
+
+    async def _execute(self, route: str, fn: Callable[[], T]) -> T:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        POOL_WAITING.inc(pool="llm")
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_seconds)
+        except asyncio.TimeoutError:
+            ADMISSION_REJECTED.inc(route=route, reason="overloaded")
+            logger.warning(f"Rejecting {route}: all {self.max_concurrent} LLM slots busy")
+            raise AdmissionRejected("overloaded", self.queue_seconds)
+        finally:
+            POOL_WAITING.dec(pool="llm")
+        POOL_BUSY.inc(pool="llm")
+        try:
+            # The services are synchronous; keep the event loop free and the request trace intact
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(self._executor, context.run, fn)
+        finally:
+            POOL_BUSY.dec(pool="llm")
+            self._slots.release()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    async def run(self, route: str, caller: str, key: Hashable, fn: Callable[[], T]) -> T:
+        """Run ``fn`` for ``caller`` under the rate limit, concurrency cap and single flight."""
+        wait = self.buckets.acquire(caller)
+        if wait:
+            ADMISSION_REJECTED.inc(route=route, reason="rate_limited")
+            raise AdmissionRejected("rate_limited", wait)
+
+        result, joined = await self.flights.do((route, key), lambda: self._execute(route, fn))
+        if joined:
+            COALESCED_REQUESTS.inc(route=route)
+        return result
@@ -0,0 +1,173 @@
+"""Silence trimming and voice-activity segmentation ahead of speech recognition.
+
+``AudioPreprocessor.process`` reads the 16-bit mono WAV produced by
+``ConferenceService._convert_to_wav`` and, with whole-array NumPy operations:
+
+* marks speech frames by energy above an adaptive noise floor
+* drops blips shorter than ``VAD_MIN_SPEECH_MS``
+* joins speech separated by pauses shorter than ``VAD_PAUSE_MS`` into one
+  utterance and pads each utterance by ``VAD_PAD_MS``
+* splits utterances longer than ``VAD_MAX_UTTERANCE_SECONDS`` at their
+  quietest frame, keeping requests under the STT provider's length limit
+* normalises loudness to ``LOUDNESS_TARGET_DBFS`` without clipping
+
+Only the utterances are sent to the recognizer, each with its offset in the
+recording, so silence costs no STT time and transcripts carry timestamps.
+"""
+import os
+import wave
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "20"))
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "150"))
+VAD_PAUSE_MS = int(os.getenv("VAD_PAUSE_MS", "700"))
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "200"))
+VAD_MAX_UTTERANCE_SECONDS = float(os.getenv("VAD_MAX_UTTERANCE_SECONDS", "30"))
+LOUDNESS_TARGET_DBFS = float(os.getenv("LOUDNESS_TARGET_DBFS", "-20"))
+
+# Frames quieter than this are never speech, however quiet the room
+SILENCE_FLOOR_DBFS = -55.0
+# Loudness normalisation never boosts by more than this, so noise stays noise
+MAX_GAIN_DB = 20.0
+PEAK_CEILING_DBFS = -1.0
+
+Utterance = Dict[str, object]
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end (exclusive) indices of the runs of True in a 1-D mask."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def read_wav(path: str) -> Tuple[np.ndarray, int]:
+    """Read a 16-bit PCM WAV as float32 mono samples in [-1, 1]."""
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"Expected 16-bit PCM, got {wav.getsampwidth() * 8}-bit")
+        channels = wav.getnchannels()
+        sample_rate = wav.getframerate()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2").astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+
+class AudioPreprocessor:
+    def __init__(
+        self,
+        frame_ms: int = VAD_FRAME_MS,
+        margin_db: float = VAD_MARGIN_DB,
+        min_speech_ms: int = VAD_MIN_SPEECH_MS,
+        pause_ms: int = VAD_PAUSE_MS,
+        pad_ms: int = VAD_PAD_MS,
+        max_utterance_seconds: float = VAD_MAX_UTTERANCE_SECONDS,
+        target_dbfs: float = LOUDNESS_TARGET_DBFS
+    ):
+        self.frame_ms = frame_ms
+        self.margin_db = margin_db
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.pause_frames = max(1, pause_ms // frame_ms)
+        self.pad_frames = pad_ms // frame_ms
+        self.max_utterance_frames = max(2, int(max_utterance_seconds * 1000 // frame_ms))
+        self.target_dbfs = target_dbfs
+
+    def frame_energy(self, samples: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, int]:
+        """Energy in dBFS of consecutive frames, and the frame length in samples."""
+        frame = max(1, sample_rate * self.frame_ms // 1000)
+        count = len(samples) // frame
+        frames = samples[:count * frame].reshape(count, frame)
+        return 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10), frame
+
+    def speech_spans(self, energy: np.ndarray) -> List[Tuple[int, int]]:
+        """Frame ranges of the utterances in a recording."""
+        if not len(energy):
+            return []
+        noise_floor, loud = np.percentile(energy, [10, 90])
+        # Without clear pauses the 10th percentile is quiet speech, not the room,
+        # so the threshold also stays a margin below the loud frames
+        threshold = max(min(noise_floor + self.margin_db, loud - self.margin_db), SILENCE_FLOOR_DBFS)
+        starts, ends = _runs(energy > threshold)
+
+        # Drop clicks and bumps too short to be speech
+        keep = ends - starts >= self.min_speech_frames
+        starts, ends = starts[keep], ends[keep]
+        if not len(starts):
+            return []
+
+        # Join speech separated by short pauses into utterances
+        breaks = np.flatnonzero(starts[1:] - ends[:-1] >= self.pause_frames)
+        starts = starts[np.concatenate([[0], breaks + 1])]
+        ends = ends[np.concatenate([breaks, [len(ends) - 1]])]
+
+        # Pad so word onsets and trailing consonants are not clipped
+        starts = np.maximum(starts - self.pad_frames, 0)
+        ends = np.minimum(ends + self.pad_frames, len(energy))
+
+        spans = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            # Split overlong utterances at the quietest frame in their second half
+            while end - start > self.max_utterance_frames:
+                lo = start + self.max_utterance_frames // 2
+                cut = lo + int(np.argmin(energy[lo:start + self.max_utterance_frames]))
+                spans.append((start, cut))
+                start = cut
+            spans.append((start, end))
+        return spans
+
+    def _gain(self, speech: np.ndarray) -> float:
+        """Gain bringing speech to the target loudness without clipping or boosting noise."""
+        rms = float(np.sqrt(np.mean(speech * speech))) if len(speech) else 0.0
+        peak = float(np.max(np.abs(speech))) if len(speech) else 0.0
+        if rms <= 0 or peak <= 0:
+            return 1.0
+        gain = 10 ** (self.target_dbfs / 20) / rms
+        gain = min(gain, 10 ** (MAX_GAIN_DB / 20), 10 ** (PEAK_CEILING_DBFS / 20) / peak)
+        return gain
+
+    def process(self, wav_path: str) -> Tuple[List[Utterance], Dict]:
+        """Split a recording into loudness-normalised speech utterances.
+
+        Each utterance has ``start`` and ``end`` in seconds from the start of
+        the recording and ``audio`` as 16-bit PCM bytes at ``sample_rate``.
+        """
+        samples, sample_rate = read_wav(wav_path)
+        energy, frame = self.frame_energy(samples, sample_rate)
+        spans = self.speech_spans(energy)
+
+        ranges = [(start * frame, min(end * frame, len(samples))) for start, end in spans]
+        speech = np.concatenate([samples[a:b] for a, b in ranges]) if ranges else np.zeros(0, dtype=np.float32)
+        gain = self._gain(speech)
+
+        utterances = []
+        for a, b in ranges:
+            pcm = np.clip(samples[a:b] * gain * 32768.0, -32768, 32767).astype("<i2")
+            utterances.append({
+                "start": round(a / sample_rate, 2),
+                "end": round(b / sample_rate, 2),
+                "audio": pcm.tobytes(),
+            })
+
+        duration = len(samples) / sample_rate if sample_rate else 0.0
+        speech_seconds = len(speech) / sample_rate if sample_rate else 0.0
+        stats = {
+            "sample_rate": sample_rate,
+            "duration": round(duration, 2),
+            "speech_seconds": round(speech_seconds, 2),
+            "removed_fraction": round(1 - speech_seconds / duration, 4) if duration else 0.0,
+            "utterances": len(utterances),
+            "gain_db": round(20 * np.log10(gain), 1),
+        }
+        logger.info(
+            f"Kept {stats['speech_seconds']}s of {stats['duration']}s audio "
+            f"in {len(utterances)} utterances (gain {stats['gain_db']} dB)"
+        )
+        return utterances, stats
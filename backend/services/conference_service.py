@@ -3,45 +3,59 @@ import json
 import logging
 import subprocess
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 import speech_recognition as sr
 import tempfile
 import shutil
+from functools import cached_property
 from deep_translator import GoogleTranslator
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from services.recording_store import RecordingStore
+from services.listing_index import ListingIndex
+from services.event_bus import EventBus, event_bus
+from services.conference_store import ConferenceStore
+from services.embeddings import collection_for, get_embeddings
+from services.vector_store import PartitionedVectorStore
+from services.metrics import AUDIO_SECONDS, span
+from services.context_builder import ContextBuilder
+from services.llm_gateway import Budget, QUERY_BUDGET_SECONDS, get_llm_gateway
+from services.tombstones import get_tombstone_store
+from services.audio_preprocessing import AudioPreprocessor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class ConferenceService:
-    def __init__(self):
-        self.conferences: Dict[str, Dict] = {}
+    def __init__(self, events: EventBus = event_bus):
+        self.events = events
+        self.listing = ListingIndex(date_field="start_time", language_field="parent_language")
         self.recordings_dir = "recordings"
         self.conferences_file = "conferences.json"
+        self.sessions_dir = "sessions"
         os.makedirs(self.recordings_dir, exist_ok=True)
         
         # Initialize speech recognition
         self.recognizer = sr.Recognizer()
         
-        # Initialize vector store for conference transcripts
-        self.embeddings = OpenAIEmbeddings()
-        self.vector_store = Chroma(
-            persist_directory=os.path.join("chroma_db", "conferences"),
-            embedding_function=self.embeddings,
-            collection_name="conference_transcripts"
+        # Deleted conferences are hidden at once and purged in the background
+        self.tombstones = get_tombstone_store()
+        
+        # Load conferences from file, shared safely between worker processes
+        self.store = ConferenceStore(self.conferences_file, on_reload=self._rebuild_listing)
+        
+        # Index recordings and manage their storage lifecycle
+        self.recordings = RecordingStore(
+            self.recordings_dir,
+            referenced_ids=self._referenced_conference_ids,
+            ffmpeg_available=lambda: self.ffmpeg_available
         )
         
-        # Load conferences from file
-        self._load_conferences()
+        # Trims silence and splits recordings into utterances before STT
+        self.audio_preprocessor = AudioPreprocessor()
         
-        # Check if ffmpeg is available
-        self.ffmpeg_available = self._check_ffmpeg()
-        if not self.ffmpeg_available:
-            logger.warning("ffmpeg is not available. Audio conversion may not work properly.")
-            logger.warning("Please install ffmpeg: https://ffmpeg.org/download.html")
+        # Fits retrieved transcript chunks into the prompt's token budget
+        self.context_builder = ContextBuilder()
         
         # Language code mapping for speech recognition
         self.language_codes = {
@@ -59,45 +73,55 @@ class ConferenceService:
             "th": "th-TH"
         }
 
-    def _load_conferences(self):
-        """Load conferences from the JSON file."""
-        try:
-            if os.path.exists(self.conferences_file):
-                with open(self.conferences_file, 'r') as f:
-                    data = json.load(f)
-                    # Ensure all required fields are present
-                    for conf_id, conf_data in data.items():
-                        if "start_time" not in conf_data:
-                            conf_data["start_time"] = datetime.now().isoformat()
-                        if "transcripts" not in conf_data:
-                            conf_data["transcripts"] = []
-                        if "parent_language" not in conf_data:
-                            conf_data["parent_language"] = "en"
-                        if "summary" not in conf_data:
-                            conf_data["summary"] = None
-                    self.conferences = data
-                    logger.info(f"Loaded {len(self.conferences)} conferences from file")
-            else:
-                # Create an empty conferences file if it doesn't exist
-                with open(self.conferences_file, 'w') as f:
-                    json.dump({}, f)
-                logger.info("Created new conferences file")
-        except Exception as e:
-            logger.error(f"Error loading conferences: {str(e)}")
-            self.conferences = {}
+    @cached_property
+    def vector_stores(self) -> PartitionedVectorStore:
+        """Per-conference vector stores for transcripts, opened on first use."""
+        return PartitionedVectorStore(
+            collection_for("conference_transcripts"),
+            get_embeddings(),
+            partition_key="conference_id",
+            persist_directory=os.path.join("chroma_db", "conferences")
+        )
 
-    def _save_conferences(self):
-        """Save conferences to the JSON file."""
-        try:
-            # Ensure the directory exists
-            os.makedirs(os.path.dirname(self.conferences_file), exist_ok=True)
-            
-            # Save the conferences data
-            with open(self.conferences_file, 'w') as f:
-                json.dump(self.conferences, f, indent=2)
-            logger.info(f"Saved {len(self.conferences)} conferences to file")
-        except Exception as e:
-            logger.error(f"Error saving conferences: {str(e)}")
+    @cached_property
+    def ffmpeg_available(self) -> bool:
+        """Whether ffmpeg is available, probed on first use."""
+        available = self._check_ffmpeg()
+        if not available:
+            logger.warning("ffmpeg is not available. Audio conversion may not work properly.")
+            logger.warning("Please install ffmpeg: https://ffmpeg.org/download.html")
+        return available
+
+    @property
+    def conferences(self) -> Dict[str, Dict]:
+        """Current conferences, revalidated against the shared file. Read-only."""
+        return self.store.all()
+
+    def _rebuild_listing(self, conferences: Dict[str, Dict]):
+        """Rebuild the listing index after conferences were (re)loaded from disk."""
+        deleted = self.tombstones.deleted_ids("conference")
+        self.listing.rebuild({
+            conf_id: self._summarize(conf_id, conf_data)
+            for conf_id, conf_data in conferences.items()
+            if conf_id not in deleted
+        })
+
+    def _summarize(self, conference_id: str, conference: Dict) -> Dict:
+        """Build the listing summary for a conference."""
+        transcripts = conference["transcripts"]
+        return {
+            "id": conference_id,
+            "start_time": conference["start_time"],
+            "parent_language": conference["parent_language"],
+            "transcript_count": len(transcripts),
+            "last_updated": transcripts[-1]["timestamp"] if transcripts else conference["start_time"]
+        }
+
+    def _index_conference(self, conference_id: str):
+        """Refresh a conference's listing entry and notify subscribers."""
+        summary = self._summarize(conference_id, self.conferences[conference_id])
+        self.listing.upsert(conference_id, summary)
+        self.events.publish("conference.updated", {"conference": summary})
 
     def _check_ffmpeg(self) -> bool:
         """Check if ffmpeg is available on the system."""
@@ -107,21 +131,58 @@ class ConferenceService:
         except (subprocess.SubprocessError, FileNotFoundError):
             return False
 
+    def _referenced_conference_ids(self) -> List[str]:
+        """Collect conference ids referenced by conferences.json or any session."""
+        referenced = set(self.conferences.keys())
+        if os.path.isdir(self.sessions_dir):
+            for filename in os.listdir(self.sessions_dir):
+                if not filename.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(self.sessions_dir, filename), 'r') as f:
+                        entries = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping unreadable session file {filename}: {str(e)}")
+                    continue
+                for entry in entries if isinstance(entries, list) else []:
+                    if isinstance(entry, dict):
+                        referenced.update(
+                            str(entry[key]) for key in ("id", "conference_id") if entry.get(key)
+                        )
+        return list(referenced)
+
     def conference_exists(self, conference_id: str) -> bool:
-        """Check if a conference exists."""
-        return conference_id in self.conferences
+        """Check if a conference exists and has not been deleted."""
+        return conference_id in self.conferences and not self.tombstones.is_deleted("conference", conference_id)
 
-    def start_conference(self, parent_language: str = "en") -> str:
+    def session_conferences(self, session_id: str) -> List[str]:
+        """Ids of the live conferences started from a session, oldest first."""
+        deleted = self.tombstones.deleted_ids("conference")
+        started = sorted(
+            (conf_data["start_time"], conf_id)
+            for conf_id, conf_data in list(self.conferences.items())
+            if conf_data.get("session_id") == session_id and conf_id not in deleted
+        )
+        return [conf_id for _, conf_id in started]
+
+    def start_conference(self, parent_language: str = "en", session_id: Optional[str] = None) -> str:
         """Start a new conference and return its ID."""
-        conference_id = str(datetime.now().timestamp())
-        self.conferences[conference_id] = {
-            "id": conference_id,
-            "parent_language": parent_language,
-            "start_time": datetime.now().isoformat(),
-            "transcripts": [],
-            "summary": None
-        }
-        self._save_conferences()  # Save after adding new conference
+        def add(conferences: Dict[str, Dict]) -> str:
+            conference_id = str(datetime.now().timestamp())
+            while conference_id in conferences:
+                conference_id = str(datetime.now().timestamp())
+            conferences[conference_id] = {
+                "id": conference_id,
+                "parent_language": parent_language,
+                "session_id": session_id,
+                "start_time": datetime.now().isoformat(),
+                "transcripts": [],
+                "summary": None
+            }
+            return conference_id
+        
+        conference_id = self.store.update(add)
+        self._index_conference(conference_id)
         logger.info(f"Started new conference {conference_id} with language {parent_language}")
         return conference_id
 
@@ -135,15 +196,16 @@ class ConferenceService:
             if self.ffmpeg_available:
                 try:
                     # Convert to WAV with specific parameters for speech recognition
-                    subprocess.run([
-                        "ffmpeg", 
-                        "-i", audio_path,
-                        "-acodec", "pcm_s16le",  # 16-bit PCM
-                        "-ar", "16000",          # 16kHz sample rate
-                        "-ac", "1",              # Mono audio
-                        "-y",                    # Overwrite output file
-                        wav_path
-                    ], check=True, capture_output=True)
+                    with span("ffmpeg_convert"):
+                        subprocess.run([
+                            "ffmpeg", 
+                            "-i", audio_path,
+                            "-acodec", "pcm_s16le",  # 16-bit PCM
+                            "-ar", "16000",          # 16kHz sample rate
+                            "-ac", "1",              # Mono audio
+                            "-y",                    # Overwrite output file
+                            wav_path
+                        ], check=True, capture_output=True)
                     
                     logger.info(f"Successfully converted {audio_path} to WAV format")
                     return wav_path
@@ -158,7 +220,7 @@ class ConferenceService:
             logger.error(f"Error in audio conversion: {str(e)}")
             return None
 
-    def _store_transcript_in_vector_db(self, conference_id: str, transcript: str):
+    def _store_transcript_in_vector_db(self, conference_id: str, transcript: str, segment_index: int = 0, offset: float = 0.0):
         """Store conference transcript in vector database."""
         try:
             # Split transcript into chunks
@@ -172,28 +234,49 @@ class ConferenceService:
             metadatas = [{
                 "conference_id": str(conference_id),  # Ensure conference_id is string
                 "chunk_index": str(i),  # Ensure chunk_index is string
+                "segment_index": segment_index,
+                "offset": offset,
                 "timestamp": datetime.now().isoformat()
             } for i in range(len(chunks))]
             
             # Add to vector store
-            self.vector_store.add_texts(
-                texts=chunks,
-                metadatas=metadatas,
-                ids=[f"{conference_id}_{i}" for i in range(len(chunks))]  # Add unique IDs
-            )
-            
-            # Save the vector store
-            self.vector_store.persist()
+            with span("index_write"):
+                self.vector_stores.partition(conference_id).add_texts(
+                    texts=chunks,
+                    metadatas=metadatas,
+                    # Unique across recordings, so later segments do not collide with earlier ones
+                    ids=[f"{conference_id}_{segment_index}_{i}" for i in range(len(chunks))]
+                )
             
             logger.info(f"Stored transcript for conference {conference_id} in vector database")
         except Exception as e:
             logger.error(f"Error storing transcript in vector database: {str(e)}")
 
+    def _transcribe(self, wav_path: str, language_code: str) -> Tuple[List[Dict], Dict]:
+        """Recognize the speech utterances of a recording, skipping the silence between them."""
+        with span("audio_preprocess"):
+            utterances, stats = self.audio_preprocessor.process(wav_path)
+        AUDIO_SECONDS.inc(stats["duration"], kind="received")
+        AUDIO_SECONDS.inc(stats["speech_seconds"], kind="speech")
+        
+        segments = []
+        for utterance in utterances:
+            audio = sr.AudioData(utterance["audio"], stats["sample_rate"], 2)
+            try:
+                with span("stt"):
+                    text = self.recognizer.recognize_google(audio, language=language_code)
+            except sr.UnknownValueError:
+                # Noise that looked like speech
+                continue
+            segments.append({"start": utterance["start"], "end": utterance["end"], "text": text})
+        return segments, stats
+
     def query_conference(self, conference_id: str, question: str, language: str = "en") -> str:
         """Query a conference transcript using RAG."""
+        budget = Budget(QUERY_BUDGET_SECONDS)
         try:
             # First check if conference exists and has transcripts
-            if conference_id not in self.conferences:
+            if not self.conference_exists(conference_id):
                 return "Conference not found."
             
             conference = self.conferences[conference_id]
@@ -204,27 +287,27 @@ class ConferenceService:
             full_transcript = " ".join(t["text"] for t in conference["transcripts"])
             
             # Search vector store with metadata filter
-            docs = self.vector_store.similarity_search(
-                question,
-                k=5,  # Increased from 3 to 5 for better context
-                filter={"conference_id": str(conference_id)}  # Ensure conference_id is string
-            )
+            with span("retrieval"):
+                where = {"conference_id": str(conference_id)}  # Ensure conference_id is string
+                store = self.vector_stores.existing(conference_id)
+                docs = store.similarity_search(question, k=5, filter=where) if store is not None else []
+                if not docs:
+                    # Conferences recorded before partitioning live in the shared collection
+                    docs = self.vector_stores.partition(None).similarity_search(question, k=5, filter=where)
             
             # If no results from vector store, use the full transcript
             if not docs:
-                context = full_transcript
+                context, _ = self.context_builder.fit(full_transcript, source="conference")
                 logger.info("Using full transcript as no relevant chunks found")
             else:
                 # Combine relevant chunks
-                context = "\n".join([doc.page_content for doc in docs])
+                context, _ = self.context_builder.build(docs, source="conference")
                 logger.info(f"Found {len(docs)} relevant chunks from vector store")
             
-            # Log the context being sent to the LLM
-            logger.info(f"Context length: {len(context)} characters")
-            
             # Translate question if needed
             if language != "en":
-                question = GoogleTranslator(source='auto', target='en').translate(question)
+                with span("translation"):
+                    question = GoogleTranslator(source='auto', target='en').translate(question)
             
             # Generate answer using RAG
             prompt = f"""You are an AI assistant helping parents understand their child's progress in school. 
@@ -240,25 +323,18 @@ class ConferenceService:
             say so rather than making up information. Try to be as helpful as possible with the information available.
             """
             
-            # Use OpenAI to generate the answer
-            from openai import OpenAI
-            client = OpenAI()
-            
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that helps parents understand their child's progress in school."},
-                    {"role": "user", "content": prompt}
-                ],
+            answer = get_llm_gateway().complete(
+                prompt,
+                task="answer",
                 temperature=0.7,
-                max_tokens=500
+                max_tokens=500,
+                budget=budget
             )
             
-            answer = response.choices[0].message.content
-            
             # Translate answer if needed
             if language != "en":
-                answer = GoogleTranslator(source='en', target=language).translate(answer)
+                with span("translation"):
+                    answer = GoogleTranslator(source='en', target=language).translate(answer)
             
             return answer
         except Exception as e:
@@ -280,27 +356,55 @@ class ConferenceService:
                 "en-US"
             )
             
-            # Transcribe audio
-            with sr.AudioFile(wav_path) as source:
-                audio = self.recognizer.record(source)
-                transcript = self.recognizer.recognize_google(audio, language=language_code)
+            # Transcribe only the speech, keeping each utterance's offset
+            try:
+                segments, stats = self._transcribe(wav_path, language_code)
+            finally:
+                os.unlink(wav_path)
+            transcript = " ".join(segment["text"] for segment in segments)
+            if not transcript:
+                logger.info(f"No speech recognized in {audio_path}")
             
             # Store transcript in conference data
-            if conference_id in self.conferences:
-                transcript_data = {
-                    "text": transcript,
-                    "timestamp": datetime.now().isoformat()
-                }
-                self.conferences[conference_id]["transcripts"].append(transcript_data)
+            transcript_data = {
+                "text": transcript,
+                "timestamp": datetime.now().isoformat(),
+                "duration": stats["duration"],
+                "segments": segments
+            }
+            
+            def append(conferences: Dict[str, Dict]) -> Optional[Tuple[int, float]]:
+                if conference_id not in conferences:
+                    return None
+                conference = conferences[conference_id]
+                # Segment times are relative to this recording; the offset places it in the conference.
+                # Every recording advances the clock, including those with no recognised speech
+                offset = conference.get("recorded_seconds")
+                if offset is None:
+                    # Conferences recorded before the running total was kept
+                    offset = sum(t.get("duration", 0) for t in conference["transcripts"])
+                conference["recorded_seconds"] = round(offset + stats["duration"], 2)
+                if not transcript:
+                    return None
+                transcripts = conference["transcripts"]
+                transcript_data["offset"] = round(offset, 2)
+                transcripts.append(transcript_data)
+                # A new segment makes any stored summary stale
+                conferences[conference_id]["summary"] = None
+                return len(transcripts) - 1, transcript_data["offset"]
+            
+            position = self.store.update(append)
+            if position is not None:
+                self._index_conference(conference_id)
                 
                 # Store in vector database
-                self._store_transcript_in_vector_db(conference_id, transcript)
+                segment_index, offset = position
+                self._store_transcript_in_vector_db(conference_id, transcript, segment_index, offset)
                 
-                # Save conference data
-                self._save_conferences()
-            
-            # Clean up temporary file
-            os.unlink(wav_path)
+                self.events.publish("conference.segment_transcribed", {
+                    "conference_id": conference_id,
+                    **transcript_data
+                })
             
             return transcript
         except Exception as e:
@@ -335,7 +439,15 @@ class ConferenceService:
                 summary += f"- {point.strip()}\n"
             
             # Store summary
-            conference["summary"] = summary
+            def store_summary(conferences: Dict[str, Dict]):
+                if conference_id in conferences:
+                    conferences[conference_id]["summary"] = summary
+            
+            self.store.update(store_summary)
+            self.events.publish("conference.summary_ready", {
+                "conference_id": conference_id,
+                "summary": summary
+            })
             
             return summary
             
@@ -344,58 +456,81 @@ class ConferenceService:
             raise
 
     def delete_conference(self, conference_id: str) -> None:
-        """Delete a conference and its associated files."""
+        """Tombstone a conference; its entry, recordings and vectors are purged in the background."""
         try:
-            if conference_id in self.conferences:
-                # Delete conference from memory
-                del self.conferences[conference_id]
-                
-                # Delete associated recording files
-                recording_pattern = os.path.join(self.recordings_dir, f"{conference_id}_*")
-                for file in os.listdir(self.recordings_dir):
-                    if file.startswith(f"{conference_id}_"):
-                        file_path = os.path.join(self.recordings_dir, file)
-                        try:
-                            os.remove(file_path)
-                            logger.info(f"Deleted recording file: {file_path}")
-                        except Exception as e:
-                            logger.warning(f"Failed to delete recording file {file_path}: {str(e)}")
-                
-                # Delete from vector store
-                try:
-                    # Get all documents with this conference_id
-                    docs = self.vector_store.get(
-                        where={"conference_id": conference_id}
-                    )
-                    # Delete each document
-                    for doc in docs:
-                        self.vector_store.delete(doc['ids'])
-                except Exception as e:
-                    logger.warning(f"Failed to delete conference from vector store: {str(e)}")
-                
-                # Save changes to file
-                self._save_conferences()
-                logger.info(f"Successfully deleted conference {conference_id}")
-            else:
+            if not self.conference_exists(conference_id):
                 raise ValueError(f"Conference {conference_id} not found")
+            
+            self.tombstones.mark("conference", conference_id)
+            self.listing.remove(conference_id)
+            self.events.publish("conference.deleted", {"conference_id": conference_id})
+            logger.info(f"Marked conference {conference_id} as deleted")
         except Exception as e:
             logger.error(f"Error deleting conference: {str(e)}")
             raise
 
+    def purge_conference(self, tombstone: Dict) -> Dict[str, int]:
+        """Remove everything stored for a tombstoned conference."""
+        conference_id = tombstone["entity_id"]
+        removed = {"conferences": 0, "recording_bytes": 0, "chunks": 0}
+        with span("conference_purge"):
+            if self.store.update(lambda conferences: conferences.pop(conference_id, None)) is not None:
+                removed["conferences"] += 1
+            removed["recording_bytes"] += self.recordings.remove_conference(conference_id)
+            
+            # Drop the conference's own partition in one step, then any chunks
+            # indexed into the shared collection before partitioning
+            if self.vector_stores.has_partition(conference_id):
+                self.vector_stores.drop(conference_id)
+            removed["chunks"] += self.vector_stores.partition(None).delete_matching({"conference_id": conference_id})
+        logger.info(f"Purged conference {conference_id}: {removed}")
+        return removed
+
+    def leftovers(self, tombstone: Dict) -> List[str]:
+        """Describe anything a purged conference left behind."""
+        conference_id = tombstone["entity_id"]
+        found = []
+        if conference_id in self.conferences:
+            found.append("conferences.json entry")
+        recordings = self.recordings.get_recordings(conference_id)
+        if recordings:
+            found.append(f"{len(recordings)} recordings")
+        if self.vector_stores.has_partition(conference_id):
+            found.append("vector partition")
+        chunks = len(self.vector_stores.partition(None).get(where={"conference_id": conference_id})["ids"])
+        if chunks:
+            found.append(f"{chunks} vector chunks in the shared collection")
+        return found
+
+    def refresh_listing(self) -> ListingIndex:
+        """Bring the listing index up to date with writes and deletes made by other workers."""
+        # Revalidate against conferences.json; a change there rebuilds the listing via on_reload
+        self.store.all()
+        # Tombstones live outside conferences.json, so a delete elsewhere never triggers a reload
+        for conference_id in self.tombstones.deleted_ids("conference"):
+            if conference_id in self.listing:
+                self.listing.remove(conference_id)
+        return self.listing
+
     def get_all_conferences(self) -> List[Dict]:
         """Get all conferences with their metadata."""
+        return self.list_conferences()[0]
+
+    def list_conferences(
+        self,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        language: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """Get one page of conference summaries from the listing index."""
         try:
-            conferences = []
-            for conference_id, conference_data in self.conferences.items():
-                conferences.append({
-                    "id": conference_id,
-                    "start_time": conference_data["start_time"],
-                    "parent_language": conference_data["parent_language"],
-                    "transcript_count": len(conference_data["transcripts"])
-                })
-            return conferences
+            return self.refresh_listing().page(cursor, limit, start_date, end_date, language)
+        except ValueError:
+            raise
         except Exception as e:
-            logger.error(f"Error getting all conferences: {str(e)}")
+            logger.error(f"Error listing conferences: {str(e)}")
             raise
 
     def translate_conference(self, conference_id: str, target_language: str) -> str:
@@ -415,7 +550,8 @@ class ConferenceService:
                 translator = GoogleTranslator(source='auto', target=target_language)
                 
                 # Translate the text
-                translated_text = translator.translate(full_text)
+                with span("translation"):
+                    translated_text = translator.translate(full_text)
                 logger.info(f"Successfully translated text to {target_language}")
                 return translated_text
             except Exception as e:
@@ -0,0 +1,331 @@
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Optional, Set, Tuple, TypeVar
+from services.snapshot import Snapshot, write_snapshot
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The journal is folded back into conferences.json once it grows past this
+CONFERENCE_JOURNAL_COMPACT_BYTES = int(os.getenv("CONFERENCE_JOURNAL_COMPACT_BYTES", str(4 * 1024 * 1024)))
+
+T = TypeVar("T")
+
+
+class _TrackedConferences(dict):
+    """Conference mapping that records which entries a mutation touched."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.touched: Optional[Set[str]] = None
+        self.touched_all = False
+
+    def _touch(self, key: str):
+        if self.touched is not None:
+            self.touched.add(key)
+
+    def _touch_all(self):
+        if self.touched is not None:
+            self.touched_all = True
+
+    def __getitem__(self, key):
+        self._touch(key)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        self._touch(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._touch(key)
+        super().__delitem__(key)
+
+    def get(self, key, default=None):
+        self._touch(key)
+        return super().get(key, default)
+
+    def pop(self, key, *default):
+        self._touch(key)
+        return super().pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        self._touch(key)
+        return super().setdefault(key, default)
+
+    def values(self):
+        self._touch_all()
+        return super().values()
+
+    def items(self):
+        self._touch_all()
+        return super().items()
+
+    def update(self, *args, **kwargs):
+        self._touch_all()
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self._touch_all()
+        super().clear()
+
+    def popitem(self):
+        self._touch_all()
+        return super().popitem()
+
+
+class ConferenceStore:
+    """Process-safe conference state backed by ``conferences.json``.
+
+    Every uvicorn worker keeps a read-through cache of the state and
+    revalidates it with a ``stat`` of the file and of its journal per read, so
+    writes from other workers become visible on the next access. Writes take an
+    exclusive ``flock`` on a sidecar lock file, catch up with the latest state,
+    apply the change and append the conferences it touched to
+    ``conferences.json.journal``, so concurrent workers never overwrite each
+    other's updates and a transcript append no longer rewrites every
+    conference. Readers replay only the journal lines they have not seen.
+
+    Once the journal passes ``CONFERENCE_JOURNAL_COMPACT_BYTES`` it is folded
+    into the JSON file. ``snapshot`` writes the state to
+    ``conferences.json.snap``; a process starting against the same file maps
+    the snapshot and replays the journal from the recorded offset instead of
+    parsing the JSON.
+    """
+
+    def __init__(self, path: str = "conferences.json", on_reload: Optional[Callable[[Dict[str, Dict]], None]] = None):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.journal_path = f"{path}.journal"
+        self.snapshot_path = f"{path}.snap"
+        self.on_reload = on_reload
+        self._thread_lock = threading.RLock()
+        self._conferences = _TrackedConferences()
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        # Inode of the journal and how far into it the in-memory state has read
+        self._journal: Tuple[Optional[int], int] = (None, 0)
+        self._snapshot_state: Optional[Tuple] = None
+        self.loaded_from: Optional[str] = None
+        if fcntl is None:
+            logger.warning("fcntl is unavailable; conference state is only safe within a single process")
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._locked(exclusive=True):
+            if not os.path.exists(self.path):
+                self._write({})
+                self.loaded_from = "new file"
+                logger.info("Created new conferences file")
+            self._reload()
+        logger.info(f"Loaded {len(self._conferences)} conferences from {self.loaded_from}")
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Hold the in-process lock plus a shared or exclusive file lock."""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _current_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _journal_stamp(self) -> Tuple[Optional[int], int]:
+        try:
+            stat = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return (None, 0)
+        return (stat.st_ino, stat.st_size)
+
+    def _stale(self) -> bool:
+        return self._current_stamp() != self._stamp or self._journal_stamp() != self._journal
+
+    @staticmethod
+    def _normalize_conference(conf_data: Dict) -> Dict:
+        """Ensure all required fields are present."""
+        conf_data.setdefault("start_time", datetime.now().isoformat())
+        conf_data.setdefault("transcripts", [])
+        conf_data.setdefault("parent_language", "en")
+        conf_data.setdefault("summary", None)
+        return conf_data
+
+    def _load_base(self, stamp: Optional[Tuple[int, int, int]]) -> bool:
+        """Load the state of ``conferences.json``, from its snapshot when that is current."""
+        journal_ino = self._journal_stamp()[0]
+        snapshot = Snapshot.open(self.snapshot_path)
+        if snapshot is not None:
+            with snapshot:
+                meta = snapshot.meta
+                if stamp is not None and meta.get("base_stamp") == list(stamp):
+                    self._conferences = _TrackedConferences(snapshot.section("conferences"))
+                    self._stamp = stamp
+                    # A journal started after the snapshot is replayed from its beginning
+                    offset = meta["journal_offset"] if meta.get("journal_ino") == journal_ino else 0
+                    self._journal = (journal_ino, offset)
+                    self.loaded_from = "snapshot"
+                    return True
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except ValueError as e:
+            logger.error(f"Error loading conferences: {str(e)}")
+            return False
+        for conf_data in data.values():
+            self._normalize_conference(conf_data)
+        self._conferences = _TrackedConferences(data)
+        self._stamp = stamp
+        self._journal = (journal_ino, 0)
+        self.loaded_from = "file"
+        return True
+
+    def _replay_journal(self) -> bool:
+        """Apply journal records written since the last read. Returns whether any were applied."""
+        try:
+            f = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            return False
+        with f:
+            ino, offset = self._journal
+            current_ino = os.fstat(f.fileno()).st_ino
+            if current_ino != ino:
+                # Records carry whole conferences, so replaying a journal from its start is always safe
+                offset = 0
+            f.seek(offset)
+            data = f.read()
+        # A writer may be midway through a line; leave it for the next read
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                record = json.loads(line)
+                conference_id, conference = record["id"], record["conference"]
+            except (ValueError, KeyError, TypeError) as e:
+                # A writer that crashed mid-append leaves a torn line; the records around it still apply
+                logger.warning(f"Skipping invalid journal line in {self.journal_path}: {str(e)}")
+                continue
+            if conference is None:
+                dict.pop(self._conferences, conference_id, None)
+            else:
+                dict.__setitem__(self._conferences, conference_id, self._normalize_conference(conference))
+        self._journal = (current_ino, offset + len(complete))
+        return bool(complete)
+
+    def _reload(self):
+        """Catch up with writes made by other processes since the last read."""
+        stamp = self._current_stamp()
+        changed = False
+        if stamp != self._stamp:
+            if not self._load_base(stamp):
+                return
+            changed = True
+        if self._replay_journal():
+            changed = True
+        if changed and self.on_reload is not None:
+            self.on_reload(self._conferences)
+
+    def _write(self, data: Dict[str, Dict]):
+        """Write the full state to the JSON file and start an empty journal."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        tmp_journal_path = f"{self.journal_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        open(tmp_journal_path, "wb").close()
+        # Replace the JSON before emptying the journal: after a crash between the
+        # two, the old journal replays over the new file, which is harmless since
+        # its records hold whole conferences, whereas the reverse order loses them
+        os.replace(tmp_path, self.path)
+        os.replace(tmp_journal_path, self.journal_path)
+        self._stamp = self._current_stamp()
+        self._journal = self._journal_stamp()
+
+    def _append(self, conference_ids: Set[str]):
+        """Append the current value of each touched conference to the journal."""
+        lines = "".join(
+            json.dumps({"id": conference_id, "conference": dict.get(self._conferences, conference_id)}) + "\n"
+            for conference_id in sorted(conference_ids)
+        ).encode()
+        with open(self.journal_path, "a+b") as f:
+            # Never glue a record onto a line torn by a writer that crashed mid-append
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    lines = b"\n" + lines
+            f.write(lines)
+            f.flush()
+            stat = os.fstat(f.fileno())
+        self._journal = (stat.st_ino, stat.st_size)
+
+    def snapshot(self) -> Optional[int]:
+        """Write the in-memory state to the snapshot file if it changed since the last one."""
+        with self._thread_lock:
+            state = (self._stamp, self._journal)
+            if self._stamp is None or state == self._snapshot_state:
+                return None
+            size = write_snapshot(
+                self.snapshot_path,
+                {"conferences": dict(self._conferences)},
+                meta={
+                    "base_stamp": list(self._stamp),
+                    "journal_ino": self._journal[0],
+                    "journal_offset": self._journal[1],
+                }
+            )
+            self._snapshot_state = state
+        return size
+
+    def all(self) -> Dict[str, Dict]:
+        """Return the current conferences. The mapping must be treated as read-only."""
+        if self._stale():
+            with self._locked(exclusive=False):
+                self._reload()
+        return self._conferences
+
+    def get(self, conference_id: str) -> Optional[Dict]:
+        return self.all().get(conference_id)
+
+    def exists(self, conference_id: str) -> bool:
+        return conference_id in self.all()
+
+    def update(self, mutate: Callable[[Dict[str, Dict]], T]) -> T:
+        """Apply ``mutate`` to the latest state and persist the conferences it touched."""
+        with self._locked(exclusive=True):
+            self._reload()
+            conferences = self._conferences
+            conferences.touched, conferences.touched_all = set(), False
+            try:
+                result = mutate(conferences)
+            except Exception:
+                # Drop any partial change by forcing a reload from disk
+                self._stamp = None
+                raise
+            finally:
+                touched, touched_all = conferences.touched, conferences.touched_all
+                conferences.touched, conferences.touched_all = None, False
+            if touched_all or self._journal[1] >= CONFERENCE_JOURNAL_COMPACT_BYTES:
+                self._write(conferences)
+                logger.info(f"Saved {len(conferences)} conferences to file")
+            elif touched:
+                self._append(touched)
+        return result
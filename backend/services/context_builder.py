@@ -0,0 +1,210 @@
+"""Token-budgeted context assembly for RAG prompts.
+
+Retrieved chunks overlap by up to ``chunk_overlap`` characters and arrive in
+relevance order. ``ContextBuilder`` keeps the most relevant chunks that fit the
+token budget, puts them back in document order, strips the text each chunk
+repeats from its predecessor and reports the token count before and after.
+"""
+import os
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from services.metrics import CONTEXT_TOKENS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1500"))
+
+# Fallback estimate when tiktoken (or its encoding file) is unavailable
+CHARS_PER_TOKEN = 4
+
+# Shortest repeated span treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating tokens from length: {str(e)}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, or estimate them from the text length."""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most ``max_tokens`` tokens."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def strip_overlap(previous: str, current: str, max_overlap: int) -> str:
+    """Remove the prefix of ``current`` that repeats the end of ``previous``."""
+    if current in previous:
+        return ""
+    longest = min(len(previous), len(current), max_overlap)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(current[:size]):
+            return current[size:].lstrip()
+    return current
+
+
+def _position(doc: Document, rank: int) -> Tuple:
+    """Sort key placing chunks of the same source in their original order."""
+    metadata = doc.metadata or {}
+    source = metadata.get("document_id") or metadata.get("conference_id") or ""
+    try:
+        index = int(metadata.get("chunk_index", rank))
+    except (TypeError, ValueError):
+        index = rank
+    return (str(source), str(metadata.get("timestamp", "")), index)
+
+
+class ContextBuilder:
+    def __init__(self, max_tokens: Optional[int] = None, max_overlap: int = 400, separator: str = "\n"):
+        self.max_tokens = max_tokens or CONTEXT_MAX_TOKENS
+        self.max_overlap = max_overlap
+        self.separator = separator
+
+    def build(self, docs: List[Document], source: str = "document") -> Tuple[str, Dict[str, int]]:
+        """Assemble retrieved chunks (most relevant first) into a bounded context."""
+        tokens_before = count_tokens(self.separator.join(doc.page_content for doc in docs))
+
+        # Spend the budget on the most relevant chunks first
+        separator_tokens = count_tokens(self.separator)
+        remaining = self.max_tokens
+        selected: Dict[int, str] = {}
+        seen = set()
+        for rank, doc in enumerate(docs):
+            if remaining <= 0:
+                break
+            text = doc.page_content.strip()
+            if not text or text in seen:
+                continue
+            seen.add(text)
+            tokens = count_tokens(text)
+            if tokens > remaining:
+                selected[rank] = truncate_to_tokens(text, remaining)
+                break
+            selected[rank] = text
+            remaining -= tokens + separator_tokens
+
+        # Put the kept chunks back in document order and strip the text each
+        # repeats from the kept chunk before it; a dropped neighbour keeps
+        # its shared text in the chunk that follows it
+        pieces: List[str] = []
+        previous: Optional[Tuple[Tuple, str]] = None
+        for rank in sorted(selected, key=lambda rank: _position(docs[rank], rank)):
+            key = _position(docs[rank], rank)
+            text = selected[rank]
+            if previous and previous[0][:2] == key[:2]:
+                text = strip_overlap(previous[1], text, self.max_overlap)
+            previous = (key, selected[rank])
+            if text:
+                pieces.append(text)
+
+        context = self.separator.join(pieces)
+        stats = {
+            "chunks_retrieved": len(docs),
+            "chunks_used": len(pieces),
+            "tokens_before": tokens_before,
+            "tokens_after": count_tokens(context),
+        }
+        self._report(source, stats)
+        return context, stats
+
+    def build_cited(self, ranked: List[Tuple[str, Document]], source: str = "session") -> Tuple[str, List[str], Dict[str, int]]:
+        """Assemble chunks from several labelled sources (most relevant first) into one context.
+
+        The budget goes to the most relevant chunks whichever source they come
+        from. Each source's chunks are then grouped under its ``[label]``, in
+        document order with overlap stripped. Returns the context, the labels
+        it contains and the stats.
+        """
+        tokens_before = count_tokens(self.separator.join(doc.page_content for _, doc in ranked))
+
+        # Spend the budget on the most relevant chunks first, counting each label once
+        separator_tokens = count_tokens(self.separator)
+        remaining = self.max_tokens
+        selected: Dict[str, List[Tuple[int, Document, str]]] = {}
+        for rank, (label, doc) in enumerate(ranked):
+            if remaining <= 0:
+                break
+            text = doc.page_content.strip()
+            overhead = separator_tokens
+            if label not in selected:
+                overhead += count_tokens(f"[{label}]") + 2 * separator_tokens
+            tokens = count_tokens(text)
+            if tokens + overhead > remaining:
+                text = truncate_to_tokens(text, remaining - overhead)
+                if text:
+                    selected.setdefault(label, []).append((rank, doc, text))
+                break
+            selected.setdefault(label, []).append((rank, doc, text))
+            remaining -= tokens + overhead
+
+        sections = []
+        chunks_used = 0
+        for label, chunks in selected.items():
+            chunks.sort(key=lambda item: _position(item[1], item[0]))
+            pieces = [f"[{label}]"]
+            previous: Optional[Tuple[Tuple, str]] = None
+            for rank, doc, text in chunks:
+                key = _position(doc, rank)
+                full = text
+                if previous and previous[0][:2] == key[:2]:
+                    text = strip_overlap(previous[1], text, self.max_overlap)
+                previous = (key, full)
+                if text:
+                    pieces.append(text)
+                    chunks_used += 1
+            sections.append(self.separator.join(pieces))
+
+        context = (self.separator * 2).join(sections)
+        stats = {
+            "chunks_retrieved": len(ranked),
+            "chunks_used": chunks_used,
+            "tokens_before": tokens_before,
+            "tokens_after": count_tokens(context),
+        }
+        self._report(source, stats)
+        return context, list(selected), stats
+
+    def fit(self, text: str, source: str = "document") -> Tuple[str, Dict[str, int]]:
+        """Trim a single block of text, such as a full transcript, to the budget."""
+        context = truncate_to_tokens(text, self.max_tokens)
+        stats = {
+            "chunks_retrieved": 1,
+            "chunks_used": 1 if context else 0,
+            "tokens_before": count_tokens(text),
+            "tokens_after": count_tokens(context),
+        }
+        self._report(source, stats)
+        return context, stats
+
+    def _report(self, source: str, stats: Dict[str, int]):
+        CONTEXT_TOKENS.observe(stats["tokens_before"], source=source, phase="before")
+        CONTEXT_TOKENS.observe(stats["tokens_after"], source=source, phase="after")
+        logger.info(
+            f"Context for {source} query: {stats['tokens_before']} -> {stats['tokens_after']} tokens "
+            f"({stats['chunks_used']}/{stats['chunks_retrieved']} chunks)"
+        )
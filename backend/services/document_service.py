@@ -1,83 +1,145 @@
 import os
 import uuid
-from PIL import Image
-import pytesseract
-import numpy as np
+import logging
+from typing import Dict, List, Optional
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
 from dotenv import load_dotenv
 from PyPDF2 import PdfReader
+from services.event_bus import EventBus, event_bus
+from services.embeddings import collection_for, get_embeddings
+from services.vector_store import PartitionedVectorStore
+from services.grade_service import GradeService
+from services.ocr import OcrService
+from services.tombstones import get_tombstone_store
+from services.metrics import span
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
 class DocumentService:
-    def __init__(self):
-        self.embeddings = OpenAIEmbeddings(openai_api_key=os.getenv('OPENAI_API_KEY'))
+    def __init__(self, events: EventBus = event_bus):
+        self.events = events
+        self.embeddings = get_embeddings()
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200
         )
-        self.vector_store = Chroma(
-            persist_directory="chroma_db",
-            embedding_function=self.embeddings,
-            collection_name="documents"
-        )
+        # One vector collection per session, so sessions never search each other's chunks
+        self.vector_stores = PartitionedVectorStore(collection_for("documents"), self.embeddings, partition_key="document_id")
+        self.grades = GradeService()
+        self.ocr = OcrService()
+        self.tombstones = get_tombstone_store()
+        self.upload_dir = "uploads"
+
+    def upload_path(self, document_id: str, filename: str) -> str:
+        """Path an upload is saved to, unique per document so deletes never touch another upload."""
+        return os.path.join(self.upload_dir, f"{document_id}_{os.path.basename(filename)}")
         
-    def process_document(self, file_path):
+    def process_document(self, file_path, session_id=None, document_id=None, name=None):
         try:
-            # Generate unique document ID
-            document_id = str(uuid.uuid4())
+            # Generate unique document ID unless the caller already picked one
+            document_id = document_id or str(uuid.uuid4())
             
             # Extract text from document
             if file_path.lower().endswith(('.png', '.jpg', '.jpeg')):
-                text = self._extract_text_from_image(file_path)
+                with span("ocr_extraction"):
+                    text = self._extract_text_from_image(file_path)
             elif file_path.lower().endswith('.pdf'):
-                text = self._extract_text_from_pdf(file_path)
+                with span("pdf_extraction"):
+                    text = self._extract_text_from_pdf(file_path)
             else:
                 raise ValueError(f"Unsupported file type: {file_path}")
             
             if not text.strip():
                 raise ValueError("No text could be extracted from the document")
             
+            # Pull course grades out of transcripts for direct lookups
+            try:
+                with span("grade_extraction"):
+                    self.grades.extract(document_id, text, session_id=session_id)
+            except Exception as e:
+                logger.warning(f"Grade extraction failed for {document_id}: {str(e)}")
+            
             # Split text into chunks
-            chunks = self.text_splitter.split_text(text)
+            with span("chunking"):
+                chunks = self.text_splitter.split_text(text)
+            
+            # Store chunks in vector database (embedding is timed separately)
+            with span("index_write"):
+                self.vector_stores.partition(session_id).add_texts(
+                    texts=chunks,
+                    metadatas=[
+                        {"document_id": document_id, "session_id": session_id or "", "chunk_index": i}
+                        for i in range(len(chunks))
+                    ]
+                )
             
-            # Store chunks in vector database
-            self.vector_store.add_texts(
-                texts=chunks,
-                metadatas=[{"document_id": document_id} for _ in chunks]
-            )
+            self.events.publish("document.indexed", {
+                "document_id": document_id,
+                "name": name or os.path.basename(file_path),
+                "chunk_count": len(chunks)
+            }, session_id=session_id)
             
             return document_id
         except Exception as e:
-            print(f"Error in process_document: {str(e)}")
+            logger.error(f"Error in process_document: {str(e)}")
             raise
     
-    def delete_document(self, document_id):
+    def delete_document(self, document_id, session_id=None, name=None):
+        """Tombstone a document; its chunks, grades and files are purged in the background."""
         try:
-            # Delete all chunks associated with the document from the vector store
-            self.vector_store.delete(
-                where={"document_id": document_id}
-            )
-            
-            # Delete the uploaded file if it exists
-            for filename in os.listdir("uploads"):
-                if filename.startswith(document_id):
-                    file_path = os.path.join("uploads", filename)
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-            
+            self.tombstones.mark("document", document_id, session_id=session_id, payload={"name": name})
             return True
         except Exception as e:
-            print(f"Error in delete_document: {str(e)}")
+            logger.error(f"Error in delete_document: {str(e)}")
             raise
+
+    def _vector_partitions(self, session_id: Optional[str]):
+        """Partitions that may hold a session's chunks, including the shared legacy collection."""
+        if session_id and self.vector_stores.has_partition(session_id):
+            yield self.vector_stores.partition(session_id)
+        yield self.vector_stores.partition(None)
+
+    def purge_document(self, tombstone: Dict) -> Dict[str, int]:
+        """Remove everything stored for a tombstoned document."""
+        document_id, session_id = tombstone["entity_id"], tombstone["session_id"]
+        where = {"document_id": document_id}
+        removed = {"chunks": 0, "files": 0, "ocr_cache": 0}
+        with span("document_purge"):
+            for store in self._vector_partitions(session_id):
+                removed["chunks"] += store.delete_matching(where)
+            self.grades.delete_document(document_id)
+
+            name = tombstone["payload"].get("name")
+            path = self.upload_path(document_id, name) if name else None
+            if path and os.path.exists(path):
+                if self.ocr.forget(path):
+                    removed["ocr_cache"] += 1
+                os.remove(path)
+                removed["files"] += 1
+        logger.info(f"Purged document {document_id}: {removed}")
+        return removed
+
+    def leftovers(self, tombstone: Dict) -> List[str]:
+        """Describe anything a purged document left behind."""
+        document_id, session_id = tombstone["entity_id"], tombstone["session_id"]
+        found = []
+        chunks = sum(len(store.get(where={"document_id": document_id})["ids"]) for store in self._vector_partitions(session_id))
+        if chunks:
+            found.append(f"{chunks} vector chunks")
+        if self.grades.has_document(document_id):
+            found.append("grade rows")
+        name = tombstone["payload"].get("name")
+        if name and os.path.exists(self.upload_path(document_id, name)):
+            found.append("uploaded file")
+        return found
     
     def _extract_text_from_image(self, image_path):
-        image = Image.open(image_path)
-        text = pytesseract.image_to_string(image)
-        return text
+        return self.ocr.extract_text(image_path)
     
     def _extract_text_from_pdf(self, pdf_path):
         text = ""
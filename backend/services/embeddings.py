@@ -0,0 +1,208 @@
+import os
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+from services.metrics import QUERY_EMBEDDING_CACHE, span
+from services.snapshot import SNAPSHOT_DIR, Snapshot, write_snapshot
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "openai" (default) or "onnx" for the local multilingual model
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+# Recent question embeddings kept in memory and in the warm-start snapshot; 0 disables
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+QUERY_EMBEDDING_SNAPSHOT = os.path.join(SNAPSHOT_DIR, "query_embeddings.snap")
+
+
+class InstrumentedEmbeddings(Embeddings):
+    """Wrap an embeddings client so every call is timed as a pipeline stage.
+
+    Query embeddings are kept in an LRU cache, since the same questions are
+    asked again across sessions. ``snapshot`` and ``load_snapshot`` carry the
+    cache across restarts; ``identity`` names the provider and model, and a
+    snapshot written for another one is ignored.
+    """
+
+    def __init__(self, embeddings: Embeddings, identity: str = "", cache_size: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.identity = identity
+        self.cache_size = cache_size
+        self._queries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._queries_lock = threading.Lock()
+        self._version = 0
+        self._snapshot_version = 0
+
+    @property
+    def multilingual(self) -> bool:
+        """Whether questions in any language can be matched against English chunks."""
+        return getattr(self.embeddings, "multilingual", False)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with span("embedding"):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.cache_size > 0:
+            with self._queries_lock:
+                vector = self._queries.get(text)
+                if vector is not None:
+                    self._queries.move_to_end(text)
+            QUERY_EMBEDDING_CACHE.inc(result="miss" if vector is None else "hit")
+            if vector is not None:
+                return list(vector)
+        with span("query_embedding"):
+            vector = self.embeddings.embed_query(text)
+        if self.cache_size > 0:
+            self._remember(text, vector)
+        return vector
+
+    def _remember(self, text: str, vector: List[float]):
+        with self._queries_lock:
+            self._queries[text] = list(vector)
+            self._queries.move_to_end(text)
+            while len(self._queries) > self.cache_size:
+                self._queries.popitem(last=False)
+            self._version += 1
+
+    def snapshot(self, path: str = QUERY_EMBEDDING_SNAPSHOT) -> Optional[int]:
+        """Write the query cache to ``path`` if it changed since the last snapshot."""
+        with self._queries_lock:
+            if self._version == self._snapshot_version:
+                return None
+            version = self._version
+            queries = [[text, array("d", vector).tobytes()] for text, vector in self._queries.items()]
+        size = write_snapshot(path, {"queries": queries}, meta={"identity": self.identity})
+        self._snapshot_version = version
+        return size
+
+    def load_snapshot(self, path: str = QUERY_EMBEDDING_SNAPSHOT) -> int:
+        """Fill the query cache from a snapshot. Returns the number of queries loaded."""
+        if self.cache_size <= 0:
+            return 0
+        snapshot = Snapshot.open(path)
+        if snapshot is None:
+            return 0
+        with snapshot:
+            if snapshot.meta.get("identity") != self.identity:
+                logger.info(f"Ignoring query embedding snapshot for {snapshot.meta.get('identity')}")
+                return 0
+            queries = snapshot.section("queries")
+        with self._queries_lock:
+            for text, blob in queries[-self.cache_size:]:
+                self._queries[text] = array("d", blob).tolist()
+            self._snapshot_version = self._version
+        logger.info(f"Loaded {len(queries)} cached query embeddings from snapshot")
+        return len(queries)
+
+
+class OnnxEmbeddings(Embeddings):
+    """Multilingual sentence embeddings computed on the CPU with ONNX Runtime.
+
+    Expects ``model_dir`` to hold an exported sentence-transformers model as
+    ``model.onnx`` plus its ``tokenizer.json``, e.g.
+    paraphrase-multilingual-MiniLM-L12-v2. Texts are embedded in batches of
+    similar length to keep padding low, mean-pooled and L2-normalised.
+    """
+
+    multilingual = True
+
+    def __init__(
+        self,
+        model_dir: str,
+        batch_size: int = 32,
+        max_length: int = 256,
+        intra_op_threads: int = 0
+    ):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        # 0 lets ONNX Runtime use one thread per physical core
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX embedding model from {model_dir}")
+
+    def _embed_batch(self, texts: List[str]):
+        import numpy as np
+
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, inputs)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Batch texts of similar length together, then restore the input order
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[List[float]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._embed_batch([texts[i] for i in batch])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
+
+
+def _create_embeddings() -> InstrumentedEmbeddings:
+    if EMBEDDING_PROVIDER == "onnx":
+        model_dir = os.getenv("ONNX_EMBEDDING_MODEL_DIR", "models/paraphrase-multilingual-MiniLM-L12-v2")
+        return InstrumentedEmbeddings(OnnxEmbeddings(
+            model_dir,
+            batch_size=int(os.getenv("ONNX_EMBEDDING_BATCH_SIZE", "32")),
+            intra_op_threads=int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+        ), identity=f"onnx:{os.path.basename(os.path.normpath(model_dir))}")
+    if EMBEDDING_PROVIDER != "openai":
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER: {EMBEDDING_PROVIDER}")
+    from langchain_openai import OpenAIEmbeddings
+    client = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
+    return InstrumentedEmbeddings(client, identity=f"openai:{client.model}")
+
+
+_embeddings: Optional[InstrumentedEmbeddings] = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings() -> InstrumentedEmbeddings:
+    """Return the process-wide embeddings client selected by ``EMBEDDING_PROVIDER``."""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                _embeddings = _create_embeddings()
+                _embeddings.load_snapshot()
+    return _embeddings
+
+
+def snapshot_query_embeddings() -> Optional[int]:
+    """Snapshot the query cache of the embeddings client, if one has been created."""
+    return _embeddings.snapshot() if _embeddings is not None else None
+
+
+def collection_for(name: str) -> str:
+    """Vector collection name for the active provider, whose vectors differ in size."""
+    return name if EMBEDDING_PROVIDER == "openai" else f"{name}_{EMBEDDING_PROVIDER}"
@@ -0,0 +1,75 @@
+import json
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class EventBus:
+    """In-process publish/subscribe for pushing backend changes to clients.
+
+    Services publish from any thread; subscribers are asyncio queues owned by
+    the streaming endpoint. Events published with a ``session_id`` only reach
+    that session's subscribers, events without one are broadcast.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Dict[Optional[str], Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    def subscribe(self, session_id: Optional[str] = None) -> asyncio.Queue:
+        """Register a queue for a session. Must be called from the event loop."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(session_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue, session_id: Optional[str] = None):
+        with self._lock:
+            subscribers = self._subscribers.get(session_id, set())
+            for subscriber in [s for s in subscribers if s[1] is queue]:
+                subscribers.discard(subscriber)
+            if not subscribers:
+                self._subscribers.pop(session_id, None)
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event: Dict):
+        # Slow consumers lose their oldest events rather than blocking publishers
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def publish(self, event_type: str, data: Dict, session_id: Optional[str] = None):
+        """Publish an event to a session, or to everyone if no session is given."""
+        event = {
+            "type": event_type,
+            "data": data,
+            "timestamp": datetime.now().isoformat()
+        }
+        with self._lock:
+            targets = [
+                (key, loop, queue)
+                for key, subscribers in self._subscribers.items()
+                if session_id is None or key == session_id
+                for loop, queue in subscribers
+            ]
+        for key, loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # The subscriber's loop has been closed
+                self.unsubscribe(queue, key)
+
+    @staticmethod
+    def format_sse(event: Dict) -> str:
+        """Serialize an event in server-sent events wire format."""
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+event_bus = EventBus()
@@ -0,0 +1,281 @@
+"""Structured grades extracted from academic transcripts.
+
+At ingest, ``GradeService.extract`` parses transcript text line by line into
+``(term, course, title, credits, grade)`` rows stored in SQLite. At query
+time ``GradeService.answer`` recognises GPA, credit and grade lookup questions
+and answers them straight from the table; anything else returns ``None`` so
+the caller falls back to RAG.
+"""
+import os
+import re
+import sqlite3
+import logging
+from contextlib import closing
+from typing import Dict, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GRADES_DB_PATH = os.getenv("GRADES_DB_PATH", os.path.join("chroma_db", "grades.db"))
+
+# Fewer course rows than this and the document is not treated as a transcript
+MIN_COURSE_ROWS = 2
+
+GRADE_POINTS = {
+    "A+": 4.0, "A": 4.0, "A-": 3.7,
+    "B+": 3.3, "B": 3.0, "B-": 2.7,
+    "C+": 2.3, "C": 2.0, "C-": 1.7,
+    "D+": 1.3, "D": 1.0, "D-": 0.7,
+    "E": 0.0, "F": 0.0,
+}
+# Grades that earn credit without counting towards the GPA
+PASSING_GRADES = {"P", "S", "CR", "T", "TR"}
+GRADE_TOKEN = re.compile(r"^(?:[A-DF][+-]?|E|P|S|U|W|I|NP|CR|NC|T|TR|IP|WF|WP)$")
+NUMBER_TOKEN = re.compile(r"^\d{1,3}(?:\.\d{1,3})?$")
+COURSE_START = re.compile(r"^([A-Z]{2,8}(?:&[A-Z]+)?)\s*[- ]?\s*(\d{3,4}(?:\.\d{1,2})?[A-Z]{0,2})\s+(.*)$")
+
+SEASONS = {"winter": 0, "spring": 1, "summer": 2, "fall": 3, "autumn": 3}
+TERM_PATTERN = re.compile(
+    r"\b(?:(winter|spring|summer|fall|autumn)\s+(?:term\s+|semester\s+|quarter\s+)?(\d{4})"
+    r"|(\d{4})\s+(winter|spring|summer|fall|autumn))\b",
+    re.IGNORECASE
+)
+# Summary lines such as "FALL 2023 TERM GPA 3.50" or "TERM TOTALS 15.0" are not courses
+SUMMARY_WORDS = re.compile(r"\b(?:GPA|QPA)\b|\bTOTALS?\s*:?\s*\d", re.IGNORECASE)
+REPORTED_GPA = re.compile(r"\b(cumulative|cum|overall|career|term|semester)\.?\s+gpa\s*:?\s*(\d\.\d{1,3})\b", re.IGNORECASE)
+
+Row = Dict[str, object]
+
+
+def _courses(count: int) -> str:
+    return f"{count} course{'' if count == 1 else 's'}"
+
+
+def parse_term(text: str) -> Optional[Tuple[str, int]]:
+    """Return (label, sort order) for the first term mentioned in text."""
+    match = TERM_PATTERN.search(text)
+    if not match:
+        return None
+    season = (match.group(1) or match.group(4)).lower()
+    year = int(match.group(2) or match.group(3))
+    return f"{season.capitalize()} {year}", year * 10 + SEASONS[season]
+
+
+def parse_course_line(line: str) -> Optional[Row]:
+    """Parse ``SUBJ 1234 Title ... credits grade`` in any order of the trailing columns."""
+    match = COURSE_START.match(line.strip())
+    if not match:
+        return None
+    subject, number, rest = match.groups()
+    if TERM_PATTERN.match(f"{subject} {number}") or SUMMARY_WORDS.search(rest):
+        return None
+    tokens = rest.split()
+
+    # The trailing columns are numbers plus at most one grade
+    tail: List[str] = []
+    grade = None
+    while tokens:
+        token = tokens[-1]
+        if NUMBER_TOKEN.match(token):
+            tail.append(tokens.pop())
+        elif grade is None and GRADE_TOKEN.match(token):
+            grade = tokens.pop()
+            tail.append(grade)
+        else:
+            break
+    if grade == "I" and tail[-1] == "I":
+        # A leading "I" is the end of a title such as "Calculus I", not an incomplete
+        tokens.append(tail.pop())
+        grade = None
+    numbers = [float(token) for token in reversed(tail) if NUMBER_TOKEN.match(token)]
+    if not tokens or not numbers or numbers[0] > 30:
+        return None
+    return {
+        "course": f"{subject} {number}",
+        "title": " ".join(tokens),
+        "credits": numbers[0],
+        "grade": grade,
+    }
+
+
+def parse_transcript(text: str) -> Tuple[List[Row], List[Row]]:
+    """Extract course rows and any GPAs the transcript reports."""
+    rows: List[Row] = []
+    reported: List[Row] = []
+    term, term_order = None, 0
+    for line in text.splitlines():
+        course = parse_course_line(line)
+        if course:
+            rows.append({**course, "term": term, "term_order": term_order})
+            continue
+        parsed = parse_term(line)
+        if parsed:
+            term, term_order = parsed
+        for kind, value in REPORTED_GPA.findall(line):
+            kind = "term" if kind.lower() in ("term", "semester") else "cumulative"
+            reported.append({"term": term if kind == "term" else None, "kind": kind, "value": float(value)})
+    return rows, reported
+
+
+class GradeService:
+    def __init__(self, db_path: str = GRADES_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS grades (
+                    document_id TEXT NOT NULL,
+                    session_id TEXT,
+                    term TEXT,
+                    term_order INTEGER,
+                    course TEXT NOT NULL,
+                    title TEXT,
+                    credits REAL,
+                    grade TEXT
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS grades_document ON grades (document_id)")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS reported_gpa (
+                    document_id TEXT NOT NULL,
+                    term TEXT,
+                    kind TEXT NOT NULL,
+                    value REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS reported_gpa_document ON reported_gpa (document_id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=10)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def extract(self, document_id: str, text: str, session_id: Optional[str] = None) -> int:
+        """Parse a transcript and store its rows, returning how many courses were found."""
+        try:
+            rows, reported = parse_transcript(text)
+            if len(rows) < MIN_COURSE_ROWS:
+                return 0
+            with closing(self._connect()) as db, db:
+                db.execute("DELETE FROM grades WHERE document_id = ?", (document_id,))
+                db.execute("DELETE FROM reported_gpa WHERE document_id = ?", (document_id,))
+                db.executemany(
+                    "INSERT INTO grades VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(document_id, session_id, r["term"], r["term_order"], r["course"], r["title"], r["credits"], r["grade"])
+                     for r in rows]
+                )
+                db.executemany(
+                    "INSERT INTO reported_gpa VALUES (?, ?, ?, ?)",
+                    [(document_id, r["term"], r["kind"], r["value"]) for r in reported]
+                )
+            logger.info(f"Extracted {len(rows)} course grades from document {document_id}")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error extracting grades: {str(e)}")
+            raise
+
+    def delete_document(self, document_id: str):
+        with closing(self._connect()) as db, db:
+            db.execute("DELETE FROM grades WHERE document_id = ?", (document_id,))
+            db.execute("DELETE FROM reported_gpa WHERE document_id = ?", (document_id,))
+
+    def has_document(self, document_id: str) -> bool:
+        with closing(self._connect()) as db:
+            return db.execute(
+                "SELECT 1 FROM grades WHERE document_id = ? UNION ALL SELECT 1 FROM reported_gpa WHERE document_id = ? LIMIT 1",
+                (document_id, document_id)
+            ).fetchone() is not None
+
+    def _rows(self, document_id: str) -> List[sqlite3.Row]:
+        with closing(self._connect()) as db:
+            return db.execute(
+                "SELECT term, term_order, course, title, credits, grade FROM grades "
+                "WHERE document_id = ? ORDER BY term_order, rowid",
+                (document_id,)
+            ).fetchall()
+
+    def _reported(self, document_id: str, kind: str, term: Optional[str]) -> Optional[float]:
+        with closing(self._connect()) as db:
+            row = db.execute(
+                "SELECT value FROM reported_gpa WHERE document_id = ? AND kind = ? AND term IS ? "
+                "ORDER BY rowid DESC LIMIT 1",
+                (document_id, kind, term)
+            ).fetchone()
+        return row["value"] if row else None
+
+    # -- query routing --------------------------------------------------
+
+    @staticmethod
+    def _scope(question: str, rows: List[sqlite3.Row]) -> Tuple[Optional[str], List[sqlite3.Row]]:
+        """Narrow rows to the term a question asks about, if any."""
+        terms = sorted({(r["term_order"], r["term"]) for r in rows if r["term"]})
+        explicit = parse_term(question)
+        if explicit:
+            label = explicit[0]
+        elif re.search(r"\b(this|current)\s+(semester|term|quarter)\b", question) and terms:
+            label = terms[-1][1]
+        elif re.search(r"\b(last|previous|prior)\s+(semester|term|quarter)\b", question) and len(terms) > 1:
+            label = terms[-2][1]
+        else:
+            return None, rows
+        return label, [r for r in rows if r["term"] == label]
+
+    @staticmethod
+    def _format_course(row: sqlite3.Row) -> str:
+        details = ", ".join(str(v) for v in (row["grade"], row["term"]) if v)
+        return f"{row['course']} {row['title']}" + (f" ({details})" if details else "")
+
+    def answer(self, document_id: str, question: str) -> Optional[str]:
+        """Answer GPA, credit and grade lookup questions from the table, or return None."""
+        rows = self._rows(document_id)
+        if not rows:
+            return None
+        q = question.lower()
+        term, scoped = self._scope(q, rows)
+        if not scoped:
+            return None
+        where = f" for {term}" if term else ""
+
+        if re.search(r"\bgpa\b|grade point average", q):
+            reported = self._reported(document_id, "term" if term else "cumulative", term)
+            if reported is not None:
+                return f"The transcript reports a {'term' if term else 'cumulative'} GPA of {reported:.2f}{where}."
+            graded = [r for r in scoped if r["grade"] in GRADE_POINTS and r["credits"]]
+            credits = sum(r["credits"] for r in graded)
+            if not credits:
+                return None
+            gpa = sum(GRADE_POINTS[r["grade"]] * r["credits"] for r in graded) / credits
+            return (f"The GPA{where} is {gpa:.2f}, calculated from {_courses(len(graded))} "
+                    f"with letter grades ({credits:g} credits) on the transcript.")
+
+        if re.search(r"\bcredits?\b|credit hours", q):
+            earned = [r for r in scoped if r["grade"] in PASSING_GRADES or GRADE_POINTS.get(r["grade"], 0) > 0]
+            in_progress = [r for r in scoped if r["grade"] is None or r["grade"] == "IP"]
+            answer = f"{sum(r['credits'] for r in earned):g} credits were earned{where} across {_courses(len(earned))}."
+            if in_progress:
+                answer += f" {sum(r['credits'] for r in in_progress):g} more credits are in progress."
+            return answer
+
+        grade = re.search(r"\b(?:got|get|received|earned|grade of|with)\s+(?:an?\s+)?([a-f][+-]?)(?=[\s?.!,]|$)", q)
+        if grade and re.search(r"\b(courses?|classes|subjects?)\b", q):
+            letter = grade.group(1).upper()
+            family = {letter} if len(letter) == 2 else {letter, f"{letter}+", f"{letter}-"}
+            matches = [r for r in scoped if r["grade"] in family]
+            if not matches:
+                return f"No courses{where} have a grade of {letter}."
+            return f"Courses{where} with a grade of {letter}:\n" + "\n".join(
+                f"- {self._format_course(r)}" for r in matches
+            )
+
+        codes = {re.sub(r"\s+", " ", c) for c in re.findall(r"\b[A-Z]{2,8}\s?\d{3,4}(?:\.\d{1,2})?[A-Z]{0,2}\b", question.upper())}
+        named = [r for r in scoped if r["course"] in codes or (r["title"] and re.search(rf"\b{re.escape(r['title'].lower())}\b", q))]
+        if named and re.search(r"\bgrades?\b|\bscore\b|\bdo\b|\bdid\b", q):
+            return "\n".join(f"- {self._format_course(r)}" for r in named)
+
+        if term and re.search(r"\b(courses?|classes)\b", q):
+            return f"Courses{where}:\n" + "\n".join(f"- {self._format_course(r)}" for r in scoped)
+
+        return None
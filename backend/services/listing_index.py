@@ -0,0 +1,162 @@
+import json
+import uuid
+import base64
+import bisect
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+def _naive(value: datetime) -> datetime:
+    """Convert an aware datetime to naive local time, matching the stored timestamps."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+def parse_timestamp(value) -> datetime:
+    """Parse the ISO-style timestamps stored for conferences and documents."""
+    if isinstance(value, datetime):
+        return _naive(value)
+    try:
+        return _naive(datetime.fromisoformat(str(value)))
+    except (ValueError, OverflowError):
+        return datetime.min
+
+
+class ListingIndex:
+    """Summary index for a listing endpoint, maintained on write.
+
+    Entries are kept sorted by ``date_field`` so listing, filtering and cursor
+    pagination never have to walk the underlying records. Every change bumps a
+    version that is exposed as an ETag, letting clients revalidate cheaply.
+    """
+
+    def __init__(self, date_field: str, language_field: Optional[str] = None):
+        self.date_field = date_field
+        self.language_field = language_field
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict] = {}
+        self._keys: List[Tuple[datetime, str]] = []
+        self._token = uuid.uuid4().hex[:8]
+        self._version = 0
+        self.last_updated: Optional[str] = None
+
+    def _key(self, entry_id: str, entry: Dict) -> Tuple[datetime, str]:
+        return (parse_timestamp(entry.get(self.date_field)), entry_id)
+
+    def _touch(self):
+        self._version += 1
+        self.last_updated = datetime.now().isoformat()
+
+    @property
+    def etag(self) -> str:
+        return f"{self._token}-{self._version}"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, entry_id: str) -> bool:
+        return entry_id in self._entries
+
+    def rebuild(self, entries: Dict[str, Dict]):
+        """Replace the whole index, e.g. after loading from disk."""
+        with self._lock:
+            self._entries = {entry_id: dict(entry) for entry_id, entry in entries.items()}
+            self._keys = sorted(self._key(entry_id, entry) for entry_id, entry in self._entries.items())
+            self._touch()
+
+    def upsert(self, entry_id: str, entry: Dict):
+        """Insert or replace the summary for an entry."""
+        with self._lock:
+            previous = self._entries.get(entry_id)
+            if previous is not None:
+                old_key = self._key(entry_id, previous)
+                position = bisect.bisect_left(self._keys, old_key)
+                if position < len(self._keys) and self._keys[position] == old_key:
+                    del self._keys[position]
+            self._entries[entry_id] = dict(entry)
+            bisect.insort(self._keys, self._key(entry_id, entry))
+            self._touch()
+
+    def update(self, entry_id: str, **fields):
+        """Update fields on an existing summary."""
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is not None:
+                self.upsert(entry_id, {**entry, **fields})
+
+    def remove(self, entry_id: str):
+        """Drop an entry from the index."""
+        with self._lock:
+            entry = self._entries.pop(entry_id, None)
+            if entry is None:
+                return
+            key = self._key(entry_id, entry)
+            position = bisect.bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+            self._touch()
+
+    def get(self, entry_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            return dict(entry) if entry is not None else None
+
+    @staticmethod
+    def encode_cursor(key: Tuple[datetime, str]) -> str:
+        raw = json.dumps([key[0].isoformat(), key[1]]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            timestamp, entry_id = json.loads(raw)
+            return (_naive(datetime.fromisoformat(timestamp)), str(entry_id))
+        except (ValueError, TypeError, OverflowError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    def page(
+        self,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        language: Optional[str] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """Return one page of summaries and the cursor for the next page."""
+        if limit is not None and limit <= 0:
+            raise ValueError("limit must be positive")
+        lower = parse_timestamp(start_date) if start_date else None
+        upper = parse_timestamp(end_date) if end_date else None
+        if (start_date and lower == datetime.min) or (end_date and upper == datetime.min):
+            raise ValueError("Dates must be ISO 8601 formatted")
+
+        with self._lock:
+            if cursor:
+                position = bisect.bisect_right(self._keys, self.decode_cursor(cursor))
+            elif lower is not None:
+                position = bisect.bisect_left(self._keys, (lower, ""))
+            else:
+                position = 0
+
+            items: List[Dict] = []
+            next_cursor = None
+            last_key = None
+            while position < len(self._keys):
+                key = self._keys[position]
+                position += 1
+                if lower is not None and key[0] < lower:
+                    continue
+                if upper is not None and key[0] > upper:
+                    break
+                entry = self._entries[key[1]]
+                if language and self.language_field and entry.get(self.language_field) != language:
+                    continue
+                if limit is not None and len(items) == limit:
+                    next_cursor = self.encode_cursor(last_key)
+                    break
+                items.append(dict(entry))
+                last_key = key
+        return items, next_cursor
@@ -0,0 +1,200 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Union
+
+import httpx
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+from services.metrics import span, record_token_usage
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+Messages = List[Dict[str, str]]
+
+# Wall-clock budget for all LLM calls made while answering one question
+QUERY_BUDGET_SECONDS = float(os.getenv("QUERY_BUDGET_SECONDS", "45"))
+
+SYSTEM_PROMPT = "You are a helpful assistant that helps parents understand their child's progress in school."
+
+# Pipeline stage each task is reported under
+TASK_STAGES = {
+    "detect": "language_detection",
+    "translate": "translation",
+    "answer": "llm",
+    "summary": "llm",
+}
+
+
+class BudgetExceeded(TimeoutError):
+    """Raised when a request has used up its time budget."""
+
+
+class Budget:
+    """Wall-clock budget shared by all LLM calls made for one request."""
+
+    def __init__(self, seconds: float):
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def timeout(self, per_call: float) -> float:
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise BudgetExceeded("Request time budget exhausted")
+        return min(per_call, remaining)
+
+
+class LLMGateway:
+    """Single entry point for chat completions.
+
+    Owns one keep-alive ``AsyncOpenAI`` client running on a dedicated event loop
+    thread, so every service shares a warm connection pool. Calls are bounded
+    by a concurrency limit, a per-task timeout and an optional request budget,
+    and routed to a small or large model depending on the task.
+    """
+
+    def __init__(self):
+        self.small_model = os.getenv("LLM_SMALL_MODEL", "gpt-4o-mini")
+        self.large_model = os.getenv("LLM_LARGE_MODEL", "gpt-4o")
+        # Summaries with more input than this are sent to the large model
+        self.large_input_chars = int(os.getenv("LLM_LARGE_INPUT_CHARS", "6000"))
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.timeouts = {
+            "detect": float(os.getenv("LLM_DETECT_TIMEOUT", "10")),
+            "translate": float(os.getenv("LLM_TRANSLATE_TIMEOUT", "20")),
+            "answer": float(os.getenv("LLM_ANSWER_TIMEOUT", "30")),
+            "summary": float(os.getenv("LLM_SUMMARY_TIMEOUT", "60")),
+        }
+
+        self._loop = asyncio.new_event_loop()
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True)
+        self._thread.start()
+
+    def _ensure_client(self) -> AsyncOpenAI:
+        # Only ever called on the gateway loop
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=1,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_concurrency * 2,
+                        max_keepalive_connections=self.max_concurrency,
+                        keepalive_expiry=60
+                    ),
+                    timeout=httpx.Timeout(60, connect=5)
+                )
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def model_for(self, task: str, prompt_chars: int) -> str:
+        """Pick the model for a task: long summaries go to the large model."""
+        if task == "summary" and prompt_chars > self.large_input_chars:
+            return self.large_model
+        return self.small_model
+
+    async def _complete(
+        self,
+        messages: Messages,
+        model: str,
+        timeout: float,
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
+        client = self._ensure_client()
+        async with self._semaphore:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout
+            )
+        record_token_usage(response.model, response.usage)
+        return response.choices[0].message.content or ""
+
+    async def acomplete(
+        self,
+        prompt: Union[str, Messages],
+        task: str = "answer",
+        temperature: float = 0,
+        max_tokens: Optional[int] = None,
+        budget: Optional[Budget] = None
+    ) -> str:
+        """Run a chat completion from async code."""
+        with span(TASK_STAGES.get(task, "llm")):
+            future = self._submit(prompt, task, temperature, max_tokens, budget)
+            return await asyncio.wrap_future(future)
+
+    def complete(
+        self,
+        prompt: Union[str, Messages],
+        task: str = "answer",
+        temperature: float = 0,
+        max_tokens: Optional[int] = None,
+        budget: Optional[Budget] = None
+    ) -> str:
+        """Run a chat completion from synchronous code, blocking until done."""
+        with span(TASK_STAGES.get(task, "llm")):
+            future = self._submit(prompt, task, temperature, max_tokens, budget)
+            try:
+                return future.result()
+            except BaseException:
+                future.cancel()
+                raise
+
+    def _submit(self, prompt, task, temperature, max_tokens, budget):
+        messages = prompt if isinstance(prompt, list) else [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        model = self.model_for(task, prompt_chars)
+        per_call = self.timeouts.get(task, self.timeouts["answer"])
+        timeout = budget.timeout(per_call) if budget else per_call
+
+        return asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(self._complete(messages, model, timeout, temperature, max_tokens), timeout),
+            self._loop
+        )
+
+    def close(self):
+        """Close the connection pool and stop the gateway loop."""
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the process-wide LLM gateway, creating it on first use."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
+
+
+def close_llm_gateway():
+    """Close the process-wide LLM gateway if it was ever created."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is not None:
+            _gateway.close()
+            _gateway = None
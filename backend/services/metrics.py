@@ -0,0 +1,237 @@
+"""Low-overhead in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are plain dictionaries guarded by a lock, so
+recording a sample costs a dictionary update. ``span`` times a pipeline stage
+into the shared stage histogram and onto the current request's trace, which
+the metrics middleware returns as a ``Server-Timing`` header.
+"""
+import time
+import bisect
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_trace: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("current_trace", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _labels(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _format_labels(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every labelled series of this metric."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._labels(labels), 0)
+
+    def values(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._format_labels(k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._labels(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[position] += 1
+            self._sums[key] += value
+
+    def summary(self) -> Dict[LabelValues, Dict[str, float]]:
+        """Return the observation count and sum for each label set."""
+        with self._lock:
+            return {k: {"count": sum(c), "sum": self._sums[k]} for k, c in self._counts.items()}
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(c), self._sums[k]) for k, c in self._counts.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', repr(bound)))} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "speaklink_http_requests_total", "HTTP requests by route, method and status.", ("method", "route", "status")))
+REQUEST_LATENCY = registry.register(Histogram(
+    "speaklink_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")))
+IN_FLIGHT = registry.register(Gauge(
+    "speaklink_http_requests_in_flight", "HTTP requests currently being served.", ("method", "route")))
+STAGE_LATENCY = registry.register(Histogram(
+    "speaklink_stage_duration_seconds", "Latency of individual pipeline stages.", ("stage",)))
+STAGE_ERRORS = registry.register(Counter(
+    "speaklink_stage_errors_total", "Pipeline stages that raised an exception.", ("stage",)))
+TOKENS = registry.register(Counter(
+    "speaklink_llm_tokens_total", "LLM tokens used, by model and kind.", ("model", "kind")))
+QUERY_ROUTES = registry.register(Counter(
+    "speaklink_query_routes_total", "Questions answered from structured data or by RAG.", ("route",)))
+OCR_CACHE = registry.register(Counter(
+    "speaklink_ocr_cache_total", "OCR cache lookups by result.", ("result",)))
+QUERY_EMBEDDING_CACHE = registry.register(Counter(
+    "speaklink_query_embedding_cache_total", "Query embedding cache lookups by result.", ("result",)))
+COALESCED_REQUESTS = registry.register(Counter(
+    "speaklink_coalesced_requests_total", "Requests that joined an identical request already in flight.", ("route",)))
+ADMISSION_REJECTED = registry.register(Counter(
+    "speaklink_admission_rejected_total", "Requests rejected with 429, by route and reason.", ("route", "reason")))
+AUDIO_SECONDS = registry.register(Counter(
+    "speaklink_audio_seconds_total", "Seconds of conference audio received, and kept as speech for STT.", ("kind",)))
+POOL_CAPACITY = registry.register(Gauge(
+    "speaklink_pool_capacity", "Slots in each worker pool.", ("pool",)))
+POOL_BUSY = registry.register(Gauge(
+    "speaklink_pool_busy", "Work items holding a slot in each worker pool.", ("pool",)))
+POOL_WAITING = registry.register(Gauge(
+    "speaklink_pool_waiting", "Work items queued for a slot in each worker pool.", ("pool",)))
+EVENT_LOOP_LAG = registry.register(Histogram(
+    "speaklink_event_loop_lag_seconds", "How late the event loop ran a timer, i.e. time it spent blocked.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)))
+CONTEXT_TOKENS = registry.register(Histogram(
+    "speaklink_context_tokens", "Prompt context size in tokens before and after assembly.", ("source", "phase"),
+    buckets=(100, 250, 500, 1000, 1500, 2000, 4000, 8000, 16000, 32000)))
+
+
+@contextmanager
+def span(stage: str):
+    """Time a pipeline stage and attach it to the current request trace."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_LATENCY.observe(elapsed, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append((stage, elapsed))
+
+
+def start_trace() -> List[Tuple[str, float]]:
+    """Begin collecting spans for the current request."""
+    trace: List[Tuple[str, float]] = []
+    _current_trace.set(trace)
+    return trace
+
+
+def server_timing(trace: List[Tuple[str, float]]) -> str:
+    """Format a request trace as a Server-Timing header value."""
+    return ", ".join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in trace)
+
+
+def record_token_usage(model: str, usage) -> None:
+    """Count prompt and completion tokens from an OpenAI-style usage object or dict."""
+    if not usage:
+        return
+    get = usage.get if isinstance(usage, dict) else lambda key, default=0: getattr(usage, key, default)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        count = get(kind, 0) or 0
+        if count:
+            TOKENS.inc(count, model=model or "unknown", kind=kind.replace("_tokens", ""))
+
+
+async def watch_event_loop(interval: float = 0.1):
+    """Record event loop lag until cancelled; route handlers that block the loop show up here."""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - started - interval))
+
+
+def render() -> str:
+    return registry.render()
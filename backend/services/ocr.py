@@ -0,0 +1,216 @@
+"""OCR stage for uploaded images.
+
+Phone photos of report cards are often 12 MP or more, rotated by EXIF and
+slightly skewed. ``OcrService`` normalises them before tesseract sees them:
+
+* EXIF rotation, grayscale and downscaling to roughly ``OCR_TARGET_DPI``
+* Otsu binarisation
+* deskew by maximising the row-projection variance over small angles
+* a page segmentation mode picked from the page layout
+
+Results are cached on disk under a key of the image's SHA-256 and the OCR
+settings, so re-uploads and re-indexing skip tesseract entirely.
+"""
+import os
+import hashlib
+import logging
+from functools import cached_property
+from typing import Optional, Tuple
+
+import numpy as np
+import pytesseract
+from PIL import Image, ImageOps
+from services.metrics import OCR_CACHE, span
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "ocr_cache")
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", "eng")
+
+# Long side of a letter-size page, used to estimate DPI for photos
+PAGE_LONG_SIDE_INCHES = 11.0
+# Skew angles tried when deskewing, in degrees
+MAX_SKEW_DEGREES = 5.0
+SKEW_STEP_DEGREES = 0.5
+# Size the layout and skew analysis runs at
+ANALYSIS_LONG_SIDE = 1000
+
+PSM_AUTO = 3
+PSM_SINGLE_BLOCK = 6
+PSM_SINGLE_LINE = 7
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Threshold that best separates the two modes of a grayscale histogram."""
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = gray.size
+    levels = np.arange(256)
+    weight_bg = np.cumsum(histogram)
+    weight_fg = total - weight_bg
+    sum_bg = np.cumsum(histogram * levels)
+    mean_bg = sum_bg / np.maximum(weight_bg, 1)
+    mean_fg = (sum_bg[-1] - sum_bg) / np.maximum(weight_fg, 1)
+    between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between))
+
+
+def _runs(mask: np.ndarray) -> int:
+    """Number of runs of True values in a 1-D mask."""
+    padded = np.concatenate([[False], mask, [False]])
+    return int(np.count_nonzero(padded[1:] & ~padded[:-1]))
+
+
+class OcrService:
+    def __init__(
+        self,
+        cache_dir: Optional[str] = OCR_CACHE_DIR,
+        target_dpi: int = OCR_TARGET_DPI,
+        languages: str = OCR_LANGUAGES,
+        binarize: bool = True,
+        deskew: bool = True
+    ):
+        self.cache_dir = cache_dir
+        self.target_dpi = target_dpi
+        self.languages = languages
+        self.binarize = binarize
+        self.deskew = deskew
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @cached_property
+    def settings(self) -> str:
+        """Everything that changes OCR output, folded into the cache key."""
+        try:
+            version = str(pytesseract.get_tesseract_version())
+        except Exception:
+            version = "unknown"
+        return f"v1|dpi={self.target_dpi}|lang={self.languages}|bin={self.binarize}|deskew={self.deskew}|tess={version}"
+
+    def _cache_path(self, image_path: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha256()
+        with open(image_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        digest.update(self.settings.encode())
+        return os.path.join(self.cache_dir, f"{digest.hexdigest()}.txt")
+
+    def extract_text(self, image_path: str) -> str:
+        """OCR an image file, reusing a cached result when one exists."""
+        try:
+            cache_path = self._cache_path(image_path)
+            if cache_path and os.path.exists(cache_path):
+                OCR_CACHE.inc(result="hit")
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    return f.read()
+            OCR_CACHE.inc(result="miss")
+
+            with span("ocr_preprocess"):
+                image, psm = self.preprocess(Image.open(image_path))
+            with span("ocr"):
+                text = pytesseract.image_to_string(
+                    image,
+                    lang=self.languages,
+                    config=f"--psm {psm} -c preserve_interword_spaces=1"
+                )
+
+            if cache_path:
+                tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(tmp_path, cache_path)
+            return text
+        except Exception as e:
+            logger.error(f"Error in OCR: {str(e)}")
+            raise
+
+    def forget(self, image_path: str) -> bool:
+        """Drop the cached text for an image. Returns whether there was one."""
+        cache_path = self._cache_path(image_path)
+        if not cache_path or not os.path.exists(cache_path):
+            return False
+        os.remove(cache_path)
+        return True
+
+    def preprocess(self, image: Image.Image) -> Tuple[Image.Image, int]:
+        """Normalise an image for tesseract and pick its page segmentation mode."""
+        image = ImageOps.exif_transpose(image).convert("L")
+        image = self._rescale(image)
+
+        small = image.copy()
+        small.thumbnail((ANALYSIS_LONG_SIDE, ANALYSIS_LONG_SIDE))
+        small_gray = np.asarray(small)
+        threshold = otsu_threshold(small_gray)
+        ink = small_gray < threshold
+
+        if self.deskew:
+            angle = self._skew_angle(small, threshold)
+            if angle:
+                image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+                small = small.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+                ink = np.asarray(small) < threshold
+
+        if self.binarize:
+            image = image.point(lambda value: 255 if value >= threshold else 0, mode="1")
+
+        return image, self._page_segmentation_mode(ink)
+
+    def _rescale(self, image: Image.Image) -> Image.Image:
+        """Resize so a full page lands near the target DPI."""
+        target_long_side = int(self.target_dpi * PAGE_LONG_SIDE_INCHES)
+        long_side = max(image.size)
+        if long_side > target_long_side:
+            scale = target_long_side / long_side
+        elif long_side < target_long_side / 3:
+            # Tiny crops and screenshots OCR better when enlarged
+            scale = 2.0
+        else:
+            return image
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        return image.resize(size, Image.LANCZOS)
+
+    @staticmethod
+    def _skew_angle(small: Image.Image, threshold: int) -> float:
+        """Angle whose rotation makes text rows most sharply separated."""
+        best_angle, best_score = 0.0, None
+        steps = int(MAX_SKEW_DEGREES / SKEW_STEP_DEGREES)
+        for i in range(-steps, steps + 1):
+            angle = i * SKEW_STEP_DEGREES
+            rotated = small.rotate(angle, resample=Image.NEAREST, fillcolor=255) if angle else small
+            rows = (np.asarray(rotated) < threshold).sum(axis=1).astype(np.float64)
+            score = np.var(rows)
+            if best_score is None or score > best_score:
+                best_angle, best_score = angle, score
+        return best_angle
+
+    @staticmethod
+    def _page_segmentation_mode(ink: np.ndarray) -> int:
+        """Single line, uniform block (prose, tables, report cards) or automatic for columns."""
+        if not ink.any():
+            return PSM_SINGLE_BLOCK
+        height, width = ink.shape
+        text_rows = ink.sum(axis=1) > max(1, width // 200)
+        lines = _runs(text_rows)
+        if lines <= 1:
+            return PSM_SINGLE_LINE
+
+        # A blank vertical gutter through the text band means columns: a table
+        # if the text rows line up on both sides of it, otherwise flowing text
+        top, bottom = np.argmax(text_rows), height - np.argmax(text_rows[::-1])
+        margin = width // 10
+        band = ink[top:bottom, margin:width - margin]
+        blank = np.concatenate([[False], band.sum(axis=0) == 0, [False]])
+        starts = np.flatnonzero(blank[1:] & ~blank[:-1])
+        ends = np.flatnonzero(~blank[1:] & blank[:-1])
+        if not len(starts) or np.max(ends - starts) < max(2, width // 40):
+            return PSM_SINGLE_BLOCK
+        widest = int(np.argmax(ends - starts))
+        left_rows = band[:, :starts[widest]].any(axis=1)
+        right_rows = band[:, ends[widest]:].any(axis=1)
+        if np.mean(left_rows == right_rows) >= 0.85:
+            return PSM_SINGLE_BLOCK
+        return PSM_AUTO
@@ -1,11 +1,16 @@
-from langchain_openai import ChatOpenAI
-from langchain.chains import RetrievalQA
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
 from langchain.prompts import PromptTemplate
+from langchain_core.documents import Document
 from dotenv import load_dotenv
 import os
 import logging
+from typing import List, Optional, Tuple
+from services.embeddings import collection_for, get_embeddings
+from services.vector_store import PartitionedVectorStore
+from services.grade_service import GradeService
+from services.metrics import QUERY_ROUTES, span
+from services.context_builder import ContextBuilder
+from services.llm_gateway import Budget, QUERY_BUDGET_SECONDS, get_llm_gateway
+from services.tombstones import EntityDeleted, get_tombstone_store
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,15 +21,15 @@ load_dotenv()
 
 class RAGService:
     def __init__(self):
-        self.embeddings = OpenAIEmbeddings(openai_api_key=os.getenv('OPENAI_API_KEY'))
-        self.vector_store = Chroma(
-            persist_directory="chroma_db",
-            embedding_function=self.embeddings,
-            collection_name="documents"
-        )
-        self.llm = ChatOpenAI(
-            temperature=0,
-            openai_api_key=os.getenv('OPENAI_API_KEY')
+        self.embeddings = get_embeddings()
+        self.vector_stores = PartitionedVectorStore(collection_for("documents"), self.embeddings, partition_key="document_id")
+        self.grades = GradeService()
+        self.llm = get_llm_gateway()
+        self.tombstones = get_tombstone_store()
+        self.context_builder = ContextBuilder()
+        # Summaries read the whole document, so they get a larger budget
+        self.summary_context_builder = ContextBuilder(
+            max_tokens=int(os.getenv("SUMMARY_CONTEXT_MAX_TOKENS", "6000"))
         )
         
         self.prompt_template = """You are a helpful assistant that helps parents understand their child's academic progress.
@@ -70,49 +75,97 @@ class RAGService:
             input_variables=["text"]
         )
     
-    def detect_language(self, text: str) -> str:
+    def detect_language(self, text: str, budget: Optional[Budget] = None) -> str:
         """Detect the language of the input text"""
-        chain = self.language_detection_prompt | self.llm
-        result = chain.invoke({"text": text})
-        return result.content.strip().lower()
+        result = self.llm.complete(
+            self.language_detection_prompt.format(text=text),
+            task="detect",
+            budget=budget
+        )
+        return result.strip().lower()
     
-    def translate_text(self, text: str, source_lang: str, target_lang: str) -> str:
+    def translate_text(self, text: str, source_lang: str, target_lang: str, budget: Optional[Budget] = None) -> str:
         """Translate text from source language to target language"""
         if source_lang == target_lang:
             return text
             
-        chain = self.translation_prompt | self.llm
-        result = chain.invoke({
-            "text": text,
-            "source_lang": source_lang,
-            "target_lang": target_lang
-        })
-        return result.content.strip()
+        result = self.llm.complete(
+            self.translation_prompt.format(
+                text=text,
+                source_lang=source_lang,
+                target_lang=target_lang
+            ),
+            task="translate",
+            budget=budget
+        )
+        return result.strip()
+    
+    def english_question(self, question: str, budget: Optional[Budget] = None) -> str:
+        """Translate a question to English if it is in another language."""
+        # Detect the language of the question
+        detected_lang = self.detect_language(question, budget)
+        logger.info(f"Detected language: {detected_lang}")
+        
+        # If the question is not in English, translate it first
+        if detected_lang != "en":
+            question = self.translate_text(question, detected_lang, "en", budget)
+            logger.info(f"Translated question to English: {question}")
+        return question
+
+    def prepare_question(self, question: str, document_ids: List[str], budget: Optional[Budget] = None) -> Tuple[str, str]:
+        """Return the question to retrieve with and the English question for the grades table.
+
+        Multilingual embeddings match any language against English chunks, so
+        retrieval uses the question as asked. The grades table only matches
+        English keywords, so the question is still translated when one of the
+        documents has grades.
+        """
+        if not self.embeddings.multilingual:
+            english = self.english_question(question, budget)
+            return english, english
+        if any(self.grades.has_document(document_id) for document_id in document_ids):
+            return question, self.english_question(question, budget)
+        return question, question
     
-    def query_document(self, document_id: str, question: str, language: str) -> str:
+    def _retrieve(self, document_id: str, question: str, session_id: Optional[str], k: int = 5):
+        """Search the session's partition, then the shared pre-partitioning collection."""
+        where = {"document_id": document_id}
+        docs = []
+        store = self.vector_stores.existing(session_id) if session_id else None
+        if store is not None:
+            docs = store.similarity_search(question, k=k, filter=where)
+        if not docs:
+            docs = self.vector_stores.partition(None).similarity_search(question, k=k, filter=where)
+        return docs
+    
+    def _check_not_deleted(self, document_id: str):
+        # Chunks of a deleted document stay in the index until the cleanup worker purges them
+        if self.tombstones.is_deleted("document", document_id):
+            raise EntityDeleted(f"Document {document_id} has been deleted")
+
+    def query_document(self, document_id: str, question: str, language: str, session_id: Optional[str] = None) -> str:
+        budget = Budget(QUERY_BUDGET_SECONDS)
         try:
-            # Detect the language of the question
-            detected_lang = self.detect_language(question)
-            logger.info(f"Detected language: {detected_lang}, Target language: {language}")
-            
-            # If the question is not in English, translate it first
-            if detected_lang != "en":
-                question = self.translate_text(question, detected_lang, "en")
-                logger.info(f"Translated question to English: {question}")
-            
-            # Create retriever with appropriate search parameters
-            retriever = self.vector_store.as_retriever(
-                search_kwargs={
-                    "filter": {"document_id": document_id},
-                    "k": 5  # Number of relevant chunks to retrieve
-                }
-            )
+            self._check_not_deleted(document_id)
+
+            question, english = self.prepare_question(question, [document_id], budget)
+            
+            # GPA, credit and grade questions are answered from the grades table
+            with span("grade_lookup"):
+                structured = self.grades.answer(document_id, english)
+            if structured:
+                QUERY_ROUTES.inc(route="structured")
+                if language != "en":
+                    structured = self.translate_text(structured, "en", language, budget)
+                return structured
+            QUERY_ROUTES.inc(route="rag")
             
             # Create a custom chain that processes the query in English
             def custom_chain(inputs):
                 # Get relevant documents
-                docs = retriever.get_relevant_documents(inputs["query"])
-                context = "\n".join([doc.page_content for doc in docs])
+                with span("retrieval"):
+                    docs = self._retrieve(document_id, inputs["query"], session_id)
+                context, _ = self.context_builder.build(docs, source="document")
                 
                 # Format the prompt with all required variables
                 formatted_prompt = self.prompt.format(
@@ -121,8 +174,8 @@ class RAGService:
                 )
                 
                 # Get the answer from the LLM
-                response = self.llm.invoke(formatted_prompt)
-                return {"result": response.content}
+                response = self.llm.complete(formatted_prompt, task="answer", budget=budget)
+                return {"result": response}
             
             # Get answer with error handling
             result = custom_chain({
@@ -131,10 +184,13 @@ class RAGService:
             
             # If the target language is not English, translate the answer
             if language != "en":
-                result["result"] = self.translate_text(result["result"], "en", language)
+                result["result"] = self.translate_text(result["result"], "en", language, budget)
                 logger.info(f"Translated answer to {language}")
             
             return result["result"]
+        except EntityDeleted:
+            # The routes answer 404 for deleted documents
+            raise
         except Exception as e:
             logger.error(f"Error in query_document: {str(e)}")
             error_message = f"Error processing your question: {str(e)}"
@@ -142,13 +198,10 @@ class RAGService:
                 error_message = self.translate_text(error_message, "en", language)
             return error_message
     
-    def get_document_summary(self, document_id: str, language: str) -> str:
+    def get_document_summary(self, document_id: str, language: str, session_id: Optional[str] = None) -> str:
         try:
-            # Retrieve all chunks for the document
-            retriever = self.vector_store.as_retriever(
-                search_kwargs={"filter": {"document_id": document_id}}
-            )
-            
+            self._check_not_deleted(document_id)
+
             # Create summary prompt
             summary_prompt = PromptTemplate(
                 template="""Please provide a comprehensive summary of the following academic document.
@@ -161,21 +214,31 @@ class RAGService:
                 input_variables=["document"]
             )
             
-            # Get document content
-            docs = retriever.get_relevant_documents("")
-            document_content = "\n".join([doc.page_content for doc in docs])
+            # Get all chunks of the document
+            with span("retrieval"):
+                chunks = self.vector_stores.locate(session_id, {"document_id": document_id}).get(
+                    where={"document_id": document_id}
+                )
+            docs = [
+                Document(page_content=text, metadata=metadata)
+                for text, metadata in zip(chunks["documents"], chunks["metadatas"])
+            ]
+            document_content, _ = self.summary_context_builder.build(docs, source="summary")
             
             # Generate summary in English
-            chain = summary_prompt | self.llm
-            result = chain.invoke({
-                "document": document_content
-            })
+            result = self.llm.complete(
+                summary_prompt.format(document=document_content),
+                task="summary"
+            )
             
             # If the target language is not English, translate the summary
             if language != "en":
-                result.content = self.translate_text(result.content, "en", language)
+                result = self.translate_text(result, "en", language)
             
-            return result.content
+            return result
+        except EntityDeleted:
+            # The routes answer 404 for deleted documents
+            raise
         except Exception as e:
             logger.error(f"Error in get_document_summary: {str(e)}")
             error_message = f"Error generating summary: {str(e)}"
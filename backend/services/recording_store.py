@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import logging
+import threading
+import subprocess
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COMPRESSED_EXTENSIONS = (".ogg", ".opus")
+
+
+class RecordingStore:
+    """Index and lifecycle management for conference recordings on disk.
+
+    Recordings are saved as ``{conference_id}_{filename}``. The store keeps an
+    in-memory index from conference id to file names so lookups and deletes do
+    not have to scan the directory, and runs a background maintenance loop that
+    transcodes old recordings to Opus, enforces retention and size quotas and
+    reports orphaned files. Orphans are only deleted when
+    ``RECORDING_ORPHAN_DELETE`` is set, since a conference missing from the
+    referenced ids may come from a stale or partial listing.
+    """
+
+    def __init__(
+        self,
+        recordings_dir: str = "recordings",
+        referenced_ids: Optional[Callable[[], Iterable[str]]] = None,
+        ffmpeg_available: Optional[Callable[[], bool]] = None,
+    ):
+        self.recordings_dir = recordings_dir
+        self.referenced_ids = referenced_ids
+        self.ffmpeg_available = ffmpeg_available or (lambda: False)
+        os.makedirs(self.recordings_dir, exist_ok=True)
+
+        self.transcode_after = float(os.getenv("RECORDING_TRANSCODE_AFTER_HOURS", "24")) * 3600
+        self.retention = float(os.getenv("RECORDING_RETENTION_DAYS", "180")) * 86400
+        self.max_bytes = int(os.getenv("RECORDINGS_MAX_BYTES", str(5 * 1024 ** 3)))
+        self.orphan_grace = float(os.getenv("RECORDING_ORPHAN_GRACE_MINUTES", "30")) * 60
+        self.delete_orphans = os.getenv("RECORDING_ORPHAN_DELETE", "false").lower() == "true"
+        self.sweep_interval = float(os.getenv("RECORDING_SWEEP_INTERVAL_MINUTES", "60")) * 60
+        self.opus_bitrate = os.getenv("RECORDING_OPUS_BITRATE", "24k")
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, Set[str]] = {}
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._build_index()
+
+    @staticmethod
+    def conference_id_for(filename: str) -> Optional[str]:
+        """Return the conference id a recording file name belongs to."""
+        if "_" not in filename:
+            return None
+        return filename.split("_", 1)[0]
+
+    def _build_index(self):
+        """Scan the recordings directory once to populate the index."""
+        index: Dict[str, Set[str]] = {}
+        with os.scandir(self.recordings_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                conference_id = self.conference_id_for(entry.name)
+                if conference_id:
+                    index.setdefault(conference_id, set()).add(entry.name)
+        with self._lock:
+            self._index = index
+        logger.info(f"Indexed {sum(len(v) for v in index.values())} recordings for {len(index)} conferences")
+
+    def path_for(self, conference_id: str, filename: str) -> str:
+        """Return the path a new recording for a conference should be saved to."""
+        return os.path.join(self.recordings_dir, f"{conference_id}_{os.path.basename(filename)}")
+
+    def add(self, conference_id: str, path: str):
+        """Register a recording that has been written to disk."""
+        with self._lock:
+            self._index.setdefault(conference_id, set()).add(os.path.basename(path))
+
+    def get_recordings(self, conference_id: str) -> List[str]:
+        """Return the paths of all recordings for a conference."""
+        with self._lock:
+            names = sorted(self._index.get(conference_id, ()))
+        return [os.path.join(self.recordings_dir, name) for name in names]
+
+    def resolve(self, filename: str) -> Optional[str]:
+        """Resolve a requested file name, following it to its compressed copy if transcoded."""
+        filename = os.path.basename(filename)
+        path = os.path.join(self.recordings_dir, filename)
+        if os.path.exists(path):
+            return path
+        conference_id = self.conference_id_for(filename)
+        if not conference_id:
+            return None
+        stem = os.path.splitext(filename)[0]
+        with self._lock:
+            names = self._index.get(conference_id, set())
+            for name in sorted(names):
+                if os.path.splitext(name)[0] == stem:
+                    return os.path.join(self.recordings_dir, name)
+        return None
+
+    def _remove_file(self, conference_id: str, name: str) -> Optional[int]:
+        """Delete a single recording and drop it from the index.
+
+        Returns bytes freed, or None if the file could not be deleted.
+        """
+        path = os.path.join(self.recordings_dir, name)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            size = 0
+        except OSError as e:
+            logger.warning(f"Failed to delete recording file {path}: {str(e)}")
+            return None
+        with self._lock:
+            names = self._index.get(conference_id)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._index[conference_id]
+        logger.info(f"Deleted recording file: {path}")
+        return size
+
+    def remove_conference(self, conference_id: str) -> int:
+        """Delete every recording for a conference. Returns bytes freed."""
+        with self._lock:
+            names = list(self._index.get(conference_id, ()))
+        return sum(self._remove_file(conference_id, name) or 0 for name in names)
+
+    def _entries(self) -> List[Dict]:
+        """Return size and modification time for every indexed recording, oldest first."""
+        with self._lock:
+            items = [(cid, name) for cid, names in self._index.items() for name in names]
+        entries = []
+        for conference_id, name in items:
+            try:
+                stat = os.stat(os.path.join(self.recordings_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append({
+                "conference_id": conference_id,
+                "name": name,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+            })
+        entries.sort(key=lambda e: e["mtime"])
+        return entries
+
+    def _transcode(self, conference_id: str, name: str) -> int:
+        """Transcode a recording to low-bitrate Opus. Returns bytes reclaimed."""
+        src = os.path.join(self.recordings_dir, name)
+        dst = os.path.join(self.recordings_dir, os.path.splitext(name)[0] + ".ogg")
+        tmp = dst + ".part"
+        try:
+            subprocess.run([
+                "ffmpeg",
+                "-i", src,
+                "-vn",                       # Drop any video stream
+                "-ac", "1",                  # Mono audio
+                "-c:a", "libopus",
+                "-b:a", self.opus_bitrate,
+                "-application", "voip",
+                "-f", "ogg",
+                "-y",
+                tmp
+            ], check=True, capture_output=True)
+            old_size = os.path.getsize(src)
+            new_size = os.path.getsize(tmp)
+            if new_size >= old_size:
+                os.remove(tmp)
+                return 0
+            os.replace(tmp, dst)
+            os.remove(src)
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.warning(f"Failed to transcode recording {src}: {str(e)}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return 0
+        with self._lock:
+            names = self._index.setdefault(conference_id, set())
+            names.discard(name)
+            names.add(os.path.basename(dst))
+        logger.info(f"Transcoded {src} to Opus ({old_size} -> {new_size} bytes)")
+        return old_size - new_size
+
+    def _referenced(self) -> Optional[Set[str]]:
+        """Collect every conference id still referenced, or None if unknown."""
+        if self.referenced_ids is None:
+            return None
+        try:
+            return set(self.referenced_ids())
+        except Exception as e:
+            logger.error(f"Error collecting referenced conference ids: {str(e)}")
+            return None
+
+    def run_maintenance(self) -> Dict[str, int]:
+        """Run one maintenance pass and report what was reclaimed."""
+        report = {
+            "orphans_found": 0,
+            "orphans_removed": 0,
+            "expired_removed": 0,
+            "quota_evicted": 0,
+            "transcoded": 0,
+            "bytes_reclaimed": 0,
+        }
+        now = time.time()
+
+        # Report recordings whose conference no longer exists, deleting them only if enabled
+        referenced = self._referenced()
+        if referenced is not None:
+            for entry in self._entries():
+                if entry["conference_id"] in referenced or now - entry["mtime"] < self.orphan_grace:
+                    continue
+                report["orphans_found"] += 1
+                if not self.delete_orphans:
+                    logger.info(f"Orphaned recording {entry['name']} kept (RECORDING_ORPHAN_DELETE is off)")
+                    continue
+                freed = self._remove_file(entry["conference_id"], entry["name"])
+                if freed is not None:
+                    report["bytes_reclaimed"] += freed
+                    report["orphans_removed"] += 1
+
+        # Enforce retention
+        if self.retention > 0:
+            for entry in self._entries():
+                if now - entry["mtime"] < self.retention:
+                    break
+                freed = self._remove_file(entry["conference_id"], entry["name"])
+                if freed is not None:
+                    report["bytes_reclaimed"] += freed
+                    report["expired_removed"] += 1
+
+        # Compress old recordings
+        if self.transcode_after >= 0 and self.ffmpeg_available():
+            for entry in self._entries():
+                if now - entry["mtime"] < self.transcode_after:
+                    break
+                if entry["name"].lower().endswith(COMPRESSED_EXTENSIONS):
+                    continue
+                reclaimed = self._transcode(entry["conference_id"], entry["name"])
+                if reclaimed:
+                    report["transcoded"] += 1
+                    report["bytes_reclaimed"] += reclaimed
+
+        # Enforce the size quota, evicting the oldest recordings first
+        if self.max_bytes > 0:
+            entries = self._entries()
+            total = sum(e["size"] for e in entries)
+            for entry in entries:
+                if total <= self.max_bytes:
+                    break
+                freed = self._remove_file(entry["conference_id"], entry["name"])
+                if freed is None:
+                    # Still on disk, so it still counts towards the quota
+                    continue
+                total -= freed
+                report["bytes_reclaimed"] += freed
+                report["quota_evicted"] += 1
+
+        logger.info(f"Recording maintenance finished: {json.dumps(report)}")
+        return report
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.run_maintenance()
+            except Exception as e:
+                logger.error(f"Error in recording maintenance: {str(e)}")
+
+    def start(self):
+        """Start the background maintenance worker."""
+        if self._worker is not None or self.sweep_interval <= 0:
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name="recording-maintenance", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """Stop the background maintenance worker."""
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+            self._worker = None
@@ -0,0 +1,239 @@
+"""Questions answered across every document and conference in a session.
+
+``SessionQueryService.query`` prepares the question and embeds it once, then
+searches every source of the session concurrently on a shared retrieval
+pool: each document (plus its grades table) in the session's partition and
+each conference in its own. Sources that miss ``SESSION_RETRIEVAL_TIMEOUT_SECONDS``
+are left out rather than holding up the answer.
+
+All sources are scored by cosine similarity against the same query vector,
+so their chunks are merged on one scale. A source's later chunks are
+discounted by ``SESSION_SOURCE_REPEAT_PENALTY`` each, so one long document
+cannot crowd the others out, and chunks far below the best match are
+dropped. The survivors share one context budget, grouped under numbered
+source labels, and a single LLM call answers with citations to them.
+"""
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from services.metrics import POOL_BUSY, POOL_CAPACITY, QUERY_ROUTES, span
+from services.context_builder import ContextBuilder
+from services.llm_gateway import Budget, QUERY_BUDGET_SECONDS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SESSION_QUERY_K_PER_SOURCE = int(os.getenv("SESSION_QUERY_K_PER_SOURCE", "4"))
+SESSION_QUERY_MAX_SOURCES = int(os.getenv("SESSION_QUERY_MAX_SOURCES", "40"))
+SESSION_RETRIEVAL_WORKERS = int(os.getenv("SESSION_RETRIEVAL_WORKERS", "16"))
+SESSION_RETRIEVAL_TIMEOUT_SECONDS = float(os.getenv("SESSION_RETRIEVAL_TIMEOUT_SECONDS", "5"))
+SESSION_CONTEXT_MAX_TOKENS = int(os.getenv("SESSION_CONTEXT_MAX_TOKENS", "3000"))
+SESSION_SOURCE_REPEAT_PENALTY = float(os.getenv("SESSION_SOURCE_REPEAT_PENALTY", "0.03"))
+# Chunks scoring this far below the best match are left out of the prompt
+SESSION_SCORE_MARGIN = float(os.getenv("SESSION_SCORE_MARGIN", "0.25"))
+
+# Answers looked up in the grades table outrank any retrieved chunk
+STRUCTURED_SCORE = 2.0
+
+Hit = Tuple[Document, float]
+
+
+def rerank(hits: Dict[str, List[Hit]], repeat_penalty: float, margin: float) -> List[Tuple[str, Document]]:
+    """Merge every source's hits (best first) into one list, most relevant first."""
+    scored = []
+    for label, source_hits in hits.items():
+        ordered = sorted(source_hits, key=lambda hit: hit[1], reverse=True)
+        for position, (doc, score) in enumerate(ordered):
+            scored.append((score - repeat_penalty * position, score, label, doc))
+    if not scored:
+        return []
+    # Cosine similarity is at most 1, so structured answers always clear the floor
+    similarities = [score for _, score, _, _ in scored if score <= 1.0]
+    floor = max(similarities) - margin if similarities else 0.0
+    scored = [item for item in scored if item[1] >= floor]
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [(label, doc) for _, _, label, doc in scored]
+
+
+class SessionQueryService:
+    def __init__(self, rag_service, conference_service, session_store, workers: int = SESSION_RETRIEVAL_WORKERS):
+        self.rag = rag_service
+        self.conferences = conference_service
+        self.sessions = session_store
+        self.k = SESSION_QUERY_K_PER_SOURCE
+        self.context_builder = ContextBuilder(max_tokens=SESSION_CONTEXT_MAX_TOKENS)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="retrieval")
+        POOL_CAPACITY.set(workers, pool="retrieval")
+
+        self.prompt_template = """You are a helpful assistant that helps parents understand their child's academic progress.
+        You will be given a question and excerpts from the student's academic documents and parent-teacher
+        conference transcripts. Each source's excerpts start with its number in brackets, e.g. [1].
+        Your task is to:
+        1. Analyze the excerpts from every source to find relevant information
+        2. Answer the question based on the excerpts, bringing the sources together
+        3. Cite the sources you use by number, e.g. [1] or [2][3], after the statements they support
+
+        If you don't know the answer based on the excerpts, just say that you don't know, don't try to make up an answer.
+
+        Sources:
+        {sources}
+
+        Excerpts:
+        {context}
+
+        Question: {question}
+
+        Answer:
+        """
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def sources(self, session_id: str) -> List[Dict]:
+        """The session's live documents and conferences, most recent first."""
+        deleted = self.rag.tombstones.deleted_ids("document")
+        documents = [
+            {"type": "document", "id": doc["id"], "name": doc.get("name") or doc["id"], "date": doc.get("upload_date", "")}
+            for doc in self.sessions.get_documents(session_id)
+            if doc["id"] not in deleted
+        ]
+        conferences = []
+        for conference_id in self.conferences.session_conferences(session_id):
+            conference = self.conferences.store.get(conference_id)
+            if conference is None:
+                continue
+            started = conference["start_time"]
+            conferences.append({
+                "type": "conference",
+                "id": conference_id,
+                "name": f"Conference on {started[:10]}",
+                "date": started,
+            })
+        found = sorted(documents + conferences, key=lambda source: source["date"], reverse=True)
+        if len(found) > SESSION_QUERY_MAX_SOURCES:
+            logger.info(f"Session {session_id} has {len(found)} sources, searching the {SESSION_QUERY_MAX_SOURCES} most recent")
+        return found[:SESSION_QUERY_MAX_SOURCES]
+
+    def _search(self, stores, key: Optional[str], where: Dict, vector: List[float]) -> List[Hit]:
+        """Search a partition, then the shared pre-partitioning collection."""
+        hits = []
+        store = stores.existing(key) if key is not None else None
+        if store is not None:
+            hits = store.similarity_search_with_score_by_vector(vector, k=self.k, filter=where)
+        if not hits:
+            hits = stores.partition(None).similarity_search_with_score_by_vector(vector, k=self.k, filter=where)
+        return hits
+
+    def _search_document(self, session_id: str, document_id: str, english: str, vector: List[float]) -> List[Hit]:
+        hits = []
+        # GPA, credit and grade questions are answered from the grades table
+        structured = self.rag.grades.answer(document_id, english)
+        if structured:
+            hits.append((Document(page_content=structured, metadata={"document_id": document_id}), STRUCTURED_SCORE))
+        hits.extend(self._search(self.rag.vector_stores, session_id, {"document_id": document_id}, vector))
+        return hits
+
+    def _search_conference(self, conference_id: str, vector: List[float]) -> List[Hit]:
+        return self._search(self.conferences.vector_stores, conference_id, {"conference_id": str(conference_id)}, vector)
+
+    def _run(self, search: Callable[[], List[Hit]]) -> List[Hit]:
+        POOL_BUSY.inc(pool="retrieval")
+        try:
+            return search()
+        finally:
+            POOL_BUSY.dec(pool="retrieval")
+
+    def retrieve(
+        self,
+        session_id: str,
+        sources: List[Dict],
+        question: str,
+        budget: Budget,
+        english: Optional[str] = None
+    ) -> Dict[str, List[Hit]]:
+        """Search every source concurrently. Returns hits by source label ("1", "2", ...).
+
+        ``question`` is embedded for retrieval; ``english`` (the question
+        itself by default) is matched against the grades tables.
+        """
+        english = english or question
+        vector = self.rag.embeddings.embed_query(question)
+        futures = {}
+        for label, source in enumerate(sources, start=1):
+            if source["type"] == "document":
+                search = lambda source=source: self._search_document(session_id, source["id"], english, vector)
+            else:
+                search = lambda source=source: self._search_conference(source["id"], vector)
+            futures[self._executor.submit(self._run, search)] = str(label)
+
+        done, pending = wait(futures, timeout=max(0.0, min(SESSION_RETRIEVAL_TIMEOUT_SECONDS, budget.remaining())))
+        for future in pending:
+            future.cancel()
+        if pending:
+            logger.warning(f"Left out {len(pending)} of {len(futures)} sources that missed the retrieval timeout")
+
+        hits: Dict[str, List[Hit]] = {}
+        for future in done:
+            label = futures[future]
+            try:
+                hits[label] = future.result()
+            except Exception as e:
+                logger.error(f"Error searching source [{label}]: {str(e)}")
+        return hits
+
+    def query(self, session_id: str, question: str, language: str = "en") -> Dict:
+        """Answer a question from all of a session's sources, with the sources it cites."""
+        budget = Budget(QUERY_BUDGET_SECONDS)
+        try:
+            sources = self.sources(session_id)
+            if not sources:
+                answer = "There are no documents or conferences in this session yet."
+                if language != "en":
+                    answer = self.rag.translate_text(answer, "en", language, budget)
+                return {"answer": answer, "sources": []}
+
+            document_ids = [source["id"] for source in sources if source["type"] == "document"]
+            question, english = self.rag.prepare_question(question, document_ids, budget)
+            QUERY_ROUTES.inc(route="session")
+
+            with span("retrieval"):
+                hits = self.retrieve(session_id, sources, question, budget, english)
+            ranked = rerank(hits, SESSION_SOURCE_REPEAT_PENALTY, SESSION_SCORE_MARGIN)
+            context, labels, _ = self.context_builder.build_cited(ranked, source="session")
+
+            used = [(label, sources[int(label) - 1]) for label in sorted(labels, key=int)]
+            listing = "\n".join(f"[{label}] {source['name']}" for label, source in used)
+            answer = self.rag.llm.complete(
+                self.prompt_template.format(sources=listing, context=context, question=question),
+                task="answer",
+                budget=budget
+            )
+
+            # If the target language is not English, translate the answer
+            if language != "en":
+                answer = self.rag.translate_text(answer, "en", language, budget)
+                logger.info(f"Translated answer to {language}")
+
+            return {
+                "answer": answer,
+                "sources": [
+                    {
+                        "label": int(label),
+                        "type": source["type"],
+                        "id": source["id"],
+                        "name": source["name"],
+                        "cited": f"[{label}]" in answer,
+                    }
+                    for label, source in used
+                ],
+            }
+        except Exception as e:
+            logger.error(f"Error in session query: {str(e)}")
+            error_message = f"Error processing your question: {str(e)}"
+            if language != "en":
+                error_message = self.rag.translate_text(error_message, "en", language)
+            return {"answer": error_message, "sources": []}
@@ -0,0 +1,150 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from services.listing_index import ListingIndex
+from services.event_bus import EventBus, event_bus
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Most recently used sessions kept in memory per worker
+SESSION_CACHE_MAX_SESSIONS = int(os.getenv("SESSION_CACHE_MAX_SESSIONS", "1024"))
+
+
+class SessionStore:
+    """Per-session document lists backed by ``sessions/{session_id}.json``.
+
+    Each session file is read once and then served from a listing index that
+    is updated whenever the session is written. Cached sessions are revalidated
+    with a ``stat`` so writes from other worker processes are picked up. Only
+    the ``max_cached`` most recently used sessions are kept, and sessions with
+    no file on disk are never cached.
+    Writes hold an exclusive ``flock`` on a per-session lock file and reload
+    the session under it, so concurrent workers never drop each other's
+    entries.
+    """
+
+    def __init__(
+        self,
+        sessions_dir: str = "sessions",
+        events: EventBus = event_bus,
+        max_cached: int = SESSION_CACHE_MAX_SESSIONS
+    ):
+        self.sessions_dir = sessions_dir
+        self.events = events
+        self.max_cached = max_cached
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._documents: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._listings: Dict[str, ListingIndex] = {}
+        self._stamps: Dict[str, Optional[Tuple[int, int, int]]] = {}
+
+    def get_session_file(self, session_id: str) -> str:
+        return os.path.join(self.sessions_dir, f"{os.path.basename(session_id)}.json")
+
+    @contextmanager
+    def _locked(self, session_id: str):
+        """Hold the in-process lock plus an exclusive file lock on the session."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self.get_session_file(session_id)}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._documents or os.path.exists(self.get_session_file(session_id))
+
+    def _stamp(self, session_id: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.get_session_file(session_id))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _forget(self, session_id: str):
+        self._documents.pop(session_id, None)
+        self._listings.pop(session_id, None)
+        self._stamps.pop(session_id, None)
+
+    def _load(self, session_id: str, force: bool = False) -> List[Dict]:
+        """Load a session into the cache if it is missing or changed on disk."""
+        stamp = self._stamp(session_id)
+        if stamp is None and not force:
+            # Reading an unknown session id must not grow the cache
+            self._forget(session_id)
+            return []
+        if force or session_id not in self._documents or self._stamps.get(session_id) != stamp:
+            session_file = self.get_session_file(session_id)
+            documents: List[Dict] = []
+            if os.path.exists(session_file):
+                with open(session_file, "r") as f:
+                    documents = json.load(f)
+            listing = self._listings.get(session_id) or ListingIndex(date_field="upload_date")
+            listing.rebuild({doc["id"]: doc for doc in documents})
+            self._documents[session_id] = documents
+            self._listings[session_id] = listing
+            self._stamps[session_id] = stamp
+        self._documents.move_to_end(session_id)
+        while len(self._documents) > max(self.max_cached, 1):
+            self._forget(next(iter(self._documents)))
+        return self._documents[session_id]
+
+    def _save(self, session_id: str):
+        session_file = self.get_session_file(session_id)
+        tmp_file = f"{session_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self._documents[session_id], f)
+        os.replace(tmp_file, session_file)
+        self._stamps[session_id] = self._stamp(session_id)
+
+    def get_documents(self, session_id: str) -> List[Dict]:
+        """Return every document in a session."""
+        with self._lock:
+            return [dict(doc) for doc in self._load(session_id)]
+
+    def listing(self, session_id: str) -> ListingIndex:
+        """Return the listing index for a session."""
+        with self._lock:
+            self._load(session_id)
+            if session_id not in self._listings:
+                return ListingIndex(date_field="upload_date")
+            return self._listings[session_id]
+
+    def add_document(self, session_id: str, document: Dict):
+        """Append a document to a session and persist it."""
+        with self._locked(session_id):
+            # Re-read under the lock; a stat stamp alone can miss a same-sized rewrite
+            self._load(session_id, force=True).append(document)
+            self._save(session_id)
+            self._listings[session_id].upsert(document["id"], document)
+        self.events.publish("document.added", {"document": document}, session_id=session_id)
+
+    def remove_document(self, session_id: str, document_id: str) -> Optional[Dict]:
+        """Remove a document from a session. Returns the removed entry, if any."""
+        with self._locked(session_id):
+            documents = self._load(session_id, force=True)
+            removed = next((doc for doc in documents if doc["id"] == document_id), None)
+            if removed is None:
+                return None
+            self._documents[session_id] = [doc for doc in documents if doc["id"] != document_id]
+            self._save(session_id)
+            self._listings[session_id].remove(document_id)
+        self.events.publish("document.deleted", {"document_id": document_id}, session_id=session_id)
+        return removed
@@ -0,0 +1,155 @@
+"""Binary snapshots of hot in-memory state for fast warm starts.
+
+A snapshot file is a small JSON header followed by named sections encoded
+with ``marshal``, which loads plain dicts and lists several times faster than
+JSON. ``Snapshot.open`` memory-maps the file and decodes sections straight
+from the mapping. The header records the Python and marshal versions, so a
+snapshot written by another interpreter is ignored rather than misread.
+
+``SnapshotWorker`` calls registered writers on an interval and once more on
+shutdown, so a restarted process finds recent snapshots to boot from.
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import marshal
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "300"))
+
+MAGIC = b"SLSNAP1\n"
+HEADER_LENGTH = struct.Struct("<I")
+
+
+def _format() -> Dict[str, Any]:
+    return {"python": list(sys.version_info[:2]), "marshal": marshal.version}
+
+
+def write_snapshot(path: str, sections: Dict[str, Any], meta: Optional[Dict] = None) -> int:
+    """Atomically write sections of plain Python data to ``path``. Returns the file size."""
+    blobs = {name: marshal.dumps(value) for name, value in sections.items()}
+    table, offset = {}, 0
+    for name, blob in blobs.items():
+        table[name] = [offset, len(blob)]
+        offset += len(blob)
+    header = json.dumps({**_format(), "meta": meta or {}, "sections": table, "written_at": time.time()}).encode()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        for blob in blobs.values():
+            f.write(blob)
+    os.replace(tmp_path, path)
+    return len(MAGIC) + HEADER_LENGTH.size + len(header) + offset
+
+
+class Snapshot:
+    """A read-only, memory-mapped snapshot file."""
+
+    def __init__(self, path: str, mapping: mmap.mmap, header: Dict, data_offset: int):
+        self.path = path
+        self.meta: Dict[str, Any] = header["meta"]
+        self.written_at: float = header["written_at"]
+        self._mapping = mapping
+        self._sections: Dict[str, list] = header["sections"]
+        self._data_offset = data_offset
+
+    @classmethod
+    def open(cls, path: str) -> Optional["Snapshot"]:
+        """Map a snapshot, or return None if it is missing, corrupt or from another interpreter."""
+        try:
+            with open(path, "rb") as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            if mapping[:len(MAGIC)] != MAGIC:
+                raise ValueError("bad magic")
+            start = len(MAGIC) + HEADER_LENGTH.size
+            (length,) = HEADER_LENGTH.unpack_from(mapping, len(MAGIC))
+            header = json.loads(mapping[start:start + length])
+            if [header.get("python"), header.get("marshal")] != [_format()["python"], _format()["marshal"]]:
+                raise ValueError(f"written by Python {header.get('python')}")
+            return cls(path, mapping, header, start + length)
+        except (ValueError, KeyError, struct.error) as e:
+            logger.warning(f"Ignoring snapshot {path}: {str(e)}")
+            mapping.close()
+            return None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sections
+
+    def section(self, name: str) -> Any:
+        offset, length = self._sections[name]
+        start = self._data_offset + offset
+        with memoryview(self._mapping) as view:
+            return marshal.loads(view[start:start + length])
+
+    def close(self):
+        self._mapping.close()
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SnapshotWorker:
+    """Write registered snapshots periodically and on shutdown."""
+
+    def __init__(self, interval: float = SNAPSHOT_INTERVAL_SECONDS):
+        self.interval = interval
+        self._writers: Dict[str, Callable[[], Optional[int]]] = {}
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def register(self, name: str, write: Callable[[], Optional[int]]):
+        """Add a writer; it returns the bytes written, or None if nothing changed."""
+        self._writers[name] = write
+
+    def run_once(self) -> Dict[str, Optional[int]]:
+        report = {}
+        for name, write in list(self._writers.items()):
+            try:
+                report[name] = write()
+            except Exception as e:
+                logger.error(f"Error writing {name} snapshot: {str(e)}")
+                report[name] = None
+        written = {name: size for name, size in report.items() if size}
+        if written:
+            logger.info(f"Wrote snapshots: {json.dumps(written)}")
+        return report
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        """Start the background snapshot worker."""
+        if self._worker is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """Stop the worker and write a final snapshot."""
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+            self._worker = None
+        self.run_once()
@@ -0,0 +1,280 @@
+"""Deferred, verifiable deletes.
+
+Deleting a document or conference only records a tombstone, which hides the
+entity from every read path straight away. A background ``CleanupWorker``
+then claims pending tombstones and runs the purge handler registered for
+their kind (vectors by id, files, session entries, cached derived data),
+retrying failures with a growing delay. A periodic verification sweep runs
+each kind's verify handler against recently purged tombstones and requeues
+any that still have leftovers.
+
+Tombstones live in SQLite, so every worker process sees the same deletes and
+only one of them purges a given entity at a time.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from typing import Any, Callable, Dict, List, Optional, Set
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TOMBSTONE_DB_PATH = os.getenv("TOMBSTONE_DB_PATH", os.path.join("chroma_db", "tombstones.db"))
+TOMBSTONE_SWEEP_SECONDS = float(os.getenv("TOMBSTONE_SWEEP_SECONDS", "30"))
+TOMBSTONE_VERIFY_HOURS = float(os.getenv("TOMBSTONE_VERIFY_HOURS", "6"))
+TOMBSTONE_RETENTION_DAYS = float(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+# A claimed tombstone is retried by another worker after this long
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 8
+BATCH_SIZE = 50
+
+Tombstone = Dict[str, Any]
+PurgeHandler = Callable[[Tombstone], Dict[str, int]]
+VerifyHandler = Callable[[Tombstone], List[str]]
+
+
+class EntityDeleted(LookupError):
+    """Raised when a read targets an entity that has been deleted."""
+
+
+class TombstoneStore:
+    def __init__(self, db_path: str = TOMBSTONE_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS tombstones (
+                    kind TEXT NOT NULL,
+                    entity_id TEXT NOT NULL,
+                    session_id TEXT,
+                    payload TEXT,
+                    deleted_at REAL NOT NULL,
+                    purged_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt REAL NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    PRIMARY KEY (kind, entity_id)
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS tombstones_pending ON tombstones (purged_at, next_attempt)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=10)
+        db.row_factory = sqlite3.Row
+        return db
+
+    @staticmethod
+    def _tombstone(row: sqlite3.Row) -> Tombstone:
+        tombstone = dict(row)
+        tombstone["payload"] = json.loads(tombstone["payload"] or "{}")
+        return tombstone
+
+    def mark(self, kind: str, entity_id: str, session_id: Optional[str] = None, payload: Optional[Dict] = None):
+        """Record a delete. Marking an already deleted entity again queues another purge."""
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "INSERT INTO tombstones (kind, entity_id, session_id, payload, deleted_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, entity_id) DO UPDATE SET "
+                "purged_at = NULL, attempts = 0, next_attempt = 0, last_error = NULL, "
+                "session_id = COALESCE(excluded.session_id, session_id), payload = excluded.payload",
+                (kind, entity_id, session_id, json.dumps(payload or {}), time.time())
+            )
+
+    def is_deleted(self, kind: str, entity_id: str) -> bool:
+        with closing(self._connect()) as db:
+            return db.execute(
+                "SELECT 1 FROM tombstones WHERE kind = ? AND entity_id = ?", (kind, entity_id)
+            ).fetchone() is not None
+
+    def deleted_ids(self, kind: str) -> Set[str]:
+        with closing(self._connect()) as db:
+            return {row["entity_id"] for row in db.execute("SELECT entity_id FROM tombstones WHERE kind = ?", (kind,))}
+
+    def claim(self, limit: int = BATCH_SIZE) -> List[Tombstone]:
+        """Lease a batch of pending tombstones to this worker."""
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute(
+                "SELECT * FROM tombstones WHERE purged_at IS NULL AND next_attempt <= ? AND attempts < ? "
+                "ORDER BY deleted_at LIMIT ?",
+                (now, MAX_ATTEMPTS, limit)
+            ).fetchall()
+            db.executemany(
+                "UPDATE tombstones SET next_attempt = ? WHERE kind = ? AND entity_id = ?",
+                [(now + LEASE_SECONDS, row["kind"], row["entity_id"]) for row in rows]
+            )
+            db.commit()
+        return [self._tombstone(row) for row in rows]
+
+    def complete(self, kind: str, entity_id: str):
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "UPDATE tombstones SET purged_at = ?, last_error = NULL WHERE kind = ? AND entity_id = ?",
+                (time.time(), kind, entity_id)
+            )
+
+    def fail(self, kind: str, entity_id: str, error: str):
+        """Record a failed purge and back off exponentially before the next attempt."""
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "UPDATE tombstones SET attempts = attempts + 1, last_error = ?, "
+                "next_attempt = ? + (30 << MIN(attempts, 10)) WHERE kind = ? AND entity_id = ?",
+                (error, time.time(), kind, entity_id)
+            )
+
+    def purged_since(self, since: float) -> List[Tombstone]:
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT * FROM tombstones WHERE purged_at >= ?", (since,)).fetchall()
+        return [self._tombstone(row) for row in rows]
+
+    def prune(self, older_than: float) -> int:
+        """Forget tombstones purged before ``older_than``."""
+        with closing(self._connect()) as db, db:
+            return db.execute("DELETE FROM tombstones WHERE purged_at < ?", (older_than,)).rowcount
+
+    def stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as db:
+            row = db.execute(
+                "SELECT SUM(purged_at IS NULL AND attempts < ?) AS pending, "
+                "SUM(purged_at IS NULL AND attempts >= ?) AS failed, "
+                "SUM(purged_at IS NOT NULL) AS purged FROM tombstones",
+                (MAX_ATTEMPTS, MAX_ATTEMPTS)
+            ).fetchone()
+        return {key: row[key] or 0 for key in ("pending", "failed", "purged")}
+
+
+class CleanupWorker:
+    """Purges tombstoned entities in the background and verifies nothing is left behind."""
+
+    def __init__(
+        self,
+        store: TombstoneStore,
+        sweep_interval: float = TOMBSTONE_SWEEP_SECONDS,
+        verify_interval: float = TOMBSTONE_VERIFY_HOURS * 3600,
+        retention: float = TOMBSTONE_RETENTION_DAYS * 86400
+    ):
+        self.store = store
+        self.sweep_interval = sweep_interval
+        self.verify_interval = verify_interval
+        self.retention = retention
+        self._purgers: Dict[str, PurgeHandler] = {}
+        self._verifiers: Dict[str, VerifyHandler] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._last_verify = time.time()
+
+    def register(self, kind: str, purge: PurgeHandler, verify: Optional[VerifyHandler] = None):
+        self._purgers[kind] = purge
+        if verify is not None:
+            self._verifiers[kind] = verify
+
+    def wake(self):
+        """Start purging now instead of at the next sweep."""
+        self._wake.set()
+
+    def run_once(self) -> Dict[str, Any]:
+        """Purge every pending tombstone and report what was removed."""
+        report: Dict[str, Any] = {"purged": 0, "failed": 0, "removed": {}}
+        while True:
+            batch = self.store.claim()
+            if not batch:
+                return report
+            for tombstone in batch:
+                kind, entity_id = tombstone["kind"], tombstone["entity_id"]
+                purge = self._purgers.get(kind)
+                if purge is None:
+                    self.store.fail(kind, entity_id, f"No purge handler for {kind}")
+                    report["failed"] += 1
+                    continue
+                try:
+                    removed = purge(tombstone)
+                except Exception as e:
+                    logger.warning(f"Failed to purge {kind} {entity_id}: {str(e)}")
+                    self.store.fail(kind, entity_id, str(e))
+                    report["failed"] += 1
+                    continue
+                self.store.complete(kind, entity_id)
+                report["purged"] += 1
+                for key, count in removed.items():
+                    report["removed"][key] = report["removed"].get(key, 0) + count
+
+    def verify(self, since: Optional[float] = None) -> Dict[str, Any]:
+        """Check purged tombstones for leftovers and requeue any that have them."""
+        since = time.time() - self.retention if since is None else since
+        report: Dict[str, Any] = {"checked": 0, "requeued": 0, "leftovers": []}
+        for tombstone in self.store.purged_since(since):
+            verify = self._verifiers.get(tombstone["kind"])
+            if verify is None:
+                continue
+            report["checked"] += 1
+            try:
+                leftovers = verify(tombstone)
+            except Exception as e:
+                logger.warning(f"Failed to verify {tombstone['kind']} {tombstone['entity_id']}: {str(e)}")
+                continue
+            if leftovers:
+                report["leftovers"].append({
+                    "kind": tombstone["kind"],
+                    "entity_id": tombstone["entity_id"],
+                    "leftovers": leftovers,
+                })
+                self.store.mark(tombstone["kind"], tombstone["entity_id"], tombstone["session_id"], tombstone["payload"])
+                report["requeued"] += 1
+        if report["requeued"]:
+            logger.warning(f"Verification found leftovers for {report['requeued']} deleted entities")
+            self.wake()
+        return report
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                report = self.run_once()
+                if report["purged"] or report["failed"]:
+                    logger.info(f"Tombstone cleanup finished: {json.dumps(report)}")
+                if self.verify_interval > 0 and time.time() - self._last_verify >= self.verify_interval:
+                    self._last_verify = time.time()
+                    self.verify()
+                    self.store.prune(time.time() - self.retention)
+            except Exception as e:
+                logger.error(f"Error in tombstone cleanup: {str(e)}")
+            self._wake.wait(self.sweep_interval)
+            self._wake.clear()
+
+    def start(self):
+        """Start the background cleanup worker."""
+        if self._worker is not None:
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name="tombstone-cleanup", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """Stop the background cleanup worker."""
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+            self._worker = None
+
+
+_store: Optional[TombstoneStore] = None
+_store_lock = threading.Lock()
+
+
+def get_tombstone_store() -> TombstoneStore:
+    """Return the process-wide tombstone store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TombstoneStore()
+    return _store
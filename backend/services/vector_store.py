@@ -0,0 +1,605 @@
+"""Vector store backends behind a single small interface.
+
+``ChromaVectorStore`` wraps the existing Chroma collections. ``LocalVectorStore``
+is an in-process alternative: one directory per partition (a document or a
+conference) holding normalised embeddings as a memory-mapped float16 or int8
+``.npy`` file, searched with a flat NumPy dot product. Filtering on the
+partition key only opens that partition, so filtered search cost depends on
+the partition size rather than the corpus size.
+
+``PartitionedVectorStore`` routes each session or conference to a physical
+partition of its own (a Chroma collection or a local store directory), so
+search cost is independent of how many other tenants share the server and
+deleting a tenant is a single collection or directory drop.
+
+The backend is chosen with ``VECTOR_BACKEND`` (``chroma`` or ``local``) and the
+local storage type with ``VECTOR_DTYPE`` (``float16`` or ``int8``).
+"""
+import os
+import re
+import json
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float16")
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "vector_store")
+# Rows widened to float32 at a time when scoring a partition
+VECTOR_SCORE_BLOCK_ROWS = int(os.getenv("VECTOR_SCORE_BLOCK_ROWS", "4096"))
+
+Metadata = Dict[str, Any]
+Filter = Dict[str, Any]
+
+
+def _flatten_filter(where: Optional[Filter]) -> Filter:
+    """Merge a Chroma-style ``$and`` filter into one flat dict."""
+    if not where:
+        return {}
+    if "$and" in where:
+        merged: Filter = {}
+        for clause in where["$and"]:
+            merged.update(_flatten_filter(clause))
+        return merged
+    return dict(where)
+
+
+def _matches(metadata: Metadata, where: Filter) -> bool:
+    for key, expected in where.items():
+        value = metadata.get(key)
+        if isinstance(expected, dict) and "$in" in expected:
+            if value not in expected["$in"]:
+                return False
+        elif isinstance(expected, dict) and "$eq" in expected:
+            if value != expected["$eq"]:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class VectorStore(ABC):
+    """Interface shared by all vector store backends."""
+
+    @abstractmethod
+    def add_texts(self, texts: List[str], metadatas: Optional[List[Metadata]] = None, ids: Optional[List[str]] = None) -> List[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Metadata]] = None,
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Filter] = None) -> List[Document]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[Filter] = None) -> List[Document]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Filter] = None
+    ) -> List[Tuple[Document, float]]:
+        """Like ``similarity_search_by_vector``, with the cosine similarity of each chunk."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, where: Optional[Filter] = None, ids: Optional[List[str]] = None) -> Dict[str, List]:
+        """Return stored chunks as ``{"ids", "documents", "metadatas"}``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Filter] = None) -> None:
+        raise NotImplementedError
+
+    def delete_matching(self, where: Filter, batch_size: int = 5000) -> int:
+        """Delete every chunk matching ``where`` by id, in batches. Returns how many were deleted."""
+        ids = self.get(where=where)["ids"]
+        for start in range(0, len(ids), batch_size):
+            self.delete(ids=ids[start:start + batch_size])
+        return len(ids)
+
+
+class ChromaVectorStore(VectorStore):
+    """Chroma collection persisted on disk."""
+
+    def __init__(
+        self,
+        collection_name: str,
+        embeddings: Optional[Embeddings],
+        persist_directory: str = "chroma_db",
+        client=None
+    ):
+        from langchain_chroma import Chroma
+        self.store = Chroma(
+            persist_directory=None if client is not None else persist_directory,
+            client=client,
+            embedding_function=embeddings,
+            collection_name=collection_name
+        )
+
+    def drop(self) -> None:
+        """Delete the whole collection."""
+        self.store.delete_collection()
+
+    def add_texts(self, texts, metadatas=None, ids=None):
+        return self.store.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, ids=None):
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        self.store._collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=texts)
+        return ids
+
+    def similarity_search(self, query, k=4, filter=None):
+        return self.store.similarity_search(query, k=k, filter=filter)
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None):
+        return self.store.similarity_search_by_vector(embedding, k=k, filter=filter)
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, filter=None):
+        results = self.store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+        # Chroma reports squared L2 distance, which for unit-length embeddings is 2 - 2 * cosine
+        return [(doc, 1.0 - distance / 2) for doc, distance in results]
+
+    def get(self, where=None, ids=None):
+        return self.store.get(where=where, ids=ids)
+
+    def delete(self, ids=None, where=None):
+        self.store._collection.delete(ids=ids, where=where)
+
+
+class _Partition:
+    """One loaded partition: chunk data plus its memory-mapped vectors."""
+
+    def __init__(self, stamp, ids: List[str], texts: List[str], metadatas: List[Metadata], vectors, scales):
+        self.stamp = stamp
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.vectors = vectors
+        self.scales = scales
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every stored vector with the normalised query."""
+        # NumPy has no fast float16/int8 matmul, so widen one block of rows at a
+        # time; only that block is resident in float32, not the whole mapping
+        count = len(self.vectors)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, VECTOR_SCORE_BLOCK_ROWS):
+            end = min(start + VECTOR_SCORE_BLOCK_ROWS, count)
+            scores[start:end] = self.vectors[start:end].astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+
+class LocalVectorStore(VectorStore):
+    """Flat NumPy search over memory-mapped, quantized vectors, one directory per partition."""
+
+    def __init__(
+        self,
+        directory: str,
+        embeddings: Optional[Embeddings],
+        partition_key: str,
+        dtype: str = "float16"
+    ):
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        self.directory = directory
+        self.embeddings = embeddings
+        self.partition_key = partition_key
+        self.dtype = dtype
+        self._lock = threading.Lock()
+        self._partitions: Dict[str, _Partition] = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+    # -- layout ---------------------------------------------------------
+
+    @staticmethod
+    def partition_name(value: Any) -> str:
+        """Directory name for a partition key value."""
+        value = "_default" if value is None else str(value)
+        if re.fullmatch(r"[A-Za-z0-9_][A-Za-z0-9_.-]{0,127}", value):
+            return value
+        return hashlib.sha1(value.encode()).hexdigest()
+
+    def _partition_dir(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _partition_names(self) -> List[str]:
+        with os.scandir(self.directory) as entries:
+            return [entry.name for entry in entries if entry.is_dir()]
+
+    def _target_partitions(self, where: Filter) -> List[str]:
+        """Partitions a filter can match, without scanning the others."""
+        expected = where.get(self.partition_key)
+        if expected is None:
+            return self._partition_names()
+        values = expected["$in"] if isinstance(expected, dict) and "$in" in expected else [
+            expected["$eq"] if isinstance(expected, dict) else expected
+        ]
+        return [self.partition_name(value) for value in values]
+
+    @contextmanager
+    def _write_lock(self, name: str):
+        """Serialise writers to one partition across threads and processes."""
+        with self._lock:
+            path = self._partition_dir(name)
+            os.makedirs(path, exist_ok=True)
+            if fcntl is None:
+                yield path
+                return
+            with open(os.path.join(path, ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield path
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # -- loading --------------------------------------------------------
+
+    def _load(self, name: str) -> Optional[_Partition]:
+        """Return a partition, reloading it if another writer replaced it."""
+        manifest = os.path.join(self._partition_dir(name), "chunks.json")
+        try:
+            stat = os.stat(manifest)
+        except FileNotFoundError:
+            self._partitions.pop(name, None)
+            return None
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = self._partitions.get(name)
+        if cached is not None and cached.stamp == stamp:
+            return cached
+
+        for _ in range(3):
+            try:
+                with open(manifest) as f:
+                    data = json.load(f)
+                base = os.path.join(self._partition_dir(name), f"vectors-{data['generation']}")
+                vectors = np.load(f"{base}.npy", mmap_mode="r")
+                scales = np.load(f"{base}.scales.npy") if data["dtype"] == "int8" else None
+                break
+            except FileNotFoundError:
+                # A writer swapped generations between our reads; try again
+                continue
+        else:
+            logger.warning(f"Could not load vector partition {name}")
+            return None
+
+        partition = _Partition(stamp, data["ids"], data["texts"], data["metadatas"], vectors, scales)
+        self._partitions[name] = partition
+        return partition
+
+    # -- encoding -------------------------------------------------------
+
+    @staticmethod
+    def _normalise(embeddings) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.dtype == "float16":
+            return vectors.astype(np.float16), None
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def _write(self, path: str, ids, texts, metadatas, vectors, scales):
+        """Write a new generation of a partition and switch the manifest to it."""
+        generation = uuid.uuid4().hex[:12]
+        base = os.path.join(path, f"vectors-{generation}")
+        np.save(f"{base}.npy", vectors)
+        if scales is not None:
+            np.save(f"{base}.scales.npy", scales)
+
+        manifest = os.path.join(path, "chunks.json")
+        temp = f"{manifest}.{os.getpid()}.tmp"
+        with open(temp, "w") as f:
+            json.dump({
+                "generation": generation,
+                "dtype": self.dtype,
+                "ids": ids,
+                "texts": texts,
+                "metadatas": metadatas
+            }, f)
+        os.replace(temp, manifest)
+
+        # Open readers keep their mapping of the old generation until they reload
+        for entry in os.listdir(path):
+            if entry.startswith("vectors-") and not entry.startswith(f"vectors-{generation}"):
+                os.remove(os.path.join(path, entry))
+
+    # -- VectorStore ----------------------------------------------------
+
+    def add_texts(self, texts, metadatas=None, ids=None):
+        if not texts:
+            return []
+        return self.add_embeddings(texts, self.embeddings.embed_documents(texts), metadatas, ids)
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, ids=None):
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = self._normalise(embeddings)
+
+        groups: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            groups.setdefault(self.partition_name(metadata.get(self.partition_key)), []).append(i)
+
+        for name, rows in groups.items():
+            with self._write_lock(name) as path:
+                existing = self._load(name)
+                new_ids = [ids[i] for i in rows]
+                replaced = set(new_ids)
+                # Re-adding an id replaces the stored chunk, as in Chroma
+                keep = [] if existing is None else [
+                    j for j, chunk_id in enumerate(existing.ids) if chunk_id not in replaced
+                ]
+                encoded, scales = self._encode(vectors[rows])
+                if keep:
+                    encoded = np.concatenate([existing.vectors[keep], encoded])
+                    if scales is not None:
+                        scales = np.concatenate([existing.scales[keep], scales])
+                self._write(
+                    path,
+                    [existing.ids[j] for j in keep] + new_ids,
+                    [existing.texts[j] for j in keep] + [texts[i] for i in rows],
+                    [existing.metadatas[j] for j in keep] + [metadatas[i] for i in rows],
+                    encoded,
+                    scales
+                )
+        return ids
+
+    def similarity_search(self, query, k=4, filter=None):
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k=k, filter=filter)
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k, filter=filter)]
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, filter=None):
+        where = _flatten_filter(filter)
+        extra = {key: value for key, value in where.items() if key != self.partition_key}
+        query = self._normalise(embedding)[0]
+
+        candidates: List[Tuple[float, _Partition, int]] = []
+        for name in self._target_partitions(where):
+            partition = self._load(name)
+            if partition is None or not partition.ids:
+                continue
+            scores = partition.scores(query)
+            if extra:
+                mask = np.array([_matches(m, extra) for m in partition.metadatas], dtype=bool)
+                scores = np.where(mask, scores, -np.inf)
+            top = min(k, len(scores))
+            best = np.argpartition(-scores, top - 1)[:top]
+            candidates.extend((float(scores[i]), partition, int(i)) for i in best if np.isfinite(scores[i]))
+
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        return [
+            (Document(page_content=partition.texts[i], metadata=partition.metadatas[i]), score)
+            for score, partition, i in candidates[:k]
+        ]
+
+    def _rows(self, where: Filter, ids: Optional[Iterable[str]]) -> Iterable[Tuple[str, _Partition, List[int]]]:
+        wanted = set(ids) if ids is not None else None
+        for name in self._target_partitions(where):
+            partition = self._load(name)
+            if partition is None:
+                continue
+            rows = [
+                i for i, (chunk_id, metadata) in enumerate(zip(partition.ids, partition.metadatas))
+                if (wanted is None or chunk_id in wanted) and _matches(metadata, where)
+            ]
+            yield name, partition, rows
+
+    def get(self, where=None, ids=None):
+        result: Dict[str, List] = {"ids": [], "documents": [], "metadatas": []}
+        for _, partition, rows in self._rows(_flatten_filter(where), ids):
+            result["ids"].extend(partition.ids[i] for i in rows)
+            result["documents"].extend(partition.texts[i] for i in rows)
+            result["metadatas"].extend(partition.metadatas[i] for i in rows)
+        return result
+
+    def drop_partition(self, value: Any) -> None:
+        """Remove a whole partition in one directory delete."""
+        name = self.partition_name(value)
+        with self._lock:
+            shutil.rmtree(self._partition_dir(name), ignore_errors=True)
+            self._partitions.pop(name, None)
+
+    def delete(self, ids=None, where=None):
+        where = _flatten_filter(where)
+        expected = where.get(self.partition_key)
+        if ids is None and len(where) == 1 and expected is not None and not isinstance(expected, dict):
+            self.drop_partition(expected)
+            return
+
+        for name, _, rows in list(self._rows(where, ids)):
+            if not rows:
+                continue
+            with self._write_lock(name) as path:
+                partition = self._load(name)
+                if partition is None:
+                    continue
+                remove = {partition.ids[i] for i in rows}
+                keep = [j for j, chunk_id in enumerate(partition.ids) if chunk_id not in remove]
+                if not keep:
+                    shutil.rmtree(path, ignore_errors=True)
+                    self._partitions.pop(name, None)
+                    continue
+                self._write(
+                    path,
+                    [partition.ids[j] for j in keep],
+                    [partition.texts[j] for j in keep],
+                    [partition.metadatas[j] for j in keep],
+                    np.asarray(partition.vectors[keep]),
+                    partition.scales[keep] if partition.scales is not None else None
+                )
+
+
+def create_vector_store(
+    collection_name: str,
+    embeddings: Optional[Embeddings],
+    partition_key: str,
+    persist_directory: str = "chroma_db",
+    client=None
+) -> VectorStore:
+    """Open the configured vector store backend for a collection."""
+    if VECTOR_BACKEND == "local":
+        return LocalVectorStore(
+            os.path.join(VECTOR_STORE_DIR, collection_name),
+            embeddings,
+            partition_key=partition_key,
+            dtype=VECTOR_DTYPE
+        )
+    if VECTOR_BACKEND != "chroma":
+        raise ValueError(f"Unknown VECTOR_BACKEND: {VECTOR_BACKEND}")
+    return ChromaVectorStore(collection_name, embeddings, persist_directory=persist_directory, client=client)
+
+
+class PartitionedVectorStore:
+    """One physical vector store per partition key (a session or a conference).
+
+    ``partition(None)`` is the shared collection that predates partitioning,
+    so chunks indexed before partitioning remain searchable.
+    """
+
+    # Collection names Chroma accepts, kept short enough to add a prefix
+    _SAFE_KEY = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,38}[A-Za-z0-9]")
+
+    def __init__(
+        self,
+        collection_name: str,
+        embeddings: Optional[Embeddings],
+        partition_key: str,
+        persist_directory: str = "chroma_db",
+        max_open: int = 256
+    ):
+        self.collection_name = collection_name
+        self.embeddings = embeddings
+        self.partition_key = partition_key
+        self.persist_directory = persist_directory
+        self.max_open = max_open
+        self._lock = threading.Lock()
+        self._stores: "OrderedDict[Optional[str], VectorStore]" = OrderedDict()
+        self._client = None
+
+    def _name(self, key: str) -> str:
+        if not self._SAFE_KEY.fullmatch(key):
+            key = hashlib.sha1(key.encode()).hexdigest()[:24]
+        return f"{self.collection_name}-{key}"
+
+    def _connect(self):
+        if self._client is None:
+            # Share one client between all of this store's collections
+            import chromadb
+            self._client = chromadb.PersistentClient(path=self.persist_directory)
+        return self._client
+
+    def _open(self, key: Optional[str]) -> VectorStore:
+        name = self.collection_name if key is None else self._name(key)
+        if VECTOR_BACKEND == "chroma":
+            self._connect()
+        # Local partitions are further split per document or conference
+        return create_vector_store(
+            name,
+            self.embeddings,
+            partition_key=self.partition_key,
+            persist_directory=self.persist_directory,
+            client=self._client
+        )
+
+    def partition(self, key: Optional[str]) -> VectorStore:
+        """Return the store for a partition, opening it on first use."""
+        with self._lock:
+            store = self._stores.get(key)
+            if store is None:
+                store = self._stores[key] = self._open(key)
+                if len(self._stores) > self.max_open:
+                    self._stores.popitem(last=False)
+            else:
+                self._stores.move_to_end(key)
+            return store
+
+    def existing(self, key: str) -> Optional[VectorStore]:
+        """Return the store for a partition if it exists, without creating it.
+
+        Read paths use this so that looking up an unknown session or
+        conference never leaves an empty collection behind.
+        """
+        with self._lock:
+            store = self._stores.get(key)
+        if store is not None:
+            return store
+        if not self.has_partition(key):
+            return None
+        return self.partition(key)
+
+    def locate(self, key: Optional[str], where: Filter) -> VectorStore:
+        """Return the partition holding chunks matching ``where``.
+
+        Falls back to the shared collection for data indexed before
+        partitioning.
+        """
+        if key is not None:
+            store = self.existing(key)
+            if store is not None and store.get(where=where)["ids"]:
+                return store
+        return self.partition(None)
+
+    def has_partition(self, key: str) -> bool:
+        """Whether a partition exists, checked without creating it."""
+        name = self._name(key)
+        if VECTOR_BACKEND == "local":
+            return os.path.isdir(os.path.join(VECTOR_STORE_DIR, name))
+        with self._lock:
+            client = self._connect()
+        # A single lookup by name, rather than listing every collection
+        try:
+            client.get_collection(name)
+        except ValueError:
+            return False
+        return True
+
+    def drop(self, key: str) -> None:
+        """Delete a whole partition."""
+        store = self.partition(key)
+        with self._lock:
+            self._stores.pop(key, None)
+        if isinstance(store, LocalVectorStore):
+            shutil.rmtree(store.directory, ignore_errors=True)
+        else:
+            store.drop()
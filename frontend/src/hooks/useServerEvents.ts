@@ -0,0 +1,47 @@
+import { useEffect, useRef } from 'react';
+
+export interface ServerEvent<T = any> {
+  type: string;
+  data: T;
+  timestamp: string;
+}
+
+type Handlers = Record<string, (event: ServerEvent) => void>;
+
+const EVENTS_URL = 'http://localhost:8000/events';
+
+// Subscribe to backend change notifications pushed over server-sent events.
+// Handlers are keyed by event type and may change between renders without
+// reopening the connection.
+const useServerEvents = (handlers: Handlers) => {
+  const handlersRef = useRef<Handlers>(handlers);
+  handlersRef.current = handlers;
+
+  const eventTypes = Object.keys(handlers).sort().join(',');
+
+  useEffect(() => {
+    const source = new EventSource(EVENTS_URL, { withCredentials: true });
+
+    const listeners = eventTypes.split(',').filter(Boolean).map((type) => {
+      const listener = (message: MessageEvent) => {
+        try {
+          const event: ServerEvent = JSON.parse(message.data);
+          handlersRef.current[type]?.(event);
+        } catch (error) {
+          console.error('Error handling server event:', error);
+        }
+      };
+      source.addEventListener(type, listener as EventListener);
+      return { type, listener };
+    });
+
+    return () => {
+      listeners.forEach(({ type, listener }) =>
+        source.removeEventListener(type, listener as EventListener)
+      );
+      source.close();
+    };
+  }, [eventTypes]);
+};
+
+export default useServerEvents;
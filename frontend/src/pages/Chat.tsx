@@ -22,6 +22,7 @@ import { useTranslation } from 'react-i18next';
 import ChatBubbleOutlineIcon from '@mui/icons-material/ChatBubbleOutline';
 import DescriptionIcon from '@mui/icons-material/Description';
 import MeetingRoomIcon from '@mui/icons-material/MeetingRoom';
+import useServerEvents from '../hooks/useServerEvents';
 
 interface Message {
   id: string;
@@ -152,10 +153,21 @@ const Chat: React.FC = () => {
     fetchData();
   }, []);
 
-  // Refresh data when tab changes
-  useEffect(() => {
-    fetchData();
-  }, [activeTab]);
+  // Keep the lists current from server pushes instead of refetching
+  useServerEvents({
+    'document.added': ({ data }) =>
+      setDocuments((prev) => [...prev.filter((doc) => doc.id !== data.document.id), data.document]),
+    'document.deleted': ({ data }) =>
+      setDocuments((prev) => prev.filter((doc) => doc.id !== data.document_id)),
+    'conference.updated': ({ data }) =>
+      setConferences((prev) =>
+        prev.some((conf) => conf.id === data.conference.id)
+          ? prev.map((conf) => (conf.id === data.conference.id ? { ...conf, ...data.conference } : conf))
+          : [...prev, data.conference]
+      ),
+    'conference.deleted': ({ data }) =>
+      setConferences((prev) => prev.filter((conf) => conf.id !== data.conference_id)),
+  });
 
   const scrollToBottom = useCallback(() => {
     if (messages.length > 0) {  // Only scroll if there are messages
@@ -189,6 +201,7 @@ const Chat: React.FC = () => {
 
       const response = await fetch(`http://localhost:8000${endpoint}`, {
         method: 'POST',
+        credentials: 'include',
         headers: {
           'Content-Type': 'application/json',
         },
@@ -27,6 +27,7 @@ import PlayArrowIcon from '@mui/icons-material/PlayArrow';
 import DeleteIcon from '@mui/icons-material/Delete';
 import EventIcon from '@mui/icons-material/Event';
 import TranslateIcon from '@mui/icons-material/Translate';
+import useServerEvents from '../hooks/useServerEvents';
 
 interface Conference {
   id: string;
@@ -61,6 +62,38 @@ const Conferences: React.FC = () => {
     fetchConferences();
   }, []);
 
+  // Apply changes pushed by the server instead of refetching the list
+  useServerEvents({
+    'conference.updated': ({ data }) =>
+      setConferences((prev) =>
+        prev.some((conf) => conf.id === data.conference.id)
+          ? prev
+          : [
+              {
+                id: data.conference.id,
+                date: data.conference.start_time,
+                summary: '',
+                language: data.conference.parent_language,
+              },
+              ...prev,
+            ]
+      ),
+    'conference.segment_transcribed': ({ data }) =>
+      setConferences((prev) =>
+        prev.map((conf) =>
+          conf.id === data.conference_id
+            ? {
+                ...conf,
+                summary: conf.summary || data.text,
+                transcript: conf.transcript ? `${conf.transcript} ${data.text}` : data.text,
+              }
+            : conf
+        )
+      ),
+    'conference.deleted': ({ data }) =>
+      setConferences((prev) => prev.filter((conf) => conf.id !== data.conference_id)),
+  });
+
   const fetchConferences = async () => {
     try {
       const response = await fetch('http://localhost:8000/conferences');
@@ -79,6 +112,7 @@ const Conferences: React.FC = () => {
       // First, start the conference
       const startResponse = await fetch('http://localhost:8000/conference/start', {
         method: 'POST',
+        credentials: 'include',
         headers: {
           'Content-Type': 'application/json',
         },
@@ -168,7 +202,7 @@ const Conferences: React.FC = () => {
             transcript: data.text
           };
           
-          setConferences([newConference, ...conferences]);
+          setConferences((prev) => [newConference, ...prev.filter((conf) => conf.id !== conferenceId)]);
         } catch (error) {
           console.error('Error processing audio:', error);
           setError(error instanceof Error ? error.message : 'Unknown error occurred');
@@ -219,7 +253,7 @@ const Conferences: React.FC = () => {
         throw new Error(errorData.detail || 'Failed to delete conference');
       }
       
-      setConferences(conferences.filter(conf => conf.id !== conferenceId));
+      setConferences((prev) => prev.filter(conf => conf.id !== conferenceId));
       setError(null);
     } catch (error) {
       console.error('Error deleting conference:', error);
@@ -271,7 +305,10 @@ const Conferences: React.FC = () => {
   const handleTranslate = async (conferenceId: string) => {
     try {
       setTranslating(conferenceId);
-      const response = await fetch(`http://localhost:8000/conference/${conferenceId}/translate?target_language=${selectedLanguage}`);
+      const response = await fetch(
+        `http://localhost:8000/conference/${conferenceId}/translate?target_language=${selectedLanguage}`,
+        { credentials: 'include' }
+      );
       
       if (!response.ok) {
         throw new Error('Failed to translate conference');
@@ -18,6 +18,7 @@ import { useTranslation } from 'react-i18next';
 import CloudUploadIcon from '@mui/icons-material/CloudUpload';
 import DeleteIcon from '@mui/icons-material/Delete';
 import DescriptionIcon from '@mui/icons-material/Description';
+import useServerEvents from '../hooks/useServerEvents';
 
 const Documents: React.FC = () => {
   const { t } = useTranslation();
@@ -44,6 +45,14 @@ const Documents: React.FC = () => {
     fetchDocuments();
   }, []);
 
+  // Apply changes pushed by the server, e.g. uploads from another tab
+  useServerEvents({
+    'document.added': ({ data }) =>
+      setDocuments((prev) => [...prev.filter((doc) => doc.id !== data.document.id), data.document]),
+    'document.deleted': ({ data }) =>
+      setDocuments((prev) => prev.filter((doc) => doc.id !== data.document_id)),
+  });
+
   const handleFileUpload = async (event: React.ChangeEvent<HTMLInputElement>) => {
     const file = event.target.files?.[0];
     if (!file) return;
@@ -62,7 +71,10 @@ const Documents: React.FC = () => {
       if (!response.ok) throw new Error('Upload failed');
 
       const data = await response.json();
-      setDocuments([...documents, { id: data.document_id, name: file.name }]);
+      setDocuments((prev) => [
+        ...prev.filter((doc) => doc.id !== data.document_id),
+        { id: data.document_id, name: file.name },
+      ]);
     } catch (error) {
       console.error('Error uploading file:', error);
     } finally {
@@ -83,7 +95,7 @@ const Documents: React.FC = () => {
       }
 
       // Update the documents list
-      setDocuments(documents.filter(doc => doc.id !== documentId));
+      setDocuments((prev) => prev.filter(doc => doc.id !== documentId));
     } catch (error) {
       console.error('Error deleting document:', error);
     } finally {